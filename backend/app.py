@@ -1,28 +1,56 @@
 """
 Deepfake Audio Detection System — Flask API Backend
 Provides authentication, audio/video upload & prediction, and model metrics.
+Prometheus metrics for monitoring are served on /metrics.
 """
 import os
 import json
+import math
 import uuid
+import atexit
 import hashlib
 import sqlite3
+import shutil
+import tempfile
+import threading
+import time
 from datetime import timedelta
 from functools import wraps
 
-from flask import Flask, request, jsonify, g
+# Start of the startup-time breakdown logged once the app is ready
+BOOT_STARTED = time.perf_counter()
+
+import torch
+from flask import Flask, Response, request, jsonify, g, stream_with_context
 from flask_cors import CORS
+from flask_sock import Sock
 from flask_jwt_extended import (
     JWTManager, create_access_token, jwt_required, 
-    get_jwt_identity, get_jwt
+    get_jwt_identity, get_jwt, verify_jwt_in_request
 )
 from werkzeug.utils import secure_filename
 
 from model import (
-    load_model, preprocess_audio, predict_robust,
-    is_allowed_file, is_video_file, extract_audio_from_video,
-    ALLOWED_EXTENSIONS
+    preprocess_audio, normalize_audio, predict_robust, predict_early_exit, MelFrontend,
+    supports_shared_frames, is_allowed_file, is_video_file, aggregate_probabilities, apply_aggregate,
+    resolve_time_range, offset_result_times,
+    ALLOWED_EXTENSIONS, DEFAULT_BATCH_SIZE, CHUNK_DURATION, CHUNK_OVERLAP, DEFAULT_TOP_K, DEFAULT_QUANTILE
+)
+from jobs import JobQueue, JobError, QueueFullError
+from batching import BatchScheduler
+from cache import ResultCache, ChunkCache, hash_file
+from inference import load_backend, DEFAULT_MODEL_PATHS
+from model_server import ModelClient
+from batch import collect_inputs, create_decode_pool, score_files, is_archive
+from ingest import (
+    decode_audio_blocks, load_audio, needs_seekable_input, spool_stream, predict_stream, predict_file_stream,
+    media_duration
+)
+from live import LiveDetector, run_session, LIVE_FORMATS
+from database import (
+    ConnectionPool, PredictionWriter, migrate, fetch_history, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE
 )
+from instrumentation import StageTimer, count_audio, render_metrics, REQUESTS, REQUEST_SECONDS, IN_FLIGHT
 
 # =========================
 # App Configuration
@@ -33,23 +61,68 @@ app.config['JWT_SECRET_KEY'] = 'jwt-deepfake-audio-secret-2024'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max upload
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+app.config['INFERENCE_BATCH_SIZE'] = int(os.environ.get('INFERENCE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+app.config['INFERENCE_WORKERS'] = int(os.environ.get('INFERENCE_WORKERS', 2))
+app.config['JOB_QUEUE_SIZE'] = int(os.environ.get('JOB_QUEUE_SIZE', 16))
+app.config['DYNAMIC_BATCHING'] = os.environ.get('DYNAMIC_BATCHING', '1') == '1'
+app.config['BATCH_MAX_SIZE'] = int(os.environ.get('BATCH_MAX_SIZE', 32))
+app.config['BATCH_MAX_WAIT_MS'] = float(os.environ.get('BATCH_MAX_WAIT_MS', 10))
+app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('RESULT_CACHE_SIZE', 10000))
+# Per-chunk fingerprint cache (opt-in, shared across users): in-memory entries
+# (0 disables) and optional on-disk tier
+app.config['CHUNK_CACHE_SIZE'] = int(os.environ.get('CHUNK_CACHE_SIZE', 0))
+app.config['CHUNK_CACHE_DB'] = os.environ.get('CHUNK_CACHE_DB')
+app.config['CHUNK_CACHE_DISK_SIZE'] = int(os.environ.get('CHUNK_CACHE_DISK_SIZE', 1000000))
+# /api/predict/batch: decode threads (0 = CPU count) and archive extraction limit
+app.config['BATCH_DECODE_WORKERS'] = int(os.environ.get('BATCH_DECODE_WORKERS', 0))
+app.config['BATCH_MAX_EXTRACT_MB'] = int(os.environ.get('BATCH_MAX_EXTRACT_MB', 1024))
+# Prediction rows are written behind the request in batches of up to N rows or
+# every T ms (0 = insert and commit inside the request); optionally with chunk scores
+app.config['PREDICTION_FLUSH_ROWS'] = int(os.environ.get('PREDICTION_FLUSH_ROWS', 100))
+app.config['PREDICTION_FLUSH_MS'] = float(os.environ.get('PREDICTION_FLUSH_MS', 200))
+# Longest /api/history waits for queued rows before answering without them
+app.config['HISTORY_FLUSH_TIMEOUT_MS'] = float(os.environ.get('HISTORY_FLUSH_TIMEOUT_MS', 1000))
+app.config['PERSIST_CHUNK_SCORES'] = os.environ.get('PERSIST_CHUNK_SCORES', '0') == '1'
+# Share GRU input projections between overlapping chunks (exact; eager fp32 model only)
+app.config['SHARED_GRU_FRAMES'] = os.environ.get('SHARED_GRU_FRAMES', '0') == '1'
+# Fraction of voiced frames a chunk needs to be analyzed (0 disables VAD gating)
+app.config['VAD_MIN_SPEECH_RATIO'] = float(os.environ.get('VAD_MIN_SPEECH_RATIO', 0))
+# Uploads with at least this many seconds to analyze are decoded and scored block by
+# block in bounded memory (0 = every upload); two passes keep peak normalization exact
+app.config['STREAMING_MIN_SECONDS'] = float(os.environ.get('STREAMING_MIN_SECONDS', 300))
+app.config['STREAMING_TWO_PASS'] = os.environ.get('STREAMING_TWO_PASS', '1') == '1'
+# "int8" loads the quantized CPU model (checkpoint from quantize_model.py)
+app.config['MODEL_PRECISION'] = os.environ.get('MODEL_PRECISION', 'fp32')
+# eager | torchscript | onnxruntime (artifacts from export_model.py)
+app.config['INFERENCE_BACKEND'] = os.environ.get('INFERENCE_BACKEND', 'eager')
+app.config['ORT_NUM_THREADS'] = int(os.environ.get('ORT_NUM_THREADS', 0))
+# Memory-map the checkpoint (eager backend); weights stay in the shared page cache
+app.config['MODEL_MMAP'] = os.environ.get('MODEL_MMAP', '0') == '1'
+# Send chunk batches to a shared model_server.py process instead of loading the model here
+app.config['MODEL_SERVER_ADDRESS'] = os.environ.get('MODEL_SERVER_ADDRESS')
+# Intra-op threads for this process (0 = torch default); with several worker
+# processes per node, keep workers x threads (+ model server) at the physical cores
+app.config['TORCH_THREADS'] = int(os.environ.get('TORCH_THREADS', 0))
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 jwt = JWTManager(app)
+sock = Sock(app)
 
 # =========================
 # Database Setup (SQLite)
 # =========================
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'users.db')
 
+# Connections are reused across requests and job workers (WAL mode, see database.py)
+db_pool = ConnectionPool(DB_PATH)
+
 
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(DB_PATH)
-        g.db.row_factory = sqlite3.Row
+        g.db = db_pool.acquire()
     return g.db
 
 
@@ -57,36 +130,26 @@ def get_db():
 def close_db(exception):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        db_pool.release(db)
 
 
 def init_db():
-    db = sqlite3.connect(DB_PATH)
-    db.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    db.execute('''
-        CREATE TABLE IF NOT EXISTS predictions (
-            id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            filename TEXT NOT NULL,
-            label TEXT NOT NULL,
-            confidence REAL NOT NULL,
-            real_probability REAL NOT NULL,
-            fake_probability REAL NOT NULL,
-            raw_score REAL NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    ''')
-    db.commit()
-    db.close()
+    """Create the tables, apply pending schema migrations and enable WAL."""
+    applied = migrate(DB_PATH)
+    if applied:
+        print(f"Database migrated to schema version {applied[-1]}")
+
+
+init_db()
+
+# Flushed on interpreter exit, so queued predictions survive a normal shutdown
+prediction_writer = PredictionWriter(
+    DB_PATH,
+    max_batch_rows=app.config['PREDICTION_FLUSH_ROWS'],
+    max_delay_ms=app.config['PREDICTION_FLUSH_MS'],
+    persist_chunks=app.config['PERSIST_CHUNK_SCORES']
+)
+atexit.register(prediction_writer.close)
 
 
 def hash_password(password):
@@ -96,9 +159,111 @@ def hash_password(password):
 # =========================
 # Load Model on Startup
 # =========================
-MODEL_PATH = "hybrid_efficientnet_gru.pth"
-model, device = load_model(MODEL_PATH)
-print(f"Hybrid EfficientNet-GRU Model loaded successfully on {device}")
+# Milliseconds spent in each startup stage, reported by /api/health
+startup_timings = {}
+_last_startup_mark = BOOT_STARTED
+
+
+def mark_startup(stage):
+    global _last_startup_mark
+    now = time.perf_counter()
+    startup_timings[stage] = round((now - _last_startup_mark) * 1000, 1)
+    _last_startup_mark = now
+
+
+mark_startup("imports")
+
+if app.config['TORCH_THREADS']:
+    torch.set_num_threads(app.config['TORCH_THREADS'])
+
+MODEL_PATH = os.environ.get(
+    'MODEL_PATH', DEFAULT_MODEL_PATHS.get(app.config['INFERENCE_BACKEND'], "hybrid_efficientnet_gru.pth")
+)
+if app.config['MODEL_SERVER_ADDRESS']:
+    model = ModelClient(app.config['MODEL_SERVER_ADDRESS'])
+    model_info = model.info()
+    device = torch.device("cpu")
+    model_hash = model_info["model_hash"]
+    app.config['INFERENCE_BACKEND'] = model_info["backend"]
+    app.config['MODEL_PRECISION'] = model_info["precision"]
+else:
+    model, device = load_backend(
+        app.config['INFERENCE_BACKEND'], MODEL_PATH,
+        precision=app.config['MODEL_PRECISION'], num_threads=app.config['ORT_NUM_THREADS'],
+        mmap=app.config['MODEL_MMAP']
+    )
+    model_hash = hash_file(MODEL_PATH)
+mark_startup("model_load")
+frontend = MelFrontend().to(device)
+mark_startup("frontend")
+print(f"Hybrid EfficientNet-GRU Model ({app.config['INFERENCE_BACKEND']}, "
+      f"{app.config['MODEL_PRECISION']}) loaded successfully on {device}")
+
+# Chunks from concurrent jobs share forward passes through the batch scheduler
+batcher = None
+inference_model = model
+if app.config['MODEL_SERVER_ADDRESS']:
+    # The model server batches across all worker processes; its stats are reported
+    batcher = model
+elif app.config['DYNAMIC_BATCHING']:
+    batcher = BatchScheduler(
+        model,
+        max_batch_size=app.config['BATCH_MAX_SIZE'],
+        max_wait_ms=app.config['BATCH_MAX_WAIT_MS']
+    )
+    inference_model = batcher
+
+# Shared GRU frames batch a whole file's chunks themselves, so uploads run on
+# the model directly instead of through the batch scheduler
+shared_frames_model = None
+if app.config['SHARED_GRU_FRAMES']:
+    if supports_shared_frames(model):
+        shared_frames_model = model
+    else:
+        print("SHARED_GRU_FRAMES ignored: needs the eager fp32 model in this process")
+
+# Results of identical uploads are reused while the weights and chunking stay the same
+# (one-pass streaming normalizes long uploads differently, so it is part of the key)
+result_cache = ResultCache(
+    DB_PATH,
+    model_hash=model_hash,
+    params=(f"duration={CHUNK_DURATION},overlap={CHUNK_OVERLAP},aggregate=max,timeline=1,"
+            f"vad={app.config['VAD_MIN_SPEECH_RATIO']},precision={app.config['MODEL_PRECISION']}"
+            + ("" if app.config['STREAMING_TWO_PASS'] else ",normalize=running")),
+    max_entries=app.config['RESULT_CACHE_SIZE']
+)
+
+# Chunks shared with earlier uploads (e.g. re-encoded copies) skip the model
+chunk_cache = None
+if app.config['CHUNK_CACHE_SIZE'] > 0:
+    chunk_cache = ChunkCache(
+        f"{model_hash}:{app.config['MODEL_PRECISION']}",
+        max_entries=app.config['CHUNK_CACHE_SIZE'],
+        db_path=app.config['CHUNK_CACHE_DB'],
+        max_disk_entries=app.config['CHUNK_CACHE_DISK_SIZE']
+    )
+mark_startup("batching_and_cache")
+
+# Audio seconds seen vs. skipped by VAD gating
+vad_stats = {"audio_seconds": 0.0, "skipped_seconds": 0.0}
+vad_stats_lock = threading.Lock()
+
+
+def record_vad_stats(result, audio_seconds):
+    with vad_stats_lock:
+        vad_stats["audio_seconds"] += audio_seconds
+        vad_stats["skipped_seconds"] += audio_seconds * result.get("skipped_fraction", 0.0)
+
+
+def get_vad_stats():
+    with vad_stats_lock:
+        total = vad_stats["audio_seconds"]
+        return {
+            "enabled": app.config['VAD_MIN_SPEECH_RATIO'] > 0,
+            "audio_seconds": round(total, 2),
+            "skipped_seconds": round(vad_stats["skipped_seconds"], 2),
+            "skipped_fraction": round(vad_stats["skipped_seconds"] / total, 4) if total else None
+        }
 
 # =========================
 # Load Metrics
@@ -133,6 +298,41 @@ def server_error(e):
     return jsonify({"error": "Internal server error."}), 500
 
 
+# =========================
+# Request Metrics
+# =========================
+def metrics_endpoint():
+    """Route pattern of the current /api request (bounded label values), or None."""
+    rule = request.url_rule.rule if request.url_rule else None
+    return rule if rule and rule.startswith('/api/') else None
+
+
+@app.before_request
+def start_request_metrics():
+    endpoint = metrics_endpoint()
+    if endpoint:
+        g.request_started = time.perf_counter()
+        g.metrics_endpoint = endpoint
+        IN_FLIGHT.labels(endpoint).inc()
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = g.get('metrics_endpoint')
+    if endpoint:
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - g.request_started)
+    return response
+
+
+@app.teardown_request
+def end_request_metrics(exception):
+    # Runs after a streamed response has been sent
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint:
+        IN_FLIGHT.labels(endpoint).dec()
+
+
 # =========================
 # Auth Routes
 # =========================
@@ -245,70 +445,440 @@ def get_current_user():
 
 
 # =========================
-# Prediction Route
+# Prediction Jobs
 # =========================
-@app.route('/api/predict', methods=['POST'])
-@jwt_required()
-def predict_audio():
-    user_id = get_jwt_identity()
-    
+def save_upload():
+    """Validate the uploaded file and save it to the upload folder.
+
+    The upload is hashed while it is streamed to disk.
+
+    Returns:
+        Tuple of (filepath, filename, content_hash)
+
+    Raises:
+        ValueError: If the upload is missing, unsupported or empty
+    """
     # Check if file is present
     if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded. Please select an audio or video file."}), 400
+        raise ValueError("No file uploaded. Please select an audio or video file.")
     
     file = request.files['file']
     
     if file.filename == '':
-        return jsonify({"error": "No file selected."}), 400
+        raise ValueError("No file selected.")
     
     if not file.filename:
-        return jsonify({"error": "Invalid filename."}), 400
+        raise ValueError("Invalid filename.")
     
     # Check file extension
     if not is_allowed_file(file.filename):
         allowed = ', '.join(sorted(ALLOWED_EXTENSIONS))
-        return jsonify({
-            "error": f"Unsupported file format. Allowed formats: {allowed}"
-        }), 400
+        raise ValueError(f"Unsupported file format. Allowed formats: {allowed}")
     
     # Save uploaded file
     filename = secure_filename(file.filename)
     unique_filename = f"{uuid.uuid4()}_{filename}"
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    hasher = hashlib.sha256()
+    size = 0
+    with open(filepath, 'wb') as out:
+        for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+            hasher.update(block)
+            out.write(block)
+            size += len(block)
     
-    temp_audio_path = None
+    # Check file size (shouldn't be 0)
+    if size == 0:
+        os.remove(filepath)
+        raise ValueError("Uploaded file is empty.")
     
+    return filepath, filename, hasher.hexdigest()
+
+
+def record_prediction(user_id, filename, result, chunk_scores=None):
+    """Queue a prediction row for the user's history (see PredictionWriter)."""
+    prediction_writer.record(user_id, filename, result, chunk_scores)
+
+
+def get_aggregation():
+    """(aggregate, top_k, quantile) from the aggregate, k and q request values.
+
+    Raises:
+        ValueError: If the method or its parameter is invalid
+    """
+    aggregate = request.values.get('aggregate', 'max').lower()
+    try:
+        top_k = int(request.values.get('k', DEFAULT_TOP_K))
+        quantile = float(request.values.get('q', DEFAULT_QUANTILE))
+    except ValueError:
+        raise ValueError("k must be an integer and q a number.")
+    # Validates the method and its parameter
+    aggregate_probabilities([0.0], aggregate, top_k, quantile)
+    return aggregate, top_k, quantile
+
+
+def get_time_range():
+    """(start, duration) from the start, end and max_duration request values (seconds).
+
+    Returns:
+        None when the whole file is analyzed (see resolve_time_range)
+
+    Raises:
+        ValueError: If a value is not a number or the range is empty
+    """
+    values = {}
+    for name in ('start', 'end', 'max_duration'):
+        raw = request.values.get(name, '')
+        if not raw:
+            continue
+        try:
+            value = float(raw)
+        except ValueError:
+            value = math.nan
+        if not math.isfinite(value):
+            raise ValueError(f"{name} must be a number of seconds.")
+        values[name] = value
+    return resolve_time_range(**values)
+
+
+def range_cache_key(content_hash, time_range):
+    """Result cache key of an upload analyzed over `time_range` (None for the whole file)."""
+    if time_range is None:
+        return content_hash
+    start, duration = time_range
+    end = '' if duration is None else f"{start + duration:g}"
+    return f"{content_hash}@{start:g}-{end}"
+
+
+def use_bounded_memory(filepath, time_range):
+    """Whether an upload is long enough to be streamed (STREAMING_MIN_SECONDS).
+
+    Uploads whose duration the header does not give are streamed too.
+    """
+    if app.config['STREAMING_MIN_SECONDS'] <= 0:
+        return True
+    seconds = media_duration(filepath)
+    if seconds is None:
+        return True
+    if time_range is not None:
+        start, duration = time_range
+        seconds = max(seconds - start, 0) if duration is None else min(seconds - start, duration)
+    return seconds >= app.config['STREAMING_MIN_SECONDS']
+
+
+def run_prediction(filepath, filename, user_id, content_hash, early_exit=False, timer=None,
+                   include_timings=False, aggregation=("max",), time_range=None):
+    """Analyze a saved upload and record the prediction (runs on a job worker).
+
+    With early_exit, chunks are scanned coarse-to-fine and scoring stops once
+    the verdict is settled (see predict_early_exit). The uploaded file is
+    always removed afterwards. Stage durations are collected in `timer` (an
+    instrumentation.StageTimer) and returned as "timings" if include_timings.
+    The verdict uses the given (aggregate, top_k, quantile) (get_aggregation);
+    the result cache keeps the max-aggregated result, with its timeline.
+    With a (start, duration) `time_range`, only that span is decoded and
+    scored; result times are file times and "range" gives the span. Long
+    uploads (use_bounded_memory) are decoded and scored block by block
+    (ingest.predict_file_stream) instead of being loaded whole; early exit
+    always loads the file.
+
+    Returns:
+        Prediction result dict
+    """
+    timer = timer or StageTimer()
+    timer.since_last_stage("queue_wait")
+    chunk_scores = [] if app.config['PERSIST_CHUNK_SCORES'] else None
+    start, duration = time_range or (None, None)
     try:
-        file.save(filepath)
+        if not early_exit and use_bounded_memory(filepath, time_range):
+            # Long upload: decoded and scored block by block, never held in memory whole
+            result = predict_file_stream(
+                inference_model, device, filepath, app.config['INFERENCE_BATCH_SIZE'], frontend, chunk_cache,
+                min_speech_ratio=app.config['VAD_MIN_SPEECH_RATIO'] or None,
+                two_pass=app.config['STREAMING_TWO_PASS'], start=start, duration=duration,
+                timings=timer, chunk_scores=chunk_scores
+            )
+            audio_seconds = result.pop("audio_seconds")
+        else:
+            # Preprocess audio (full waveform or the requested span); video audio is decoded in memory
+            if is_video_file(filename):
+                with timer.stage("video_extraction"):
+                    y = load_audio(filepath, start=start, duration=duration)
+                y, sr = normalize_audio(y, 16000)
+            else:
+                y, sr = preprocess_audio(filepath, timings=timer, start=start, duration=duration)
+            audio_seconds = len(y) / sr
+
+            # Get prediction from hybrid model using sliding window
+            if early_exit:
+                result = predict_early_exit(
+                    inference_model, device, y, sr,
+                    batch_size=app.config['INFERENCE_BATCH_SIZE'], frontend=frontend,
+                    min_speech_ratio=app.config['VAD_MIN_SPEECH_RATIO'] or None, chunk_cache=chunk_cache,
+                    timings=timer, chunk_scores=chunk_scores
+                )
+            else:
+                result = predict_robust(
+                    shared_frames_model or inference_model, device, y, sr, app.config['INFERENCE_BATCH_SIZE'],
+                    frontend, min_speech_ratio=app.config['VAD_MIN_SPEECH_RATIO'] or None, chunk_cache=chunk_cache,
+                    shared_frames=shared_frames_model is not None, timings=timer, chunk_scores=chunk_scores
+                )
+        record_vad_stats(result, audio_seconds)
+        if time_range is not None:
+            result = offset_result_times(result, start, audio_seconds)
+            if chunk_scores:
+                chunk_scores[:] = [(index, offset + start, p) for index, offset, p in chunk_scores]
+        if not early_exit:
+            # Early-exit scores cover only part of the file, so only full runs are cached
+            result_cache.put(range_cache_key(content_hash, time_range), result)
+        result = dict(apply_aggregate(result, *aggregation), filename=filename, cached=False)
+        count_audio("predict", audio_seconds, result["chunks_scored"])
         
-        # Check file size (shouldn't be 0)
-        if os.path.getsize(filepath) == 0:
-            return jsonify({"error": "Uploaded file is empty."}), 400
+        # Save prediction to database
+        with timer.stage("db_write"):
+            record_prediction(user_id, filename, result, chunk_scores)
         
-        # If video, extract audio first
-        audio_path = filepath
-        if is_video_file(filename):
-            temp_audio_path = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{uuid.uuid4()}.wav")
-            audio_path = extract_audio_from_video(filepath, temp_audio_path)
+        if include_timings:
+            result["timings"] = timer.to_dict()
+        return result
         
-        # Preprocess audio (full waveform)
-        y, sr = preprocess_audio(audio_path)
+    except ValueError as e:
+        raise JobError(str(e), 400)
+    except Exception as e:
+        raise JobError(f"An error occurred during prediction: {str(e)}", 500)
+    finally:
+        timer.observe()
+        # Clean up uploaded file
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+
+job_queue = JobQueue(
+    run_prediction,
+    num_workers=app.config['INFERENCE_WORKERS'],
+    max_queue=app.config['JOB_QUEUE_SIZE']
+)
+mark_startup("job_queue")
+startup_timings["total"] = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+print("Startup time (ms): " + ", ".join(f"{stage}={ms}" for stage, ms in startup_timings.items()))
+
+
+def submit_prediction(user_id):
+    """Save the upload and queue it for analysis.
+
+    Uploads whose content was analyzed before are answered from the result
+    cache straight away (still recorded in the user's history). With the
+    form field or query parameter timings=1, the result includes per-stage
+    durations in milliseconds. aggregate=max|mean|topk|quantile (with k or
+    q) chooses how the chunk scores combine into the verdict; every result
+    has the per-window timeline and suspicious segments either way. start,
+    end and max_duration (seconds) restrict the analysis to that span of
+    the file, which is the only part decoded.
+
+    Returns:
+        Tuple of (job, None) on success, or (None, error_response)
+    """
+    timer = StageTimer()
+    include_timings = request.values.get('timings', '').lower() in ('1', 'true', 'yes')
+    early_exit = request.values.get('early_exit', '').lower() in ('1', 'true', 'yes')
+    try:
+        aggregation = get_aggregation()
+        if early_exit and aggregation[0] != 'max':
+            raise ValueError("early_exit only supports aggregate=max.")
+        time_range = get_time_range()
+        with timer.stage("upload_save"):
+            filepath, filename, content_hash = save_upload()
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    
+    cached = result_cache.get(range_cache_key(content_hash, time_range))
+    if cached is not None:
+        os.remove(filepath)
+        result = dict(apply_aggregate(cached, *aggregation), filename=filename, cached=True)
+        with timer.stage("db_write"):
+            record_prediction(user_id, filename, result)
+        timer.observe()
+        if include_timings:
+            result["timings"] = timer.to_dict()
+        return job_queue.add_completed(user_id, result), None
+    
+    try:
+        return job_queue.submit(
+            user_id, filepath, filename, user_id, content_hash, early_exit, timer, include_timings, aggregation,
+            time_range
+        ), None
+    except QueueFullError as e:
+        os.remove(filepath)
+        return None, (jsonify({"error": str(e)}), 429)
+
+
+# =========================
+# Prediction Routes
+# =========================
+@app.route('/api/predict', methods=['POST'])
+@jwt_required()
+def predict_audio():
+    """Synchronous prediction: queue the upload and wait for its result."""
+    job, error = submit_prediction(get_jwt_identity())
+    if error:
+        return error
+    
+    job.done.wait()
+    if job.status == 'failed':
+        return jsonify({"error": job.error}), job.error_status
+    return jsonify(job.result), 200
+
+
+@app.route('/api/predict/jobs', methods=['POST'])
+@jwt_required()
+def submit_prediction_job():
+    job, error = submit_prediction(get_jwt_identity())
+    if error:
+        return error
+    
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "queue": job_queue.stats()
+    }), 202
+
+
+@app.route('/api/predict/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_prediction_job(job_id):
+    job = job_queue.get(job_id, owner=get_jwt_identity())
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job.to_dict()), 200
+
+
+# Decode threads for batch requests, started on first use (spawned processes
+# would re-import this module, loading another model and starting its workers)
+decode_pool = None
+decode_pool_lock = threading.Lock()
+
+
+def get_decode_pool():
+    global decode_pool
+    with decode_pool_lock:
+        if decode_pool is None:
+            decode_pool = create_decode_pool(app.config['BATCH_DECODE_WORKERS'] or None, threads=True)
+        return decode_pool
+
+
+@app.route('/api/predict/batch', methods=['POST'])
+@jwt_required()
+def predict_audio_batch():
+    """Score several files at once: multipart 'files' fields, and/or zip/tar archives.
+
+    Files are decoded in parallel and their chunks share inference batches.
+    The response is JSON lines (application/x-ndjson), one record per file
+    as it finishes, followed by a summary record with total throughput.
+    aggregate (with k or q) and start/end/max_duration apply to every file,
+    as in /api/predict.
+    """
+    user_id = get_jwt_identity()
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    uploads = [upload for upload in uploads if upload.filename]
+    
+    if not uploads:
+        return jsonify({"error": "No files uploaded. Send one or more 'files' fields."}), 400
+    
+    try:
+        aggregation = get_aggregation()
+        time_range = get_time_range()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    workdir = tempfile.mkdtemp(prefix="batch_", dir=app.config['UPLOAD_FOLDER'])
+    try:
+        saved = []
+        for index, upload in enumerate(uploads):
+            filename = secure_filename(upload.filename)
+            if not (is_allowed_file(filename) or is_archive(filename)):
+                continue
+            path = os.path.join(workdir, f"upload_{index}_{filename}")
+            upload.save(path)
+            saved.append((filename, path))
+        inputs = collect_inputs(saved, workdir, app.config['BATCH_MAX_EXTRACT_MB'] * 1024 * 1024)
+        if not inputs:
+            allowed = ', '.join(sorted(ALLOWED_EXTENSIONS))
+            raise ValueError(f"No supported files found. Allowed formats: {allowed}, or zip/tar archives")
+    except ValueError as e:
+        shutil.rmtree(workdir, ignore_errors=True)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        shutil.rmtree(workdir, ignore_errors=True)
+        return jsonify({"error": f"An error occurred during prediction: {str(e)}"}), 500
+    
+    def generate():
+        try:
+            for record in score_files(
+                inference_model, device, inputs, get_decode_pool(),
+                batch_size=app.config['INFERENCE_BATCH_SIZE'], frontend=frontend, chunk_cache=chunk_cache,
+                time_range=time_range, max_pending=2 * (app.config['BATCH_DECODE_WORKERS'] or os.cpu_count())
+            ):
+                if "label" in record:
+                    record = apply_aggregate(record, *aggregation)
+                    count_audio("batch", record["audio_seconds"], record["chunks_scored"])
+                    record_prediction(user_id, record["file"], record)
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"An error occurred during prediction: {str(e)}"}) + "\n"
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/predict/stream', methods=['POST'])
+@jwt_required()
+def predict_audio_stream():
+    """Streaming prediction: the raw request body is the file (not multipart).
+
+    The body is decoded as it arrives and chunks are scored as soon as they
+    are complete, so nothing is staged on disk except containers that need
+    seeking (mp4/m4a/mov). Pass the original name as ?filename=...
+    ?aggregate= (with ?k= or ?q=) and ?start=, ?end=, ?max_duration= work
+    as in /api/predict.
+    """
+    user_id = get_jwt_identity()
+    filename = secure_filename(request.args.get('filename', ''))
+    
+    if not filename:
+        return jsonify({"error": "Missing filename query parameter."}), 400
+    
+    if not is_allowed_file(filename):
+        allowed = ', '.join(sorted(ALLOWED_EXTENSIONS))
+        return jsonify({
+            "error": f"Unsupported file format. Allowed formats: {allowed}"
+        }), 400
+    
+    spooled_path = None
+    
+    try:
+        aggregation = get_aggregation()
+        time_range = get_time_range()
+        start, duration = time_range or (None, None)
+        source = request.stream
+        if needs_seekable_input(filename):
+            spooled_path = spool_stream(
+                request.stream, os.path.splitext(filename)[1], dir=app.config['UPLOAD_FOLDER']
+            )
+            source = spooled_path
         
-        # Get prediction from hybrid model using sliding window
-        result = predict_robust(model, device, y, sr)
+        result = predict_stream(
+            inference_model, device, decode_audio_blocks(source, start=start, duration=duration),
+            batch_size=app.config['INFERENCE_BATCH_SIZE'], frontend=frontend, chunk_cache=chunk_cache
+        )
+        if time_range is not None:
+            result = offset_result_times(result, start, result["audio_seconds"])
+        result = apply_aggregate(result, *aggregation)
         result['filename'] = filename
+        result['cached'] = False
+        count_audio("stream", result["audio_seconds"], result["chunks_scored"])
         
-        # Save prediction to database
-        db = get_db()
-        pred_id = str(uuid.uuid4())
-        db.execute(
-            '''INSERT INTO predictions 
-            (id, user_id, filename, label, confidence, real_probability, fake_probability, raw_score) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-            (pred_id, user_id, filename, result['label'], result['confidence'],
-             result['real_probability'], result['fake_probability'], result['raw_score'])
-        )
-        db.commit()
+        record_prediction(user_id, filename, result)
         
         return jsonify(result), 200
         
@@ -317,11 +887,42 @@ def predict_audio():
     except Exception as e:
         return jsonify({"error": f"An error occurred during prediction: {str(e)}"}), 500
     finally:
-        # Clean up uploaded and temp files
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        if temp_audio_path and os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
+        if spooled_path and os.path.exists(spooled_path):
+            os.remove(spooled_path)
+
+
+@sock.route('/api/predict/live')
+def predict_audio_live(ws):
+    """Real-time detection over a WebSocket (e.g. live call monitoring).
+
+    Binary messages carry audio as it is captured, in ?format= pcm_s16le
+    (default) or pcm_f32le at 16 kHz mono, or opus (an Ogg/WebM Opus stream).
+    A window covering the last 4 s is scored every 2 s. Each window is pushed
+    back as a JSON message with its probability, the running max-aggregated
+    verdict and the latency from audio arrival to score. Send the text
+    message "end" to get the final result, which is recorded in the history.
+    Browsers cannot set headers on WebSockets, so the token can be passed as
+    ?jwt=...; ?name= sets the history entry's name.
+    """
+    try:
+        verify_jwt_in_request(locations=['headers', 'query_string'])
+    except Exception as e:
+        ws.send(json.dumps({"type": "error", "error": f"Unauthorized: {str(e)}"}))
+        return
+    
+    user_id = get_jwt_identity()
+    fmt = request.args.get('format', LIVE_FORMATS[0])
+    if fmt not in LIVE_FORMATS:
+        ws.send(json.dumps({
+            "type": "error", "error": f"Unsupported format. Allowed formats: {', '.join(LIVE_FORMATS)}"
+        }))
+        return
+    name = secure_filename(request.args.get('name', '')) or f"live_{time.strftime('%Y%m%d_%H%M%S')}"
+    
+    result = run_session(LiveDetector(inference_model, device), ws, fmt)
+    if result:
+        count_audio("live", result["audio_seconds"], result["chunks_scored"])
+        record_prediction(user_id, name, result)
 
 
 # =========================
@@ -330,13 +931,24 @@ def predict_audio():
 @app.route('/api/history', methods=['GET'])
 @jwt_required()
 def get_history():
+    """The user's predictions, newest first, one page at a time.
+
+    ?limit= sets the page size (default 50, at most 200). Pass the returned
+    next_cursor as ?cursor= for the following page; it is null on the last.
+    """
     user_id = get_jwt_identity()
-    db = get_db()
     
-    predictions = db.execute(
-        'SELECT * FROM predictions WHERE user_id = ? ORDER BY created_at DESC LIMIT 50',
-        (user_id,)
-    ).fetchall()
+    limit = request.args.get('limit', str(HISTORY_PAGE_SIZE))
+    if not limit.isdigit() or not 1 <= int(limit) <= HISTORY_MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be an integer between 1 and {HISTORY_MAX_PAGE_SIZE}."}), 400
+    
+    # Include predictions still queued in the write-behind buffer, unless the
+    # writer is stuck (e.g. retrying a failing batch): then answer without them
+    prediction_writer.flush(timeout=app.config['HISTORY_FLUSH_TIMEOUT_MS'] / 1000)
+    try:
+        predictions, next_cursor = fetch_history(get_db(), user_id, int(limit), request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     return jsonify({
         "predictions": [
@@ -350,7 +962,8 @@ def get_history():
                 "created_at": p['created_at']
             }
             for p in predictions
-        ]
+        ],
+        "next_cursor": next_cursor
     }), 200
 
 
@@ -418,14 +1031,36 @@ def how_it_works():
 # =========================
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "model_loaded": True}), 200
+    return jsonify({
+        "status": "healthy",
+        "model_loaded": True,
+        "model_precision": app.config['MODEL_PRECISION'],
+        "inference_backend": app.config['INFERENCE_BACKEND'],
+        "shared_gru_frames": shared_frames_model is not None,
+        "startup_ms": startup_timings,
+        "queue": job_queue.stats(),
+        "batching": batcher.stats() if batcher else None,
+        "result_cache": result_cache.stats(),
+        "chunk_cache": chunk_cache.stats() if chunk_cache else None,
+        "prediction_writer": prediction_writer.stats(),
+        "vad": get_vad_stats()
+    }), 200
+
+
+# =========================
+# Prometheus Metrics
+# =========================
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (request, stage and throughput metrics)."""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
 
 
 # =========================
 # Run
 # =========================
 if __name__ == '__main__':
-    init_db()
     # Generate metrics if not exists
     if not os.path.exists(METRICS_PATH):
         from generate_metrics import generate_metrics
@@ -437,8 +1072,14 @@ if __name__ == '__main__':
     print("  POST /api/auth/login")
     print("  GET  /api/auth/me")
     print("  POST /api/predict")
+    print("  POST /api/predict/jobs")
+    print("  GET  /api/predict/jobs/<id>")
+    print("  POST /api/predict/stream")
+    print("  POST /api/predict/batch")
+    print("  WS   /api/predict/live")
     print("  GET  /api/history")
     print("  GET  /api/metrics")
+    print("  GET  /metrics")
     print("  GET  /api/how-it-works")
     print("  GET  /api/health")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,273 @@
+"""
+Batch scoring of many files — whole directories, zip or tar archives.
+Files are decoded in parallel by a process pool while the main process scores
+their chunks in shared micro-batches (chunks from different files fill the
+same forward pass), and a JSON-lines record is emitted as each file finishes.
+
+Usage (from the repo root):
+    python -m backend.batch score real fake [--model backend/hybrid_efficientnet_gru.pth]
+    python -m backend.batch score uploads.zip --workers 4 --output results.jsonl
+    python -m backend.batch score long_recordings/ --start 600 --end 900
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from werkzeug.utils import secure_filename
+
+from model import (
+    preprocess_audio, normalize_audio, get_audio_chunks, get_chunk_offsets, predict_chunks, build_result,
+    add_timeline, offset_result_times, resolve_time_range, is_allowed_file, is_video_file, DEFAULT_BATCH_SIZE
+)
+from ingest import load_audio
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _extract_member(read, name, workdir, index, budget):
+    """Copy one archive member into workdir, charging its size to the byte budget."""
+    path = os.path.join(workdir, f"{index}_{secure_filename(os.path.basename(name)) or 'file'}")
+    with read() as src, open(path, 'wb') as dst:
+        for block in iter(lambda: src.read(1024 * 1024), b''):
+            budget[0] -= len(block)
+            if budget[0] < 0:
+                raise ValueError("Archive contents exceed the extraction size limit")
+            dst.write(block)
+    return path
+
+
+def collect_inputs(paths, workdir, max_extract_bytes=None):
+    """Expand files, directories and archives into (name, path) pairs to score.
+
+    Directories are walked recursively and archive members are extracted
+    into `workdir`; anything without a supported audio/video extension is
+    skipped.
+
+    Args:
+        paths: List of paths, or of (display name, path) pairs
+        workdir: Directory archive members are extracted to
+        max_extract_bytes: Limit on the total extracted size (None = no limit)
+
+    Raises:
+        ValueError: If an archive is unreadable or exceeds the size limit
+    """
+    budget = [max_extract_bytes if max_extract_bytes is not None else float('inf')]
+    inputs = []
+    for item in paths:
+        name, path = item if isinstance(item, tuple) else (item, item)
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if is_allowed_file(filename):
+                        full = os.path.join(root, filename)
+                        inputs.append((os.path.join(name, os.path.relpath(full, path)), full))
+        elif is_archive(name):
+            try:
+                if name.lower().endswith('.zip'):
+                    with zipfile.ZipFile(path) as archive:
+                        for member in archive.infolist():
+                            if not member.is_dir() and is_allowed_file(member.filename):
+                                extracted = _extract_member(
+                                    lambda m=member: archive.open(m), member.filename, workdir, len(inputs), budget
+                                )
+                                inputs.append((f"{name}/{member.filename}", extracted))
+                else:
+                    with tarfile.open(path) as archive:
+                        for member in archive:
+                            if member.isfile() and is_allowed_file(member.name):
+                                extracted = _extract_member(
+                                    lambda m=member: archive.extractfile(m), member.name, workdir, len(inputs), budget
+                                )
+                                inputs.append((f"{name}/{member.name}", extracted))
+            except (zipfile.BadZipFile, tarfile.TarError) as e:
+                raise ValueError(f"Could not read archive {name}: {e}")
+        elif is_allowed_file(name):
+            inputs.append((name, path))
+    return inputs
+
+
+def decode_file(path, name=None, time_range=None):
+    """Decode and normalize one file, or its (start, duration) `time_range` (runs in a pool worker process).
+
+    Returns:
+        Tuple of (waveform, sample rate, decode seconds)
+    """
+    started = time.perf_counter()
+    start, duration = time_range or (None, None)
+    if is_video_file(name or path):
+        y, sr = normalize_audio(load_audio(path, start=start, duration=duration), 16000)
+    else:
+        y, sr = preprocess_audio(path, start=start, duration=duration)
+    return y, sr, time.perf_counter() - started
+
+
+def create_decode_pool(workers=None, threads=False):
+    """Pool for decode_file: spawned processes, or threads with `threads`.
+
+    Spawned workers re-import the launching script as __mp_main__, so
+    processes only suit side-effect-free entry points such as this CLI. The
+    API server uses threads instead: decoding spends its time in libsndfile,
+    soxr, numpy and ffmpeg subprocesses, which run outside the GIL.
+    """
+    if threads:
+        return ThreadPoolExecutor(max_workers=workers or os.cpu_count(), thread_name_prefix="decode")
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=mp.get_context("spawn"))
+
+
+def score_files(model, device, inputs, executor, batch_size=DEFAULT_BATCH_SIZE, frontend=None,
+                chunk_cache=None, time_range=None, max_pending=None):
+    """Score files, yielding one result dict per file as it finishes, then a summary.
+
+    Decoding runs on `executor`, at most `max_pending` files at a time: the
+    next file is submitted only when a decoded one is taken, so decoded
+    waveforms waiting for inference stay bounded however many files there
+    are. Chunks of decoded files are queued and scored `batch_size` at a
+    time across files; whenever no decode has finished yet, the queued
+    chunks are scored right away instead of waiting for a full batch.
+
+    Args:
+        inputs: List of (name, path) pairs (see collect_inputs)
+        executor: Pool from create_decode_pool
+        time_range: Optional (start, duration) span of every file to score
+            (resolve_time_range); record times are file times
+        max_pending: Files submitted but not yet taken off the pool
+            (default: 2 per CPU; pass 2x the pool's workers)
+
+    Yields:
+        {"file", label/probability and timeline fields, "audio_seconds", "decode_ms", "latency_ms"}
+        or {"file", "error"} per file, and finally {"summary": {...}}
+    """
+    started = time.perf_counter()
+    max_pending = max_pending or 2 * (os.cpu_count() or 1)
+    pending_inputs = iter(enumerate(inputs))
+    futures = {}  # future → (input index, name)
+    files = {}  # input index → decoded file state
+    queue = []  # (input index, chunk) in arrival order
+    totals = {"files": 0, "failed": 0, "audio_seconds": 0.0, "chunks": 0}
+
+    def score(batch):
+        sr = files[batch[0][0]]["sr"]
+        probabilities = predict_chunks(model, device, [chunk for _, chunk in batch], sr, batch_size,
+                                       frontend, chunk_cache)
+        for (index, _), probability in zip(batch, probabilities):
+            state = files[index]
+            state["probabilities"].append(probability)
+            if len(state["probabilities"]) == state["num_chunks"]:
+                del files[index]
+                totals["files"] += 1
+                totals["chunks"] += state["num_chunks"]
+                scored = [(i, offset / state["sr"], p) for i, (offset, p)
+                          in enumerate(zip(state["offsets"], state["probabilities"]))]
+                result = add_timeline(build_result(state["probabilities"]), scored, state["audio_seconds"])
+                if time_range is not None:
+                    result = offset_result_times(result, time_range[0], state["audio_seconds"])
+                yield dict(
+                    result,
+                    file=state["name"],
+                    audio_seconds=round(state["audio_seconds"], 3),
+                    decode_ms=round(state["decode_seconds"] * 1000, 2),
+                    latency_ms=round((time.perf_counter() - started) * 1000, 2)
+                )
+
+    def submit_next():
+        item = next(pending_inputs, None)
+        if item is not None:
+            index, (name, path) = item
+            futures[executor.submit(decode_file, path, name, time_range)] = (index, name)
+
+    for _ in range(max_pending):
+        submit_next()
+    while futures or queue:
+        done, _ = wait(futures, timeout=0 if queue else None, return_when=FIRST_COMPLETED)
+        if not done:
+            # Nothing newly decoded: keep inference busy with what is queued
+            batch, queue = queue[:batch_size], queue[batch_size:]
+            yield from score(batch)
+            continue
+
+        for future in done:
+            index, name = futures.pop(future)
+            submit_next()
+            try:
+                y, sr, decode_seconds = future.result()
+            except Exception as e:
+                totals["failed"] += 1
+                yield {"file": name, "error": str(e)}
+                continue
+            chunks = get_audio_chunks(y, sr)
+            files[index] = {"name": name, "sr": sr, "num_chunks": len(chunks), "probabilities": [],
+                            "offsets": get_chunk_offsets(len(y), sr),
+                            "audio_seconds": len(y) / sr, "decode_seconds": decode_seconds}
+            totals["audio_seconds"] += len(y) / sr
+            queue.extend((index, chunk) for chunk in chunks)
+
+        while len(queue) >= batch_size:
+            batch, queue = queue[:batch_size], queue[batch_size:]
+            yield from score(batch)
+
+    wall = time.perf_counter() - started
+    yield {"summary": {
+        "files": totals["files"],
+        "failed": totals["failed"],
+        "chunks": totals["chunks"],
+        "audio_seconds": round(totals["audio_seconds"], 2),
+        "wall_seconds": round(wall, 2),
+        "audio_seconds_per_second": round(totals["audio_seconds"] / wall, 2) if wall else None
+    }}
+
+
+def main():
+    from inference import load_backend, DEFAULT_MODEL_PATHS, INFERENCE_BACKENDS
+
+    parser = argparse.ArgumentParser(description="Batch deepfake scoring")
+    commands = parser.add_subparsers(dest="command", required=True)
+    score_parser = commands.add_parser("score", help="Score files, directories or zip/tar archives")
+    score_parser.add_argument("paths", nargs="+")
+    score_parser.add_argument("--backend", default="eager", choices=INFERENCE_BACKENDS)
+    score_parser.add_argument("--model", default=None, help="Defaults to the backend's artifact in backend/")
+    score_parser.add_argument("--workers", type=int, default=None, help="Decode processes (default: CPU count)")
+    score_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    score_parser.add_argument("--output", default=None, help="JSON-lines file (default: stdout)")
+    score_parser.add_argument("--start", type=float, default=None, help="Score each file from this second")
+    score_parser.add_argument("--end", type=float, default=None, help="Score each file up to this second")
+    score_parser.add_argument("--max-duration", type=float, default=None, help="Seconds scored per file at most")
+    args = parser.parse_args()
+    try:
+        time_range = resolve_time_range(args.start, args.end, args.max_duration)
+    except ValueError as e:
+        parser.error(str(e))
+
+    model_path = args.model or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            DEFAULT_MODEL_PATHS[args.backend])
+    model, device = load_backend(args.backend, model_path)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    workdir = tempfile.mkdtemp(prefix="batch_")
+    try:
+        inputs = collect_inputs(args.paths, workdir)
+        with create_decode_pool(args.workers) as executor:
+            for record in score_files(model, device, inputs, executor, args.batch_size, time_range=time_range,
+                                      max_pending=2 * (args.workers or os.cpu_count())):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
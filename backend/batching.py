@@ -0,0 +1,129 @@
+"""
+Cross-request dynamic batching for the FusionModel.
+Chunk batches submitted by concurrent requests are coalesced into a single
+forward pass once either the maximum batch size or the maximum wait time is
+reached, then each request gets back its own slice of the logits.
+"""
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+
+class _Request:
+    def __init__(self, spec, temp):
+        self.spec = spec
+        self.temp = temp
+        self.size = spec.shape[0]
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+
+
+class BatchScheduler:
+    """Drop-in stand-in for a FusionModel that batches calls across threads.
+
+    Calling the scheduler as scheduler(spec, temp) blocks until the chunks
+    have been scored as part of a shared batch and returns their logits, so
+    it can be passed anywhere model.predict_batch / predict_robust expect a
+    model.
+
+    Args:
+        model: Loaded FusionModel (in eval mode)
+        max_batch_size: Maximum number of chunks per forward pass
+        max_wait_ms: Longest time the first queued chunk waits for company
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=10):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._pending = None
+        self._lock = threading.Lock()
+        self._histogram = collections.Counter()
+        self._waits = collections.deque(maxlen=10000)
+        self._thread = threading.Thread(target=self._dispatch, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def __call__(self, spec, temp):
+        request = _Request(spec, temp)
+        self._queue.put(request)
+        return request.future.result()
+
+    def stats(self):
+        """Batch-size histogram and queue wait percentiles (ms) so far."""
+        with self._lock:
+            histogram = dict(sorted(self._histogram.items()))
+            waits = sorted(self._waits)
+
+        def percentile(q):
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 3) if waits else None
+
+        batches = sum(histogram.values())
+        chunks = sum(size * count for size, count in histogram.items())
+        return {
+            "batches": batches,
+            "chunks": chunks,
+            "mean_batch_size": round(chunks / batches, 2) if batches else None,
+            "batch_size_histogram": histogram,
+            "queue_wait_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": percentile(1.0)
+            }
+        }
+
+    def _next_request(self, timeout=None):
+        if self._pending is not None:
+            request, self._pending = self._pending, None
+            return request
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect(self):
+        """Block for one request, then gather more until the batch is full or times out."""
+        batch = [self._next_request()]
+        size = batch[0].size
+        deadline = batch[0].enqueued_at + self.max_wait
+
+        while size < self.max_batch_size:
+            request = self._next_request(timeout=max(deadline - time.monotonic(), 0))
+            if request is None:
+                break
+            # Requests that would overflow the batch, or have a different
+            # temporal length, start the next batch instead
+            if size + request.size > self.max_batch_size or request.temp.shape[1:] != batch[0].temp.shape[1:]:
+                self._pending = request
+                break
+            batch.append(request)
+            size += request.size
+
+        return batch, size
+
+    def _dispatch(self):
+        while True:
+            batch, size = self._collect()
+            started = time.monotonic()
+            with self._lock:
+                self._histogram[size] += 1
+                self._waits.extend(started - request.enqueued_at for request in batch)
+
+            try:
+                spec = torch.cat([request.spec for request in batch])
+                temp = torch.cat([request.temp for request in batch])
+                with torch.no_grad():
+                    logits = self.model(spec, temp).reshape(-1)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                request.future.set_result(logits[offset:offset + request.size])
+                offset += request.size
@@ -0,0 +1,133 @@
+"""
+Hit-rate and accuracy check for the per-chunk fingerprint cache.
+
+Scores the bundled real/ and fake/ samples (tiled to --tile-seconds) once to
+fill a ChunkCache, then scores copies of them that differ at the byte level:
+re-encoded to MP3 and Opus, and trimmed by one hop (2 s) at the start. For
+each variant it reports the chunk hit rate, the largest chunk-score
+difference between cached and uncached scoring, label agreement and
+latency. The first pass must not hit at all: distinct clips should never
+match each other's fingerprints. Neither may the splice variants, where
+every chunk has 0.25 s or 0.5 s of another clip's speech (its loudest
+stretch) pasted in, as a word-level edit of a known clip would.
+
+Usage (from the repo root or backend/):
+    python backend/bench_chunk_cache.py --model backend/hybrid_efficientnet_gru.pth [--disk]
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    load_model, preprocess_audio, normalize_audio, get_audio_chunks, predict_chunks,
+    CHUNK_DURATION, CHUNK_OVERLAP
+)
+from cache import ChunkCache
+from ingest import get_ffmpeg_exe, load_audio
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SPLICE_SECONDS = (0.25, 0.5)
+
+
+def encode(wav_path, out_path, codec_args):
+    subprocess.run([get_ffmpeg_exe(), "-v", "error", "-y", "-i", wav_path] + codec_args + [out_path], check=True)
+
+
+def splice(y, donor, sr, seconds, rng):
+    """Paste the loudest `seconds` of `donor` once into every hop of `y`, at a random position."""
+    n = int(seconds * sr)
+    energy = np.convolve(donor ** 2, np.ones(n), mode="valid")
+    segment = donor[int(np.argmax(energy)):][:n]
+    hop = (CHUNK_DURATION - CHUNK_OVERLAP) * sr
+    spliced = y.copy()
+    for start in range(0, len(y) - n, hop):
+        position = start + int(rng.integers(0, min(hop, len(y) - start) - n + 1))
+        spliced[position:position + n] = segment
+    return spliced
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk fingerprint cache hit-rate check")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--tile-seconds", type=float, default=20)
+    parser.add_argument("--disk", action="store_true", help="Also exercise the SQLite tier")
+    args = parser.parse_args()
+
+    model, device = load_model(args.model)
+    hop = (CHUNK_DURATION - CHUNK_OVERLAP)
+
+    files = []
+    for folder in ("real", "fake"):
+        files += sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ChunkCache("bench", db_path=os.path.join(tmp, "chunks.db") if args.disk else None)
+        variants = {"original": [], "mp3 128k": [], "opus 64k": [], f"trim {hop}s": []}
+        variants.update({f"splice {seconds}s": [] for seconds in SPLICE_SECONDS})
+        tiled = []
+        for path in files:
+            y, sr = preprocess_audio(path)
+            tiled.append(np.tile(y, int(np.ceil(args.tile_seconds * sr / len(y))))[:int(args.tile_seconds * sr)])
+        rng = np.random.default_rng(0)
+        for index, y in enumerate(tiled):
+            wav = os.path.join(tmp, "clip.wav")
+            sf.write(wav, y, sr, subtype="FLOAT")
+            variants["original"].append(y)
+            for name, ext, codec in (("mp3 128k", "mp3", ["-b:a", "128k"]),
+                                     ("opus 64k", "ogg", ["-c:a", "libopus", "-b:a", "64k"])):
+                encoded = os.path.join(tmp, f"clip.{ext}")
+                encode(wav, encoded, codec)
+                variants[name].append(normalize_audio(load_audio(encoded), sr)[0])
+            variants[f"trim {hop}s"].append(y[hop * sr:])
+            for seconds in SPLICE_SECONDS:
+                variants[f"splice {seconds}s"].append(splice(y, tiled[(index + 1) % len(tiled)], sr, seconds, rng))
+
+        all_ok = True
+        print(f"{'variant':<12} {'chunks':>6} {'hit rate':>8} {'max diff':>9} {'labels':>6} "
+              f"{'cached ms':>9} {'uncached ms':>11}")
+        for name, clips in variants.items():
+            before = cache.stats()
+            max_diff = 0.0
+            mismatches = 0
+            chunks_total = 0
+            cached_time = uncached_time = 0.0
+            for y in clips:
+                chunks = get_audio_chunks(y, sr)
+                chunks_total += len(chunks)
+
+                start = time.perf_counter()
+                uncached = predict_chunks(model, device, chunks, sr)
+                uncached_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                cached = predict_chunks(model, device, chunks, sr, chunk_cache=cache)
+                cached_time += time.perf_counter() - start
+
+                max_diff = max(max_diff, float(np.max(np.abs(np.array(cached) - uncached))))
+                mismatches += (max(cached) > 0.5) != (max(uncached) > 0.5)
+
+            after = cache.stats()
+            hits = (after["memory_hits"] + after["disk_hits"]) - (before["memory_hits"] + before["disk_hits"])
+            must_miss = name == "original" or name.startswith("splice")
+            ok = mismatches == 0 and (not must_miss or hits == 0)
+            all_ok &= ok
+            print(f"{name:<12} {chunks_total:>6} {hits / chunks_total:>8.1%} {max_diff:>9.2e} "
+                  f"{'ok' if mismatches == 0 else mismatches:>6} {cached_time * 1000:>9.0f} "
+                  f"{uncached_time * 1000:>11.0f}" + ("" if ok else "  FAILED"))
+
+        print(f"\nCache stats: {cache.stats()}")
+        print("CHECK OK" if all_ok else "CHECK FAILED")
+        sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for early-exit (coarse-to-fine) inference.
+
+Scores the bundled real/ and fake/ samples — each also tiled into a longer
+recording so there are enough chunks to skip — with the full predict_robust
+and with predict_early_exit, reporting latency, chunks scored and whether
+the labels agree. --min-speech-ratio applies the same VAD gating to both.
+
+Usage (from the repo root or backend/):
+    python backend/bench_early_exit.py --model backend/hybrid_efficientnet_gru.pth [--tile-seconds 60] \\
+        [--min-speech-ratio 0.3]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    load_model, preprocess_audio, predict_robust, predict_early_exit,
+    EARLY_EXIT_THRESHOLD, EARLY_EXIT_STRIDE
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Early-exit inference benchmark")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--threshold", type=float, default=EARLY_EXIT_THRESHOLD)
+    parser.add_argument("--stride", type=int, default=EARLY_EXIT_STRIDE)
+    parser.add_argument("--tile-seconds", type=float, default=60,
+                        help="Also score each sample repeated to this length (0 to skip)")
+    parser.add_argument("--min-speech-ratio", type=float, default=None, help="VAD gating for both paths")
+    args = parser.parse_args()
+
+    model, device = load_model(args.model)
+
+    files = []
+    for folder in ("real", "fake"):
+        files += sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))
+
+    mismatches = 0
+    totals = {"full": 0.0, "early": 0.0, "chunks": 0, "scored": 0}
+    print(f"{'file':<24} {'label':<5} {'chunks':>6} {'scored':>6} {'full ms':>8} {'early ms':>8} {'agree':>5}")
+    for path in files:
+        y, sr = preprocess_audio(path)
+        variants = [(os.path.relpath(path, REPO_ROOT), y)]
+        if args.tile_seconds:
+            reps = int(np.ceil(args.tile_seconds * sr / len(y)))
+            variants.append((os.path.relpath(path, REPO_ROOT) + f" x{reps}", np.tile(y, reps)))
+
+        for name, audio in variants:
+            start = time.perf_counter()
+            full = predict_robust(model, device, audio, sr, min_speech_ratio=args.min_speech_ratio)
+            full_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            early = predict_early_exit(model, device, audio, sr, args.threshold, args.stride,
+                                       min_speech_ratio=args.min_speech_ratio)
+            early_time = time.perf_counter() - start
+
+            agree = full["label"] == early["label"]
+            mismatches += not agree
+            totals["full"] += full_time
+            totals["early"] += early_time
+            totals["chunks"] += early["num_chunks"]
+            totals["scored"] += early["chunks_scored"]
+            print(f"{name:<24} {full['label']:<5} {early['num_chunks']:>6} {early['chunks_scored']:>6} "
+                  f"{full_time * 1000:>8.0f} {early_time * 1000:>8.0f} {'yes' if agree else 'NO':>5}")
+
+    print(f"\nChunks scored {totals['scored']}/{totals['chunks']} "
+          f"({100 * totals['scored'] / totals['chunks']:.1f}%), "
+          f"latency full={totals['full']:.2f}s early={totals['early']:.2f}s "
+          f"saved={100 * (1 - totals['early'] / totals['full']):.1f}%")
+    print("LABELS MATCH" if mismatches == 0 else f"{mismatches} LABEL MISMATCHES")
+    sys.exit(0 if mismatches == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Timing and accuracy check for shared GRU frames across overlapping chunks.
+
+Adjacent 4 s chunks share 2 s of audio, i.e. 200 of their 398 GRU frames.
+Three ways of running the temporal branch over every chunk of a clip are
+timed (GRU time per minute of audio):
+  per-chunk     the current exact path: TemporalGRU on each chunk's frames
+  shared        TemporalGRU.forward_windows on --group chunks at a time: each
+                frame's input projection is computed once and the recurrence
+                is a TorchScript loop; every chunk's recurrence restarts from
+                zero at its hop boundary, so results are exact
+  single scan   approximation: one GRU pass over the whole clip, reading the
+                hidden state at each chunk's end (the state carries history
+                from before the chunk)
+Then every chunk of every bundled sample (tiled to --seconds) is scored with
+predict_chunks_shared and with single-scan temporal embeddings. The script
+reports the largest chunk-score difference from predict_chunks and whether
+the max-aggregated labels agree.
+
+Usage (from the repo root or backend/):
+    python backend/bench_gru.py --model backend/hybrid_efficientnet_gru.pth [--minutes 1 5]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    load_model, preprocess_audio, get_chunk_offsets, get_audio_chunks, extract_spectral_batch,
+    extract_temporal, predict_chunks, predict_chunks_shared, DEFAULT_BATCH_SIZE, CHUNK_DURATION, SHARED_FRAMES_GROUP
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRAME_HOP = 160
+
+
+def tile(y, sr, seconds):
+    return np.tile(y, int(np.ceil(seconds * sr / len(y))))[:int(seconds * sr)]
+
+
+def per_chunk_embeddings(temporal, y, sr, offsets, batch_size):
+    chunks = [y[o:o + CHUNK_DURATION * sr] for o in offsets]
+    out = []
+    for i in range(0, len(chunks), batch_size):
+        out.append(temporal(torch.stack([extract_temporal(c) for c in chunks[i:i + batch_size]])))
+    return torch.cat(out)
+
+
+def shared_embeddings(temporal, y, sr, offsets, group):
+    chunk_size = CHUNK_DURATION * sr
+    num_steps = (chunk_size - 400) // FRAME_HOP + 1
+    out = []
+    for i in range(0, len(offsets), group):
+        batch = offsets[i:i + group]
+        frames = extract_temporal(y[batch[0]:batch[-1] + chunk_size])
+        starts = [(o - batch[0]) // FRAME_HOP for o in batch]
+        out.append(temporal.forward_windows(frames, starts, num_steps))
+    return torch.cat(out)
+
+
+def single_scan_embeddings(temporal, y, sr, offsets):
+    chunk_size = CHUNK_DURATION * sr
+    outputs, _ = temporal.gru(extract_temporal(y).unsqueeze(0))
+    ends = [(o + chunk_size - 400) // FRAME_HOP for o in offsets]
+    return temporal.fc(outputs[0, ends])
+
+
+def timed(fn, repeats):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared GRU frames benchmark and accuracy check")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--seconds", type=float, default=30, help="Tile length for the accuracy check")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Per-chunk GRU batch size")
+    parser.add_argument("--group", type=int, default=SHARED_FRAMES_GROUP, help="Windows per shared recurrence")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    model, device = load_model(args.model)
+    if device.type != "cpu":
+        print("Note: timings below are for", device)
+    temporal = model.temporal.cpu()
+
+    files = []
+    for folder in ("real", "fake"):
+        files += sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))
+    base, sr = preprocess_audio(files[0])
+
+    print(f"GRU time per minute of audio (batch size {args.batch_size}, group {args.group}, "
+          f"{torch.get_num_threads()} thread(s))")
+    print(f"{'minutes':>7} {'chunks':>6} {'per-chunk ms':>12} {'shared ms':>10} {'speedup':>7} "
+          f"{'emb diff':>9} {'scan ms':>8} {'scan diff':>9}")
+    with torch.no_grad():
+        for minutes in args.minutes:
+            y = tile(base, sr, minutes * 60)
+            # Grid-aligned chunks only; the end-aligned tail is scored per chunk either way
+            offsets = [o for o in get_chunk_offsets(len(y), sr) if o % FRAME_HOP == 0]
+            exact, exact_time = timed(lambda: per_chunk_embeddings(temporal, y, sr, offsets, args.batch_size),
+                                      args.repeats)
+            shared, shared_time = timed(lambda: shared_embeddings(temporal, y, sr, offsets, args.group),
+                                        args.repeats)
+            scan, scan_time = timed(lambda: single_scan_embeddings(temporal, y, sr, offsets), 1)
+            print(f"{minutes:>7g} {len(offsets):>6} {exact_time * 1000 / minutes:>12.1f} "
+                  f"{shared_time * 1000 / minutes:>10.1f} {exact_time / shared_time:>6.2f}x "
+                  f"{float((shared - exact).abs().max()):>9.2e} {scan_time * 1000 / minutes:>8.1f} "
+                  f"{float((scan - exact).abs().max()):>9.2e}", flush=True)
+
+    all_ok = True
+    print(f"\nAccuracy on the bundled samples ({args.seconds:.0f}s each)")
+    print(f"{'file':<28} {'chunks':>6} {'shared diff':>11} {'labels':>6} {'scan diff':>9} {'labels':>6}")
+    for path in files:
+        y, sr = preprocess_audio(path)
+        y = tile(y, sr, args.seconds)
+        offsets = get_chunk_offsets(len(y), sr)
+        chunks = get_audio_chunks(y, sr)
+        exact = np.array(predict_chunks(model, device, chunks, sr, args.batch_size))
+        shared = np.array(predict_chunks_shared(model, device, y, sr, offsets, args.batch_size))
+        with torch.no_grad():
+            f1 = model.spectral(extract_spectral_batch(chunks, sr).to(device))
+            f2 = single_scan_embeddings(model.temporal, y, sr, offsets)
+            scan = torch.sigmoid(model.classify(f1, f2)).reshape(-1).cpu().numpy()
+
+        shared_diff = float(np.abs(shared - exact).max())
+        shared_labels = (shared.max() > 0.5) == (exact.max() > 0.5)
+        scan_labels = (scan.max() > 0.5) == (exact.max() > 0.5)
+        ok = shared_diff <= args.tolerance and shared_labels
+        all_ok &= ok
+        print(f"{os.path.basename(path)[:28]:<28} {len(chunks):>6} {shared_diff:>11.2e} "
+              f"{'ok' if shared_labels else 'DIFF':>6} {float(np.abs(scan - exact).max()):>9.2e} "
+              f"{'ok' if scan_labels else 'DIFF':>6}" + ("" if ok else "  FAILED"))
+
+    print("CHECK OK" if all_ok else "CHECK FAILED")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
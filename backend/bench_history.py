@@ -0,0 +1,243 @@
+"""
+Load benchmark for /api/history on a large predictions table.
+
+Fills a scratch database with --rows synthetic predictions spread over
+--users users, on the original schema (version 1, no index), then times:
+  before   the old history query (ORDER BY created_at DESC LIMIT 50, a scan
+           of the whole table plus a sort) and its OFFSET page --page
+  migrate  applying the remaining migrations (the composite index)
+  after    fetch_history's first page and its keyset page --page
+Keyset pages are checked against one ordered query per user, and the query
+plans must use the index. Finally, --readers threads read history pages
+while a writer inserts one prediction per transaction (like
+record_prediction) in the rollback-journal and in WAL mode. Read latency
+and write throughput are reported for each mode.
+
+Usage (from the repo root or backend/):
+    python backend/bench_history.py [--rows 10000000] [--users 10000] [--db /tmp/history.db]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from database import connect, migrate, fetch_history, HISTORY_PAGE_SIZE
+
+FILL_BATCH = 100000
+OLD_QUERY = 'SELECT * FROM predictions WHERE user_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?'
+
+
+def fill(db_path, rows, users, seed=0):
+    """Schema version 1 plus `rows` predictions, in created_at order, over one year."""
+    migrate(db_path, target=1)
+    db = connect(db_path)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    db.execute("PRAGMA cache_size = -1048576")
+    rng = np.random.default_rng(seed)
+    user_ids = [str(uuid.UUID(int=i + 1)) for i in range(users)]
+    db.executemany(
+        'INSERT INTO users (id, username, email, password_hash) VALUES (?, ?, ?, ?)',
+        [(u, f"user{i}", f"user{i}@example.com", "x") for i, u in enumerate(user_ids)]
+    )
+    start = time.mktime(time.strptime("2025-01-01", "%Y-%m-%d"))
+    for batch_start in range(0, rows, FILL_BATCH):
+        n = min(FILL_BATCH, rows - batch_start)
+        owners = rng.integers(0, users, n)
+        seconds = start + (batch_start + np.arange(n)) * (365 * 86400 / rows)
+        fake = rng.random(n)
+        db.executemany(
+            '''INSERT INTO predictions (id, user_id, filename, label, confidence, real_probability,
+            fake_probability, raw_score, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            [
+                (os.urandom(16).hex(), user_ids[owner], f"upload_{batch_start + i}.wav",
+                 "FAKE" if p > 0.5 else "REAL", round(max(p, 1 - p) * 100, 2), 1 - p, p, p,
+                 time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(s)))
+                for i, (owner, p, s) in enumerate(zip(owners, fake, seconds))
+            ]
+        )
+        db.commit()
+        print(f"\r  {batch_start + n:,} / {rows:,} rows", end="", flush=True)
+    print()
+    db.close()
+    return user_ids
+
+
+def percentiles(times):
+    ms = np.array(times) * 1000
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 95))
+
+
+def time_queries(fn, users):
+    times = []
+    for user_id in users:
+        start = time.perf_counter()
+        fn(user_id)
+        times.append(time.perf_counter() - start)
+    return percentiles(times)
+
+
+def page_cursor(db, user_id, page):
+    """The cursor of page `page` (1-based), following next_cursor from the first page."""
+    cursor = None
+    for _ in range(page - 1):
+        _, next_cursor = fetch_history(db, user_id, HISTORY_PAGE_SIZE, cursor)
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    return cursor
+
+
+def check_pagination(db, user_id):
+    """Walk every keyset page; True if they equal one ordered query."""
+    expected = [r['id'] for r in db.execute(
+        'SELECT id FROM predictions WHERE user_id = ? ORDER BY created_at DESC, rowid DESC', (user_id,)
+    )]
+    walked, cursor = [], None
+    while True:
+        rows, cursor = fetch_history(db, user_id, HISTORY_PAGE_SIZE, cursor)
+        walked += [r['id'] for r in rows]
+        if cursor is None:
+            return walked == expected
+
+
+def contention(db_path, journal_mode, user_ids, readers, seconds):
+    """Read latency and write rate with `readers` history readers and one writer."""
+    db = connect(db_path)
+    db.execute(f"PRAGMA journal_mode = {journal_mode}")
+    db.close()
+    stop = threading.Event()
+    read_times, writes, errors = [], [0], [0]
+    lock = threading.Lock()
+
+    def reader(seed):
+        db = connect(db_path)
+        rng = np.random.default_rng(seed)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                fetch_history(db, user_ids[rng.integers(len(user_ids))])
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                read_times.append(time.perf_counter() - start)
+        db.close()
+
+    def writer():
+        db = connect(db_path)
+        while not stop.is_set():
+            try:
+                db.execute(
+                    '''INSERT INTO predictions (id, user_id, filename, label, confidence, real_probability,
+                    fake_probability, raw_score) VALUES (?, ?, 'live.wav', 'REAL', 90, 0.9, 0.1, 0.1)''',
+                    (str(uuid.uuid4()), user_ids[writes[0] % len(user_ids)])
+                )
+                db.commit()
+                writes[0] += 1
+            except Exception:
+                errors[0] += 1
+        db.close()
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    p50, p95 = percentiles(read_times) if read_times else (float("nan"), float("nan"))
+    return len(read_times) / seconds, p50, p95, writes[0] / seconds, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History pagination and SQLite load benchmark")
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=50, help="Users sampled per timing")
+    parser.add_argument("--page", type=int, default=10, help="Deep page to time")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of each contention run")
+    parser.add_argument("--db", help="Scratch database path (default: a temporary file)")
+    args = parser.parse_args()
+
+    workdir = None
+    db_path = args.db
+    if db_path is None:
+        workdir = tempfile.mkdtemp(prefix="history_")
+        db_path = os.path.join(workdir, "history.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    try:
+        print(f"Filling {args.rows:,} predictions over {args.users:,} users")
+        started = time.perf_counter()
+        user_ids = fill(db_path, args.rows, args.users)
+        print(f"  {time.perf_counter() - started:.1f}s, {os.path.getsize(db_path) / 2 ** 20:.0f} MB")
+        sample = list(np.random.default_rng(1).choice(user_ids, min(args.queries, len(user_ids)), replace=False))
+        offset = (args.page - 1) * HISTORY_PAGE_SIZE
+
+        db = connect(db_path)
+        print(f"\n{'query':<34} {'p50 ms':>9} {'p95 ms':>9}")
+        before = time_queries(lambda u: db.execute(OLD_QUERY, (u, HISTORY_PAGE_SIZE, 0)).fetchall(), sample[:5])
+        print(f"{'before: first page':<34} {before[0]:>9.2f} {before[1]:>9.2f}")
+        p50, p95 = time_queries(lambda u: db.execute(OLD_QUERY, (u, HISTORY_PAGE_SIZE, offset)).fetchall(),
+                                sample[:5])
+        print(f"{f'before: OFFSET page {args.page}':<34} {p50:>9.2f} {p95:>9.2f}")
+        db.close()
+
+        started = time.perf_counter()
+        migrate(db_path)
+        print(f"{'migrate (build index)':<34} {(time.perf_counter() - started) * 1000:>9.0f}")
+
+        db = connect(db_path)
+        after = time_queries(lambda u: fetch_history(db, u), sample)
+        print(f"{'after: first page':<34} {after[0]:>9.2f} {after[1]:>9.2f}")
+        p50, p95 = time_queries(lambda u: db.execute(OLD_QUERY, (u, HISTORY_PAGE_SIZE, offset)).fetchall(), sample)
+        print(f"{f'after: OFFSET page {args.page}':<34} {p50:>9.2f} {p95:>9.2f}")
+        cursors = {u: page_cursor(db, u, args.page) for u in sample}
+        p50, p95 = time_queries(lambda u: fetch_history(db, u, HISTORY_PAGE_SIZE, cursors[u]), sample)
+        print(f"{f'after: keyset page {args.page}':<34} {p50:>9.2f} {p95:>9.2f}")
+
+        plans = [
+            " ".join(row[3] for row in db.execute("EXPLAIN QUERY PLAN " + query, params))
+            for query, params in (
+                ('SELECT rowid, * FROM predictions WHERE user_id = ? ORDER BY created_at DESC, rowid DESC LIMIT 51',
+                 (sample[0],)),
+                ('SELECT rowid, * FROM predictions WHERE user_id = ? AND (created_at, rowid) < (?, ?) '
+                 'ORDER BY created_at DESC, rowid DESC LIMIT 51', (sample[0], "2025-06-01 00:00:00", 0)),
+            )
+        ]
+        plans_ok = all("idx_predictions_user_created" in plan and "TEMP B-TREE" not in plan for plan in plans)
+        pagination_ok = all(check_pagination(db, u) for u in sample[:10])
+        db.close()
+        print(f"\nQuery plans use the index without sorting: {'ok' if plans_ok else 'FAILED'}")
+        print(f"Keyset pages match the ordered query: {'ok' if pagination_ok else 'FAILED'}")
+
+        print(f"\nHistory reads ({args.readers} threads) vs one writer, {args.seconds:g}s each")
+        print(f"{'journal':<9} {'reads/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'writes/s':>9} {'errors':>6}")
+        for mode in ("DELETE", "WAL"):
+            reads, p50, p95, writes, errors = contention(db_path, mode, sample, args.readers, args.seconds)
+            print(f"{mode:<9} {reads:>9.0f} {p50:>8.2f} {p95:>8.2f} {writes:>9.0f} {errors:>6}")
+
+        ok = plans_ok and pagination_ok
+        print("CHECK OK" if ok else "CHECK FAILED")
+        sys.exit(0 if ok else 1)
+    finally:
+        if workdir:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
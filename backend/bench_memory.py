@@ -0,0 +1,137 @@
+"""
+Peak memory of scoring long recordings: bounded-memory streaming vs loading the file.
+
+Writes synthetic recordings of every --lengths (seconds, 22.05 kHz WAV, so
+resampling is included; the default goes up to 2 hours) and scores each one
+in a fresh process, so ru_maxrss is that run's peak RSS:
+  streamed   ingest.predict_file_stream (block decode, two-pass peak
+             normalization, chunks scored as they are cut)
+  buffered   preprocess_audio + predict_robust (whole waveform in memory)
+The model is a FusionModel with seeded random weights. "base MB" is the
+RSS once the model is loaded, before the file is touched. Children run
+with a fixed glibc mmap threshold (MALLOC_MMAP_THRESHOLD_): with glibc's
+adaptive threshold, freed forward-pass buffers are kept on the heap and
+the peak of the same run varies by ~150 MB, which would hide the trend.
+
+The streamed peak may not grow by more than --max-growth MB from the
+shortest to the longest recording, and where both paths run their chunk
+scores must be identical.
+
+Usage (from the repo root or backend/):
+    python backend/bench_memory.py [--lengths 60 1800 7200] [--skip-buffered]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from benchmark import synthetic_audio, NATIVE_SR
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PIECE_SECONDS = 60
+
+
+def write_recording(path, seconds):
+    """Synthetic WAV written a minute at a time (different noise per minute)."""
+    with sf.SoundFile(path, "w", NATIVE_SR, 1, "PCM_16") as out:
+        for index, piece_start in enumerate(range(0, int(seconds), PIECE_SECONDS)):
+            out.write(synthetic_audio(min(PIECE_SECONDS, seconds - piece_start), seed=index))
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def child(mode, path):
+    """Score one file with one path and print the measurements as JSON."""
+    import torch
+    from model import FusionModel, preprocess_audio, predict_robust
+    from ingest import predict_file_stream
+
+    torch.manual_seed(0)
+    model = FusionModel().eval()
+    device = torch.device("cpu")
+    base = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "streamed":
+        result = predict_file_stream(model, device, path)
+    else:
+        y, sr = preprocess_audio(path)
+        result = predict_robust(model, device, y, sr)
+    print(json.dumps({
+        "base_mb": base, "peak_mb": peak_rss_mb(), "seconds": time.perf_counter() - started,
+        "probabilities": [probability for _, _, probability in result["timeline"]]
+    }))
+
+
+def measure(mode, path):
+    env = dict(os.environ)
+    env.setdefault("MALLOC_MMAP_THRESHOLD_", str(128 * 1024))
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, path],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of long-recording scoring")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[60, 1800, 7200],
+                        help="Recording lengths in seconds")
+    parser.add_argument("--max-growth", type=float, default=32,
+                        help="Allowed streamed peak RSS growth (MB) from shortest to longest")
+    parser.add_argument("--skip-buffered", action="store_true", help="Only measure the streamed path")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    modes = ["streamed"] if args.skip_buffered else ["streamed", "buffered"]
+    all_ok = True
+    streamed_peaks = []
+    print(f"{'length s':>9} {'mode':<9} {'base MB':>8} {'peak MB':>8} {'growth MB':>10} {'seconds':>8} {'chunks':>7}")
+    with tempfile.TemporaryDirectory(prefix="memory_") as workdir:
+        for seconds in sorted(args.lengths):
+            path = os.path.join(workdir, f"recording_{seconds:g}s.wav")
+            write_recording(path, seconds)
+            runs = {}
+            for mode in modes:
+                run = runs[mode] = measure(mode, path)
+                if "error" in run:
+                    all_ok = False
+                    print(f"{seconds:>9g} {mode:<9} FAILED: {run['error']}")
+                    continue
+                if mode == "streamed":
+                    streamed_peaks.append(run["peak_mb"])
+                print(f"{seconds:>9g} {mode:<9} {run['base_mb']:>8.0f} {run['peak_mb']:>8.0f} "
+                      f"{run['peak_mb'] - run['base_mb']:>10.0f} {run['seconds']:>8.1f} {len(run['probabilities']):>7}",
+                      flush=True)
+            if len(runs) == 2 and not any("error" in run for run in runs.values()):
+                same = np.array_equal(runs["streamed"]["probabilities"], runs["buffered"]["probabilities"])
+                all_ok &= same
+                print(f"{'':>9} chunk scores {'identical' if same else 'DIFFER'}")
+            os.remove(path)
+
+    if len(streamed_peaks) == len(args.lengths):
+        growth = streamed_peaks[-1] - streamed_peaks[0]
+        growth_ok = growth <= args.max_growth
+        all_ok &= growth_ok
+        print(f"\nStreamed peak RSS growth {min(args.lengths):g}s → {max(args.lengths):g}s: {growth:.1f} MB "
+              f"(limit {args.max_growth:g} MB): {'ok' if growth_ok else 'FAILED'}")
+    print("CHECK OK" if all_ok else "CHECK FAILED")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Latency and throughput of persisting prediction rows under concurrent requests.
+
+--threads request threads each record --predictions predictions (with
+--chunks per-chunk scores each if given) as fast as they can, in three modes:
+  connect+commit  the original record_prediction: a new connection per row,
+                  rollback journal, INSERT and COMMIT inside the request
+  sync (WAL)      PredictionWriter with max_delay_ms=0: pooled connection in
+                  WAL mode, still one commit per row inside the request
+  write-behind    PredictionWriter batching --flush-rows rows or --flush-ms ms
+Per-call latency is what a request waits for; throughput counts rows until
+they are committed (the writer is closed, i.e. flushed, before the clock stops).
+Each mode must end with every row (and chunk row) in the database.
+
+Usage (from the repo root or backend/):
+    python backend/bench_persistence.py [--threads 8] [--predictions 500] [--chunks 30]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from database import PredictionWriter, migrate
+
+RESULT = {"label": "FAKE", "confidence": 91.5, "real_probability": 8.5, "fake_probability": 91.5,
+          "raw_score": 0.915}
+
+
+class ConnectPerRowWriter:
+    """The original record_prediction: connect, insert, commit, close per row."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def record(self, user_id, filename, result, chunk_scores=None):
+        db = sqlite3.connect(self.db_path)
+        db.execute(
+            '''INSERT INTO predictions
+            (id, user_id, filename, label, confidence, real_probability, fake_probability, raw_score)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+            (str(uuid.uuid4()), user_id, filename, result['label'], result['confidence'],
+             result['real_probability'], result['fake_probability'], result['raw_score'])
+        )
+        db.commit()
+        db.close()
+
+    def close(self):
+        pass
+
+
+def run_mode(writer, threads, predictions, chunks):
+    latencies = [[] for _ in range(threads)]
+    chunk_scores = [(i, i * 2.0, 0.5) for i in range(chunks)] or None
+
+    def request_thread(index):
+        for n in range(predictions):
+            start = time.perf_counter()
+            writer.record(f"user{index}", f"upload_{n}.wav", RESULT, chunk_scores)
+            latencies[index].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=request_thread, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    writer.close()
+    elapsed = time.perf_counter() - started
+    ms = np.concatenate(latencies) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 95), ms.max(), threads * predictions / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction persistence benchmark")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--predictions", type=int, default=500, help="Per thread")
+    parser.add_argument("--chunks", type=int, default=0, help="Per-chunk scores persisted per prediction")
+    parser.add_argument("--flush-rows", type=int, default=100)
+    parser.add_argument("--flush-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="persist_")
+    modes = [
+        ("connect+commit", "DELETE", lambda path: ConnectPerRowWriter(path)),
+        ("sync (WAL)", "WAL", lambda path: PredictionWriter(path, max_delay_ms=0, persist_chunks=True)),
+        ("write-behind", "WAL", lambda path: PredictionWriter(
+            path, max_batch_rows=args.flush_rows, max_delay_ms=args.flush_ms, persist_chunks=True
+        )),
+    ]
+    try:
+        all_ok = True
+        expected = args.threads * args.predictions
+        print(f"{args.threads} threads x {args.predictions} predictions, {args.chunks} chunk rows each")
+        print(f"{'mode':<15} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'rows/s':>8} {'stored':>8}")
+        for name, journal_mode, make_writer in modes:
+            db_path = os.path.join(workdir, f"{name.split()[0]}.db")
+            migrate(db_path)
+            db = sqlite3.connect(db_path)
+            db.execute(f"PRAGMA journal_mode = {journal_mode}")
+            db.close()
+
+            p50, p95, worst, throughput = run_mode(make_writer(db_path), args.threads, args.predictions,
+                                                   args.chunks)
+            db = sqlite3.connect(db_path)
+            stored = db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            chunk_rows = db.execute("SELECT COUNT(*) FROM prediction_chunks").fetchone()[0]
+            db.close()
+            # The original path never stored chunk scores
+            ok = stored == expected and (name == "connect+commit" or chunk_rows == expected * args.chunks)
+            all_ok &= ok
+            print(f"{name:<15} {p50:>8.3f} {p95:>8.3f} {worst:>8.2f} {throughput:>8.0f} {stored:>8}"
+                  + ("" if ok else "  FAILED"))
+
+        print("CHECK OK" if all_ok else "CHECK FAILED")
+        sys.exit(0 if all_ok else 1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
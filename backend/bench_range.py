@@ -0,0 +1,143 @@
+"""
+Range-restricted decoding check: time and memory must follow the span, not the file.
+
+Writes one --length second synthetic recording (22.05 kHz, so resampling is
+included) in every container the API treats differently:
+  wav, flac, mp3   soundfile seeks to the offset (preprocess_audio)
+  m4a              ffmpeg input seeking (preprocess_audio → ingest.load_audio)
+  mp4              video upload path (ingest.load_audio)
+(the full m4a decode also uses ingest.load_audio, as librosa's audioread
+fallback needs ffmpeg on the PATH), and for each one decodes the whole file
+and a --span second window near the end (at --at of the length).
+Reported per container: wall time and peak
+Python memory (tracemalloc, which sees the numpy buffers) of both decodes,
+and the correlation of the window with the same samples of the full decode.
+The window must be --span seconds long, match the full decode, and take at
+most --max-ratio of the full decode's time and memory. With a random model
+the window's chunks are scored and must be exactly the span's chunks.
+
+Usage (from the repo root or backend/):
+    python backend/bench_range.py [--length 1800] [--span 30] [--at 0.8]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import soundfile as sf
+import torch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    FusionModel, preprocess_audio, normalize_audio, get_chunk_offsets, predict_robust, offset_result_times
+)
+from ingest import get_ffmpeg_exe, load_audio
+from benchmark import synthetic_audio, NATIVE_SR
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PIECE_SECONDS = 60
+
+
+def write_recording(workdir, seconds):
+    """The synthetic recording as wav, flac and mp3 (soundfile) and m4a and mp4 (ffmpeg)."""
+    paths = {ext: os.path.join(workdir, f"recording.{ext}") for ext in ("wav", "flac", "mp3", "m4a", "mp4")}
+    # Written piece by piece, each with its own noise, so a misplaced window cannot match
+    outputs = [sf.SoundFile(paths["wav"], "w", NATIVE_SR, 1, "PCM_16"),
+               sf.SoundFile(paths["flac"], "w", NATIVE_SR, 1, "PCM_16"),
+               sf.SoundFile(paths["mp3"], "w", NATIVE_SR, 1, format="MP3")]
+    for index, piece_start in enumerate(range(0, int(seconds), PIECE_SECONDS)):
+        piece = synthetic_audio(min(PIECE_SECONDS, seconds - piece_start), seed=index)
+        for out in outputs:
+            out.write(piece)
+    for out in outputs:
+        out.close()
+
+    ffmpeg = get_ffmpeg_exe()
+    subprocess.run([ffmpeg, "-v", "error", "-y", "-i", paths["wav"], "-c:a", "aac", paths["m4a"]], check=True)
+    subprocess.run([
+        ffmpeg, "-v", "error", "-y", "-i", paths["wav"],
+        "-f", "lavfi", "-i", "color=size=64x64:rate=1",
+        "-map", "1:v", "-map", "0:a", "-shortest",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", paths["mp4"]
+    ], check=True)
+    return paths
+
+
+def decode(ext, path, start=None, duration=None):
+    """Decode like the API does for an upload of this container."""
+    if ext in ("m4a", "mp4"):
+        return normalize_audio(load_audio(path, start=start, duration=duration), 16000)
+    return preprocess_audio(path, start=start, duration=duration)
+
+
+def measure(fn):
+    """(result, wall seconds, peak traced MB) of one call."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Range-restricted decode check")
+    parser.add_argument("--length", type=float, default=1800, help="Recording length in seconds")
+    parser.add_argument("--span", type=float, default=30, help="Seconds decoded by the ranged call")
+    parser.add_argument("--at", type=float, default=0.8, help="Window start as a fraction of the length")
+    parser.add_argument("--max-ratio", type=float, default=0.25,
+                        help="Largest allowed ranged/full ratio of time and of memory")
+    parser.add_argument("--min-corr", type=float, default=0.999)
+    args = parser.parse_args()
+
+    start = round(args.length * args.at, 2)
+    all_ok = True
+    with tempfile.TemporaryDirectory(prefix="range_") as workdir:
+        print(f"Writing a {args.length:g}s recording")
+        paths = write_recording(workdir, args.length)
+        print(f"Window {start:g}s + {args.span:g}s\n")
+        print(f"{'format':<7} {'full ms':>9} {'range ms':>9} {'full MB':>9} {'range MB':>9} "
+              f"{'time':>6} {'mem':>6} {'corr':>8} {'seconds':>8}")
+
+        for ext, path in paths.items():
+            decode(ext, path, 0, 1)  # warm-up (resampler setup, file cache)
+            (y_full, sr), full_time, full_mem = measure(lambda: decode(ext, path))
+            (y_span, _), span_time, span_mem = measure(lambda: decode(ext, path, start, args.span))
+            # Peak normalization differs between the two decodes, correlation does not
+            offset = int(start * sr)
+            n = min(len(y_span), len(y_full) - offset)
+            corr = float(np.corrcoef(y_full[offset:offset + n], y_span[:n])[0, 1])
+            del y_full
+
+            time_ratio = span_time / full_time
+            mem_ratio = span_mem / full_mem
+            length_ok = abs(len(y_span) / sr - args.span) < 0.05
+            ok = length_ok and corr >= args.min_corr and time_ratio <= args.max_ratio and mem_ratio <= args.max_ratio
+            all_ok &= ok
+            print(f"{ext:<7} {full_time * 1000:>9.0f} {span_time * 1000:>9.0f} {full_mem:>9.1f} {span_mem:>9.1f} "
+                  f"{time_ratio:>6.1%} {mem_ratio:>6.1%} {corr:>8.5f} {len(y_span) / sr:>8.2f}"
+                  + ("" if ok else "  FAILED"))
+
+        # Chunking and inference only cover the window, and report file times
+        torch.manual_seed(0)
+        model = FusionModel().eval()
+        y_span, sr = decode("wav", paths["wav"], start, args.span)
+        result = offset_result_times(predict_robust(model, torch.device("cpu"), y_span, sr), start, len(y_span) / sr)
+        expected = [round(start + offset / sr, 2) for offset in get_chunk_offsets(len(y_span), sr)]
+        chunks_ok = [window[0] for window in result["timeline"]] == expected and result["range"]["start"] == start
+        all_ok &= chunks_ok
+        print(f"\nScored windows: {len(result['timeline'])} from {result['timeline'][0][0]}s "
+              f"to {result['timeline'][-1][1]}s: {'ok' if chunks_ok else 'FAILED'}")
+
+    print("CHECK OK" if all_ok else "CHECK FAILED")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Memory and throughput benchmark for multi-process serving.
+
+Runs N worker processes (spawned, like independent app workers) that each
+score a share of the same requests with predict_robust, in two modes:
+  per-process   every worker loads its own model, threads = cores // N
+  model-server  one model_server.py process holds the weights with the
+                planned thread count; workers use 1 thread and a ModelClient
+and reports total RSS and PSS (proportional set size, which splits shared
+pages between the processes mapping them) plus aggregate chunks/second.
+
+Usage (from the repo root or backend/):
+    python backend/bench_serving.py --model backend/hybrid_efficientnet_gru.pth [--workers 1 2 4 8]
+"""
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import secrets
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_kb(pid):
+    """(RSS, PSS) of a process in kB from /proc (PSS falls back to RSS)."""
+    values = {}
+    for name in ("smaps_rollup", "status"):
+        try:
+            with open(f"/proc/{pid}/{name}") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in ("Rss", "Pss", "VmRSS"):
+                        values.setdefault(key, int(value.split()[0]))
+        except OSError:
+            continue
+    rss = values.get("Rss", values.get("VmRSS", 0))
+    return rss, values.get("Pss", rss)
+
+
+def load_clip(seconds):
+    """First bundled sample, tiled to `seconds`, normalized like an upload."""
+    from model import preprocess_audio
+    path = sorted(glob.glob(os.path.join(REPO_ROOT, "fake", "*.flac")))[0]
+    y, sr = preprocess_audio(path)
+    return np.tile(y, int(np.ceil(seconds * sr / len(y))))[:int(seconds * sr)], sr
+
+
+def run_server(model_path, address, threads, ready):
+    import torch
+    from model import load_model
+    from model_server import ModelServer
+
+    torch.set_num_threads(threads)
+    model, device = load_model(model_path)
+    server = ModelServer(model, address, device=device, info={"threads": threads})
+    ready.set()
+    server.serve_forever()
+
+
+def run_worker(mode, model_path, address, threads, clip_seconds, num_requests, start, done, results):
+    import torch
+    from model import load_model, predict_robust
+    from model_server import ModelClient
+
+    torch.set_num_threads(threads)
+    if mode == "per-process":
+        model, device = load_model(model_path)
+    else:
+        model, device = ModelClient(address), torch.device("cpu")
+    y, sr = load_clip(clip_seconds)
+    predict_robust(model, device, y[:4 * sr], sr)  # warm-up
+
+    start.wait()  # barrier: all workers loaded and warmed up
+    chunks = 0
+    for _ in range(num_requests):
+        chunks += predict_robust(model, device, y, sr)["num_chunks"]
+    results.put((os.getpid(), chunks, time.perf_counter()))
+    # Stay alive until the parent has measured memory
+    done.wait()
+
+
+def run(mode, num_workers, args, cores):
+    from model_server import plan_threads
+
+    ctx = mp.get_context("spawn")
+    start, done, ready = ctx.Barrier(num_workers + 1), ctx.Event(), ctx.Event()
+    results = ctx.Queue()
+    processes = []
+
+    if mode == "model-server":
+        server_threads = plan_threads(num_workers, 1, cores)
+        server = ctx.Process(target=run_server, args=(args.model, args.address, server_threads, ready), daemon=True)
+        server.start()
+        ready.wait()  # set once the server is listening
+        processes.append(server)
+        worker_threads = 1
+        threads = f"{num_workers}x1+{server_threads}"
+    else:
+        worker_threads = max(1, cores // num_workers)
+        threads = f"{num_workers}x{worker_threads}"
+
+    per_worker = [args.requests // num_workers + (i < args.requests % num_workers) for i in range(num_workers)]
+    workers = [
+        ctx.Process(target=run_worker, args=(
+            mode, args.model, args.address, worker_threads, args.clip_seconds, n, start, done, results
+        ), daemon=True)
+        for n in per_worker
+    ]
+    for worker in workers:
+        worker.start()
+    processes += workers
+
+    # Released together once every worker has loaded and warmed up
+    start.wait()
+    began = time.perf_counter()
+
+    finished = [results.get() for _ in workers]
+    elapsed = max(t for _, _, t in finished) - began
+    chunks = sum(c for _, c, _ in finished)
+    rss, pss = map(sum, zip(*(memory_kb(p.pid) for p in processes)))
+
+    done.set()
+    for p in processes:
+        p.terminate()
+        p.join()
+    return {"rss_mb": rss / 1024, "pss_mb": pss / 1024, "chunks_per_s": chunks / elapsed,
+            "threads": threads}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process serving RSS/throughput benchmark")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=16, help="Total requests per run")
+    parser.add_argument("--clip-seconds", type=float, default=20)
+    parser.add_argument("--address", default="127.0.0.1:6199")
+    args = parser.parse_args()
+    # Inherited by the spawned server and workers, so no key file is written
+    os.environ.setdefault('MODEL_SERVER_AUTHKEY', secrets.token_hex(32))
+
+    from model_server import physical_cores
+    cores = physical_cores()
+    print(f"{cores} physical core(s), {args.requests} requests of {args.clip_seconds:.0f}s per run\n")
+
+    print(f"{'mode':<13} {'workers':>7} {'threads':>9} {'RSS MB':>8} {'PSS MB':>8} {'chunks/s':>9}")
+    for num_workers in args.workers:
+        for mode in ("per-process", "model-server"):
+            r = run(mode, num_workers, args, cores)
+            print(f"{mode:<13} {num_workers:>7} {r['threads']:>9} {r['rss_mb']:>8.0f} "
+                  f"{r['pss_mb']:>8.0f} {r['chunks_per_s']:>9.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Benchmark suite for the detection pipeline, with JSON output and a compare mode.
+
+Times each stage on synthetic audio of every --lengths (seconds, decoded
+from a 22.05 kHz WAV so resampling is included) and on the bundled samples:
+  preprocess_audio   load, resample to 16 kHz and normalize    ms per call
+  get_audio_chunks   4 s / 2 s-hop chunking                    ms per call
+  extract_spectral   mel-spectrogram image of one chunk        ms per chunk
+  extract_temporal   GRU frames of one chunk                   ms per chunk
+  predict            forward pass of a single chunk            ms per chunk
+  predict_batch      forward pass, --batch-sizes at a time     ms per chunk
+  predict_robust     full sliding-window prediction            ms per call
+The per-chunk stages run on the first --sample-chunks chunks. Every model
+in --models is timed: "random" is a FusionModel with seeded random weights
+(no checkpoint needed), anything else is a checkpoint path.
+
+Results are written as JSON (--output) with the commit, torch version and
+thread count. --compare BASELINE CURRENT matches the entries of two such
+files and flags every stage whose median got slower by more than
+--threshold (and by more than --min-ms), exiting non-zero on a regression.
+
+Usage (from the repo root or backend/):
+    python backend/benchmark.py [--models random backend/hybrid_efficientnet_gru.pth] --output bench.json
+    python backend/benchmark.py --quick --output bench.json
+    python backend/benchmark.py --compare bench_main.json bench.json [--threshold 0.15]
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+import torch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    FusionModel, load_model, preprocess_audio, get_audio_chunks, extract_spectral, extract_spectral_batch,
+    extract_temporal, predict, predict_batch, predict_robust, DEFAULT_BATCH_SIZE
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NATIVE_SR = 22050
+DEFAULT_LENGTHS = [1, 10, 60, 300, 1800]
+DEFAULT_BATCH_SIZES = [1, DEFAULT_BATCH_SIZE, 32]
+
+
+def synthetic_audio(seconds, sr=NATIVE_SR, seed=0):
+    """Deterministic speech-like test signal: gliding harmonics, syllable-rate envelope, noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    pitch = 140 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sr
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    y = 0.3 * voice * envelope + 0.02 * rng.standard_normal(len(t))
+    return (y / np.abs(y).max() * 0.9).astype(np.float32)
+
+
+def load_benchmark_model(spec):
+    """(name, model, device) for "random" or a checkpoint path."""
+    if spec == "random":
+        torch.manual_seed(0)
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        return "random", FusionModel().to(device).eval(), device
+    model, device = load_model(spec)
+    return os.path.basename(spec), model, device
+
+
+def timed(fn, repeats, warmup=True):
+    """Wall times in seconds of `repeats` calls (after one untimed call if warmup)."""
+    if warmup:
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    """Collects result entries and prints one line per entry."""
+
+    def __init__(self):
+        self.results = []
+        print(f"{'model':<16} {'input':<20} {'stage':<17} {'batch':>5} {'median ms':>10} {'min ms':>9} {'per':>5}")
+
+    def add(self, model, source, stage, times, per=1, per_label="call", batch_size=None):
+        runs = [t * 1000 / per for t in times]
+        entry = {
+            "model": model, "input": source, "stage": stage, "batch_size": batch_size,
+            "per": per_label, "median_ms": round(float(np.median(runs)), 4),
+            "min_ms": round(min(runs), 4), "runs_ms": [round(r, 4) for r in runs]
+        }
+        self.results.append(entry)
+        print(f"{model[:16]:<16} {source[:20]:<20} {stage:<17} {batch_size or '':>5} "
+              f"{entry['median_ms']:>10.3f} {entry['min_ms']:>9.3f} {per_label:>5}", flush=True)
+
+
+def bench_input(recorder, name, model, device, source, path, args):
+    """Time every stage on one audio file."""
+    y, sr = preprocess_audio(path)
+    recorder.add(name, source, "preprocess_audio", timed(lambda: preprocess_audio(path), args.repeats, warmup=False))
+    recorder.add(name, source, "get_audio_chunks", timed(lambda: get_audio_chunks(y, sr), args.repeats))
+
+    chunks = get_audio_chunks(y, sr)
+    sample = chunks[:args.sample_chunks]
+    recorder.add(name, source, "extract_spectral",
+                 timed(lambda: [extract_spectral(c, sr) for c in sample], args.repeats), len(sample), "chunk")
+    recorder.add(name, source, "extract_temporal",
+                 timed(lambda: [extract_temporal(c) for c in sample], args.repeats), len(sample), "chunk")
+
+    spec = extract_spectral_batch(sample, sr)
+    temp = torch.stack([extract_temporal(c) for c in sample])
+    recorder.add(name, source, "predict",
+                 timed(lambda: [predict(model, device, s, t) for s, t in zip(spec, temp)], args.repeats),
+                 len(sample), "chunk")
+    for batch_size in args.batch_sizes:
+        def run_batches():
+            for i in range(0, len(sample), batch_size):
+                predict_batch(model, device, spec[i:i + batch_size], temp[i:i + batch_size])
+        recorder.add(name, source, "predict_batch", timed(run_batches, args.repeats), len(sample), "chunk",
+                     batch_size)
+
+    for batch_size in args.batch_sizes:
+        recorder.add(name, source, "predict_robust",
+                     timed(lambda: predict_robust(model, device, y, sr, batch_size), args.repeats, warmup=False),
+                     batch_size=batch_size)
+
+
+def run(args):
+    files = []
+    for folder in ("real", "fake"):
+        files += sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))[:args.limit]
+
+    recorder = Recorder()
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        inputs = []
+        for seconds in args.lengths:
+            path = os.path.join(workdir, f"synthetic_{seconds:g}s.wav")
+            sf.write(path, synthetic_audio(seconds), NATIVE_SR, subtype="PCM_16")
+            inputs.append((f"synthetic_{seconds:g}s", path))
+        inputs += [(os.path.basename(path), path) for path in files]
+
+        for spec in args.models:
+            name, model, device = load_benchmark_model(spec)
+            # Warm up on the first input; preprocess_audio and predict_robust get no per-input warm-up call
+            y, sr = preprocess_audio(inputs[0][1])
+            predict_robust(model, device, y, sr, max(args.batch_sizes))
+            for source, path in inputs:
+                bench_input(recorder, name, model, device, source, path, args)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "torch": torch.__version__,
+            "threads": torch.get_num_threads(),
+            "device": "cuda" if torch.cuda.is_available() else "cpu",
+            "platform": platform.platform(),
+            "models": args.models,
+            "lengths": args.lengths,
+            "batch_sizes": args.batch_sizes,
+            "repeats": args.repeats,
+            "sample_chunks": args.sample_chunks
+        },
+        "results": recorder.results
+    }
+
+
+def entry_key(entry):
+    return entry["model"], entry["input"], entry["stage"], entry["batch_size"]
+
+
+def compare(baseline_path, current_path, threshold, min_ms):
+    """Print the median change of every entry in both files; True if none regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(current_path) as f:
+        current = json.load(f)
+    before = {entry_key(e): e for e in baseline["results"]}
+
+    print(f"Baseline {baseline['meta'].get('commit')} vs current {current['meta'].get('commit')} "
+          f"(regression: > {threshold:.0%} and > {min_ms:g} ms slower)")
+    for key in ("torch", "threads", "device", "platform"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"Note: {key} differs ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+    print(f"{'model':<16} {'input':<20} {'stage':<17} {'batch':>5} {'base ms':>9} {'now ms':>9} {'change':>7}")
+
+    regressions = 0
+    matched = 0
+    for entry in current["results"]:
+        old = before.get(entry_key(entry))
+        if old is None:
+            continue
+        matched += 1
+        change = entry["median_ms"] / old["median_ms"] - 1 if old["median_ms"] else 0.0
+        regressed = change > threshold and entry["median_ms"] - old["median_ms"] > min_ms
+        regressions += regressed
+        print(f"{entry['model'][:16]:<16} {entry['input'][:20]:<20} {entry['stage']:<17} "
+              f"{entry['batch_size'] or '':>5} {old['median_ms']:>9.3f} {entry['median_ms']:>9.3f} "
+              f"{change:>+6.1%}" + ("  REGRESSION" if regressed else ""))
+
+    print(f"{matched} entries compared, {regressions} regression(s)")
+    ok = matched > 0 and regressions == 0
+    print("CHECK OK" if ok else "CHECK FAILED")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detection pipeline benchmark suite")
+    parser.add_argument("--models", nargs="+", default=["random"],
+                        help='"random" and/or checkpoint paths')
+    parser.add_argument("--lengths", type=float, nargs="+", default=DEFAULT_LENGTHS,
+                        help="Synthetic audio lengths in seconds")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--sample-chunks", type=int, default=16, help="Chunks timed by the per-chunk stages")
+    parser.add_argument("--limit", type=int, default=2, help="Bundled samples per folder (0 for none)")
+    parser.add_argument("--quick", action="store_true", help="Lengths 1 10 60 s, batch sizes 1 16, 1 repeat")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="Compare two result files instead of benchmarking")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown counted as a regression")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if compare(*args.compare, args.threshold, args.min_ms) else 1)
+
+    if args.quick:
+        args.lengths, args.batch_sizes, args.repeats = [1, 10, 60], [1, DEFAULT_BATCH_SIZE], 1
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(report['results'])} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
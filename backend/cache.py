@@ -0,0 +1,369 @@
+"""
+Persistent prediction result cache.
+Results are keyed by (content hash, model weights hash, chunking parameters)
+and kept in a SQLite table with least-recently-used eviction, so re-uploads
+of an identical file skip decoding and inference entirely.
+
+ChunkCache does the same per 4 s chunk, keyed by an audio fingerprint that
+survives re-encoding, so copies of a clip that differ at the byte level
+still reuse the model outputs of the chunks they share.
+"""
+import collections
+import hashlib
+import itertools
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# Chunk fingerprint: the chunk's spectral image average-pooled to
+# SUMMARY_GRID x SUMMARY_GRID, plus its RMS level in dB. Chunks are bucketed
+# by a coarse quantization of that summary (BUCKET_GRID cells, BUCKET_LEVELS
+# levels, BUCKET_RMS_STEP_DB steps); values within BUCKET_MARGIN of a step
+# boundary also probe the neighbouring bucket (up to MAX_PROBE_CELLS of them),
+# and a cached chunk only matches if the full summary is within tolerance.
+# The summary averages over 0.5 s columns, so a match must also agree column
+# by column on a finer DETAIL_BANDS x DETAIL_FRAMES (~70 ms) grid: a splice
+# of a few hundred ms changes a few columns of it far beyond re-encoding noise.
+SUMMARY_GRID = 8
+BUCKET_GRID = 4
+BUCKET_LEVELS = 4
+BUCKET_RMS_STEP_DB = 3.0
+BUCKET_MARGIN = 0.15  # fraction of a quantization step
+MAX_PROBE_CELLS = 4
+MATCH_TOLERANCE = 0.01  # mean absolute summary difference
+MATCH_RMS_DB = 1.0
+DETAIL_BANDS = 16
+DETAIL_FRAMES = 56
+MATCH_DETAIL_TOLERANCE = 0.03  # mean absolute difference in the worst time column
+
+ChunkEntry = collections.namedtuple(
+    "ChunkEntry", ["bucket", "summary", "rms_db", "detail", "probability", "spectral", "temporal"]
+)
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """SHA-256 hex digest of a file, read in blocks."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed LRU cache of prediction results.
+
+    Args:
+        db_path: SQLite database file for the cache table
+        model_hash: Hash of the model weights the cached results came from
+        params: String describing chunking/aggregation parameters
+        max_entries: Entries kept before the least recently used are evicted
+    """
+
+    def __init__(self, db_path, model_hash, params, max_entries=10000):
+        self.db_path = db_path
+        self.model_hash = model_hash
+        self.params = params
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        db = sqlite3.connect(self.db_path)
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS result_cache (
+                content_hash TEXT NOT NULL,
+                model_hash TEXT NOT NULL,
+                params TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (content_hash, model_hash, params)
+            )
+        ''')
+        db.execute('CREATE INDEX IF NOT EXISTS idx_result_cache_last_used ON result_cache (last_used)')
+        db.commit()
+        db.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, content_hash):
+        """Return the cached result dict for an upload hash, or None."""
+        key = (content_hash, self.model_hash, self.params)
+        with self._lock:
+            db = self._connect()
+            try:
+                row = db.execute(
+                    'SELECT result FROM result_cache WHERE content_hash = ? AND model_hash = ? AND params = ?',
+                    key
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                db.execute(
+                    'UPDATE result_cache SET last_used = ? WHERE content_hash = ? AND model_hash = ? AND params = ?',
+                    (time.time(),) + key
+                )
+                db.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            finally:
+                db.close()
+
+    def put(self, content_hash, result):
+        """Store a result and evict the least recently used entries beyond max_entries."""
+        with self._lock:
+            db = self._connect()
+            try:
+                db.execute(
+                    'INSERT OR REPLACE INTO result_cache VALUES (?, ?, ?, ?, ?)',
+                    (content_hash, self.model_hash, self.params, json.dumps(result), time.time())
+                )
+                db.execute(
+                    '''DELETE FROM result_cache WHERE rowid IN (
+                        SELECT rowid FROM result_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )''',
+                    (self.max_entries,)
+                )
+                db.commit()
+            finally:
+                db.close()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None
+        }
+
+
+def summarize_chunks(spectral_batch, temporal_batch):
+    """Fingerprint summaries of a batch of chunks from their model inputs.
+
+    Args:
+        spectral_batch: torch.Tensor of shape (N, 3, 224, 224)
+        temporal_batch: torch.Tensor of shape (N, num_frames, 400)
+
+    Returns:
+        Tuple of (N, SUMMARY_GRID**2) float32 summaries, (N,) RMS levels in dB
+        and (N, DETAIL_BANDS, DETAIL_FRAMES) float16 time-resolved details
+    """
+    image = spectral_batch[:, :1].float().cpu()
+    pooled = F.adaptive_avg_pool2d(image, SUMMARY_GRID)
+    detail = F.adaptive_avg_pool2d(image, (DETAIL_BANDS, DETAIL_FRAMES))[:, 0]
+    power = temporal_batch.float().cpu().pow(2).mean(dim=(1, 2))
+    rms_db = 10 * torch.log10(power + 1e-10)
+    return pooled.reshape(len(pooled), -1).numpy(), rms_db.numpy(), detail.numpy().astype(np.float16)
+
+
+def bucket_keys(summary, rms_db):
+    """Bucket of a chunk summary first, then neighbouring buckets worth probing."""
+    factor = SUMMARY_GRID // BUCKET_GRID
+    coarse = summary.reshape(BUCKET_GRID, factor, BUCKET_GRID, factor).mean(axis=(1, 3)).ravel()
+    values = np.append(np.clip(coarse, 0, 1) * BUCKET_LEVELS, rms_db / BUCKET_RMS_STEP_DB)
+    levels = np.floor(values).astype(np.int16)
+    levels[:-1] = np.minimum(levels[:-1], BUCKET_LEVELS - 1)
+    frac = values - np.floor(values)
+
+    # The cells closest to a step boundary could land on either side of it
+    distance = np.minimum(frac, 1 - frac)
+    ambiguous = [i for i in np.argsort(distance)[:MAX_PROBE_CELLS] if distance[i] < BUCKET_MARGIN]
+    keys = []
+    for flips in itertools.product((False, True), repeat=len(ambiguous)):
+        probe = levels.copy()
+        for i, flip in zip(ambiguous, flips):
+            if flip:
+                probe[i] += 1 if frac[i] >= 0.5 else -1
+        keys.append(probe.tobytes().hex())
+    return keys
+
+
+class ChunkCache:
+    """Two-tier LRU cache of per-chunk model outputs keyed by audio fingerprint.
+
+    Each entry holds the chunk's fake probability and, when the model exposes
+    FusionModel.embed, its 64-dim spectral and temporal embeddings. The memory
+    tier is bounded by `max_entries` (roughly 3 kB each); the optional SQLite
+    tier keeps up to `max_disk_entries` and promotes its hits into memory.
+
+    Args:
+        model_hash: Identifies the weights (and precision) entries came from
+        max_entries: Entries kept in memory before the least recently used are evicted
+        db_path: SQLite database file for the on-disk tier (None = memory only)
+        max_disk_entries: Entries kept on disk before the least recently used are evicted
+    """
+
+    EVICT_EVERY = 256
+
+    def __init__(self, model_hash, max_entries=20000, db_path=None, max_disk_entries=1000000):
+        self.model_hash = model_hash
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = collections.OrderedDict()
+        self._buckets = collections.defaultdict(set)
+        self._ids = itertools.count()
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        if self.db_path:
+            db = sqlite3.connect(self.db_path)
+            db.execute('''
+                CREATE TABLE IF NOT EXISTS chunk_cache (
+                    model_hash TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    summary BLOB NOT NULL,
+                    rms_db REAL NOT NULL,
+                    detail BLOB,
+                    probability REAL NOT NULL,
+                    spectral BLOB,
+                    temporal BLOB,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            columns = [row[1] for row in db.execute('PRAGMA table_info(chunk_cache)')]
+            if 'detail' not in columns:
+                # Rows cached before details were stored never match
+                db.execute('ALTER TABLE chunk_cache ADD COLUMN detail BLOB')
+            db.execute('CREATE INDEX IF NOT EXISTS idx_chunk_cache_bucket ON chunk_cache (model_hash, bucket)')
+            db.execute('CREATE INDEX IF NOT EXISTS idx_chunk_cache_last_used ON chunk_cache (last_used)')
+            db.commit()
+            db.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _matches(entry, summary, rms_db, detail):
+        if entry.detail is None or abs(entry.rms_db - rms_db) > MATCH_RMS_DB:
+            return False
+        if float(np.abs(entry.summary - summary).mean()) > MATCH_TOLERANCE:
+            return False
+        columns = np.abs(entry.detail.astype(np.float32) - detail).mean(axis=0)
+        return float(columns.max()) <= MATCH_DETAIL_TOLERANCE
+
+    def lookup(self, spectral_batch, temporal_batch):
+        """Find cached outputs for a batch of chunks.
+
+        Returns:
+            Tuple of (list of ChunkEntry or None per chunk, fingerprints to pass to put_many)
+        """
+        summaries, levels, details = summarize_chunks(spectral_batch, temporal_batch)
+        fingerprints = list(zip(summaries, levels.tolist(), details))
+        return [self._get(*fingerprint) for fingerprint in fingerprints], fingerprints
+
+    def _get(self, summary, rms_db, detail):
+        keys = bucket_keys(summary, rms_db)
+        detail = detail.astype(np.float32)
+        with self._lock:
+            for key in keys:
+                for entry_id in self._buckets.get(key, ()):
+                    entry = self._memory[entry_id]
+                    if self._matches(entry, summary, rms_db, detail):
+                        self._memory.move_to_end(entry_id)
+                        self.memory_hits += 1
+                        return entry
+
+            entry = self._get_disk(keys, summary, rms_db, detail) if self.db_path else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._add(entry)
+            return entry
+
+    def _get_disk(self, keys, summary, rms_db, detail):
+        db = self._connect()
+        try:
+            rows = db.execute(
+                'SELECT rowid, bucket, summary, rms_db, detail, probability, spectral, temporal FROM chunk_cache '
+                f'WHERE model_hash = ? AND bucket IN ({",".join("?" * len(keys))})',
+                [self.model_hash] + keys
+            ).fetchall()
+            for rowid, bucket, blob, level, detail_blob, probability, spectral, temporal in rows:
+                entry = ChunkEntry(
+                    bucket, np.frombuffer(blob, dtype=np.float32), level,
+                    np.frombuffer(detail_blob, dtype=np.float16).reshape(DETAIL_BANDS, DETAIL_FRAMES)
+                    if detail_blob is not None else None,
+                    probability,
+                    np.frombuffer(spectral, dtype=np.float32) if spectral is not None else None,
+                    np.frombuffer(temporal, dtype=np.float32) if temporal is not None else None
+                )
+                if self._matches(entry, summary, rms_db, detail):
+                    db.execute('UPDATE chunk_cache SET last_used = ? WHERE rowid = ?', (time.time(), rowid))
+                    db.commit()
+                    return entry
+            return None
+        finally:
+            db.close()
+
+    def _add(self, entry):
+        entry_id = next(self._ids)
+        self._memory[entry_id] = entry
+        self._buckets[entry.bucket].add(entry_id)
+        while len(self._memory) > self.max_entries:
+            old_id, old = self._memory.popitem(last=False)
+            bucket = self._buckets[old.bucket]
+            bucket.discard(old_id)
+            if not bucket:
+                del self._buckets[old.bucket]
+
+    def put_many(self, items):
+        """Store (fingerprint, probability, spectral embedding, temporal embedding) tuples."""
+        entries = [
+            ChunkEntry(bucket_keys(summary, rms_db)[0], summary, rms_db, detail, probability, spectral, temporal)
+            for (summary, rms_db, detail), probability, spectral, temporal in items
+        ]
+        with self._lock:
+            for entry in entries:
+                self._add(entry)
+            if self.db_path and entries:
+                self._put_disk(entries)
+
+    def _put_disk(self, entries):
+        def blob(array, dtype=np.float32):
+            return None if array is None else np.asarray(array, dtype=dtype).tobytes()
+
+        now = time.time()
+        db = self._connect()
+        try:
+            db.executemany(
+                'INSERT INTO chunk_cache (model_hash, bucket, summary, rms_db, detail, probability, spectral, '
+                'temporal, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(self.model_hash, e.bucket, blob(e.summary), e.rms_db, blob(e.detail, np.float16), e.probability,
+                  blob(e.spectral), blob(e.temporal), now) for e in entries]
+            )
+            self._puts += len(entries)
+            if self._puts >= self.EVICT_EVERY:
+                self._puts = 0
+                db.execute(
+                    '''DELETE FROM chunk_cache WHERE rowid IN (
+                        SELECT rowid FROM chunk_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )''',
+                    (self.max_disk_entries,)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else None,
+                "entries": len(self._memory),
+                "disk_tier": bool(self.db_path)
+            }
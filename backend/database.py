@@ -0,0 +1,366 @@
+"""
+SQLite setup for the API: schema migrations, WAL journaling, pooled connections
+and write-behind persistence of predictions.
+
+The schema version is kept in PRAGMA user_version; migrate() applies every
+newer entry of MIGRATIONS in order, so existing databases pick up new
+indexes on the next start. WAL mode lets history reads proceed while job
+workers insert predictions (readers never block the writer or each other).
+"""
+import base64
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Applied to every connection (journal_mode=WAL is persistent and set by migrate)
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",   # durable at checkpoints; safe with WAL
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16384",    # 16 MB page cache
+    "PRAGMA temp_store = MEMORY",
+)
+
+# (version, statements); version N is applied to databases at N - 1
+MIGRATIONS = [
+    (1, [
+        '''CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        '''CREATE TABLE IF NOT EXISTS predictions (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            label TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            real_probability REAL NOT NULL,
+            fake_probability REAL NOT NULL,
+            raw_score REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )''',
+    ]),
+    # History pages: one user's rows newest first. The rowid is implicitly the
+    # last index column, so (created_at, rowid) keysets are served by the index.
+    (2, [
+        'CREATE INDEX IF NOT EXISTS idx_predictions_user_created ON predictions (user_id, created_at)',
+    ]),
+    # Optional per-chunk scores of a prediction (PredictionWriter persist_chunks)
+    (3, [
+        '''CREATE TABLE IF NOT EXISTS prediction_chunks (
+            prediction_id TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            start_seconds REAL NOT NULL,
+            fake_probability REAL NOT NULL,
+            PRIMARY KEY (prediction_id, chunk_index),
+            FOREIGN KEY (prediction_id) REFERENCES predictions(id)
+        ) WITHOUT ROWID''',
+    ]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+def connect(db_path, check_same_thread=True):
+    """Open a connection with Row results and the tuned pragmas."""
+    db = sqlite3.connect(db_path, timeout=30, check_same_thread=check_same_thread)
+    db.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        db.execute(pragma)
+    return db
+
+
+def migrate(db_path, target=SCHEMA_VERSION):
+    """Bring the schema up to `target` and switch the database to WAL.
+
+    Returns:
+        List of the migration versions applied
+    """
+    db = sqlite3.connect(db_path, timeout=30)
+    try:
+        db.execute("PRAGMA journal_mode = WAL")
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        applied = []
+        for migration_version, statements in MIGRATIONS:
+            if version < migration_version <= target:
+                with db:
+                    for statement in statements:
+                        db.execute(statement)
+                    db.execute(f"PRAGMA user_version = {migration_version}")
+                applied.append(migration_version)
+        return applied
+    finally:
+        db.close()
+
+
+class ConnectionPool:
+    """Reusable connections for request and worker threads.
+
+    Connections are opened on demand and up to `max_idle` are kept for reuse,
+    so neither thread-per-request servers nor job workers pay for a connect
+    and the pragmas on every query. Each connection is used by one thread at
+    a time.
+    """
+
+    def __init__(self, db_path, max_idle=8):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.opened += 1
+            return connect(self.db_path, check_same_thread=False)
+
+    def release(self, db):
+        if db.in_transaction:
+            db.rollback()
+        if self._idle.qsize() < self.max_idle:
+            self._idle.put(db)
+        else:
+            db.close()
+
+    @contextmanager
+    def connection(self):
+        db = self.acquire()
+        try:
+            yield db
+        finally:
+            self.release(db)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def encode_cursor(created_at, rowid):
+    """Opaque history cursor for the position after the row (created_at, rowid)."""
+    return base64.urlsafe_b64encode(f"{created_at}|{rowid}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, rowid) from encode_cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, rowid = raw.rsplit("|", 1)
+        return created_at, int(rowid)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def fetch_history(db, user_id, limit=HISTORY_PAGE_SIZE, cursor=None):
+    """One page of a user's predictions, newest first (keyset pagination).
+
+    Rows are ordered by (created_at, rowid) descending, so pages stay stable
+    while new predictions are inserted, and every page is an index range
+    scan no matter how deep it is.
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    if cursor is None:
+        rows = db.execute(
+            '''SELECT rowid, * FROM predictions WHERE user_id = ?
+            ORDER BY created_at DESC, rowid DESC LIMIT ?''',
+            (user_id, limit + 1)
+        ).fetchall()
+    else:
+        created_at, rowid = decode_cursor(cursor)
+        rows = db.execute(
+            '''SELECT rowid, * FROM predictions WHERE user_id = ?
+            AND (created_at, rowid) < (?, ?)
+            ORDER BY created_at DESC, rowid DESC LIMIT ?''',
+            (user_id, created_at, rowid, limit + 1)
+        ).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]['created_at'], rows[-1]['rowid'])
+
+
+INSERT_PREDICTION = '''INSERT INTO predictions
+    (id, user_id, filename, label, confidence, real_probability, fake_probability, raw_score, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+INSERT_CHUNK = '''INSERT INTO prediction_chunks (prediction_id, chunk_index, start_seconds, fake_probability)
+    VALUES (?, ?, ?, ?)'''
+
+
+class PredictionWriter:
+    """Write-behind persistence of prediction rows.
+
+    record() queues the row and returns at once; a background thread inserts
+    queued rows in one transaction once `max_batch_rows` are waiting or the
+    oldest has waited `max_delay_ms`, so requests never wait on a commit and
+    concurrent requests do not contend for the write lock. With
+    max_delay_ms=0 every row is written and committed inside record(), and
+    the same happens if the writer thread has stopped.
+
+    A batch that still fails after `max_attempts` tries (e.g. the database
+    is read-only or the disk is full) is dropped and counted in stats(), so
+    one lasting error cannot stall the writer.
+
+    flush() blocks until everything recorded so far is committed or dropped
+    (used before history reads and at shutdown); close() flushes and stops
+    the thread.
+
+    Args:
+        db_path: SQLite database (migrated to at least schema version 3)
+        max_batch_rows: Predictions per transaction at most
+        max_delay_ms: Longest time a recorded prediction stays in memory
+        persist_chunks: Also store the per-chunk scores passed to record()
+        max_attempts: Tries per batch before its rows are dropped
+    """
+
+    def __init__(self, db_path, max_batch_rows=100, max_delay_ms=200, persist_chunks=False, max_attempts=5):
+        self.db_path = db_path
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay_ms / 1000
+        self.persist_chunks = persist_chunks
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._counts = {"written": 0, "batches": 0, "failed_batches": 0, "dropped_rows": 0}
+        self._thread = None
+        self._db = None
+        if self.max_delay > 0:
+            self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+            self._thread.start()
+
+    def record(self, user_id, filename, result, chunk_scores=None):
+        """Persist one prediction; returns its id.
+
+        Args:
+            result: build_result dict (label and probability fields)
+            chunk_scores: Optional (chunk_index, start_seconds, fake_probability)
+                tuples, stored if persist_chunks is set
+        """
+        pred_id = str(uuid.uuid4())
+        row = (
+            pred_id, user_id, filename, result['label'], result['confidence'],
+            result['real_probability'], result['fake_probability'], result['raw_score'],
+            # Same format as CURRENT_TIMESTAMP, taken now rather than at flush time
+            time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        )
+        chunks = [(pred_id, *chunk) for chunk in chunk_scores] if self.persist_chunks and chunk_scores else []
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put((row, chunks))
+            return pred_id
+
+        # No writer thread (anymore): write now, with anything it left queued
+        records = [(row, chunks)]
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                records.insert(-1, item)
+            elif item is not None:
+                item.set()
+        with self._lock:
+            self._write(records)
+        return pred_id
+
+    def flush(self, timeout=None):
+        """Wait until every prediction recorded before this call is committed."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Flush and stop the writer thread (durable shutdown)."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts["queued"] = self._queue.qsize()
+        counts["mean_batch_rows"] = round(counts["written"] / counts["batches"], 2) if counts["batches"] else None
+        return counts
+
+    def _write(self, records):
+        """Insert records in one transaction; on failure they are retried by the caller."""
+        if self._db is None:
+            self._db = connect(self.db_path, check_same_thread=False)
+        try:
+            with self._db:
+                self._db.executemany(INSERT_PREDICTION, [row for row, _ in records])
+                chunks = [chunk for _, record_chunks in records for chunk in record_chunks]
+                if chunks:
+                    self._db.executemany(INSERT_CHUNK, chunks)
+        except sqlite3.Error:
+            self._counts["failed_batches"] += 1
+            raise
+        self._counts["written"] += len(records)
+        self._counts["batches"] += 1
+
+    def _run(self):
+        pending = []
+        waiters = []
+        stopping = False
+        while not stopping:
+            # Block for the first record, then gather until the batch is full or due
+            timeout = None
+            deadline = None
+            while True:
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_delay
+                if len(pending) >= self.max_batch_rows:
+                    break
+                timeout = max(deadline - time.monotonic(), 0)
+
+            attempts = 0
+            while pending:
+                try:
+                    with self._lock:
+                        self._write(pending)
+                    pending = []
+                except sqlite3.Error as e:
+                    # Keep the rows and retry, up to max_attempts tries
+                    attempts += 1
+                    if attempts >= self.max_attempts:
+                        print(f"Prediction writer: dropping {len(pending)} rows after {attempts} attempts ({e})")
+                        with self._lock:
+                            self._counts["dropped_rows"] += len(pending)
+                        pending = []
+                        break
+                    print(f"Prediction writer: {len(pending)} rows not written yet ({e}), retrying")
+                    time.sleep(1)
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
@@ -6,9 +6,11 @@ from moviepy import VideoFileClip
 import sys
 
 # Mocking model definitions for diagnostic script if needed, or just import from model.py
-sys.path.append(os.path.join(os.getcwd(), "backend"))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from model import preprocess_audio, extract_spectral, extract_temporal
 
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 def analyze_audio(filepath, label):
     print(f"\n--- Analyzing {label}: {filepath} ---")
     y, sr = librosa.load(filepath, sr=16000)
@@ -31,7 +33,7 @@ def analyze_audio(filepath, label):
 
 if __name__ == "__main__":
     # Test with a real audio file if available
-    real_audio = r"c:\Users\HARRISH\Final-year-project\real\real1.flac"
+    real_audio = os.path.join(REPO_ROOT, "real", "real1.flac")
     if os.path.exists(real_audio):
         analyze_audio(real_audio, "Original Audio")
     else:
@@ -0,0 +1,170 @@
+"""
+Export the hybrid FusionModel to TorchScript and ONNX for the non-eager
+inference backends (INFERENCE_BACKEND=torchscript / onnxruntime).
+
+Both graphs take spectral (batch, 3, 224, 224) and temporal
+(batch, frames, 400) inputs with dynamic batch and frame axes, and return
+logits of shape (batch,). After exporting, every backend is checked against
+eager PyTorch on random inputs of several shapes and on the bundled real/
+and fake/ samples, and timed on one batch of chunks.
+
+Usage (from the repo root or backend/):
+    python backend/export_model.py --model backend/hybrid_efficientnet_gru.pth [--tolerance 1e-4]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    load_model, preprocess_audio, get_audio_chunks, extract_spectral_batch,
+    extract_temporal, predict_robust, IMG_SIZE
+)
+from inference import load_backend
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ONNX_OPSET = 17
+
+
+class LogitsModel(nn.Module):
+    """FusionModel with a fixed (batch,) output shape.
+
+    FusionModel.forward squeezes its output, which is 0-d for a batch of one;
+    exported graphs keep the batch axis so the output shape is static in rank.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, spec, temp):
+        return self.model(spec, temp).reshape(-1)
+
+
+def example_inputs(batch_size=2, frames=398):
+    return (torch.rand(batch_size, 3, IMG_SIZE, IMG_SIZE),
+            torch.randn(batch_size, frames, 400) * 0.1)
+
+
+def export_torchscript(model, path):
+    """Trace and freeze the model (weights folded into the graph)."""
+    with torch.no_grad():
+        traced = torch.jit.trace(LogitsModel(model).eval(), example_inputs())
+        frozen = torch.jit.freeze(traced)
+    frozen.save(path)
+
+
+def export_onnx(model, path):
+    """Export an ONNX graph with dynamic batch and temporal frame axes."""
+    torch.onnx.export(
+        LogitsModel(model).eval(), example_inputs(), path,
+        input_names=["spectral", "temporal"],
+        output_names=["logits"],
+        dynamic_axes={
+            "spectral": {0: "batch"},
+            "temporal": {0: "batch", 1: "frames"},
+            "logits": {0: "batch"}
+        },
+        opset_version=ONNX_OPSET,
+        dynamo=False
+    )
+
+
+def max_logit_diff(reference, backend, shapes):
+    """Largest absolute logit difference against eager over random input shapes."""
+    diff = 0.0
+    for batch_size, frames in shapes:
+        spec, temp = example_inputs(batch_size, frames)
+        with torch.no_grad():
+            expected = reference(spec, temp).reshape(-1)
+            actual = backend(spec, temp).reshape(-1)
+        diff = max(diff, (expected - actual).abs().max().item())
+    return diff
+
+
+def time_forward(backend, spec, temp, repeats):
+    """Median seconds per forward pass over `repeats` runs (after one warm-up)."""
+    times = []
+    with torch.no_grad():
+        backend(spec, temp)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            backend(spec, temp)
+            times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TorchScript/ONNX export and backend parity check")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--output-dir", default=None, help="Defaults to the checkpoint's directory")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="Maximum allowed logit difference")
+    parser.add_argument("--batch-size", type=int, default=8, help="Chunks per timed forward pass")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.model))
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+    paths = {
+        "torchscript": os.path.join(output_dir, f"{stem}.torchscript.pt"),
+        "onnxruntime": os.path.join(output_dir, f"{stem}.onnx")
+    }
+
+    model, _ = load_model(args.model)
+    model = model.cpu()
+    device = torch.device("cpu")
+
+    for name, export in (("torchscript", export_torchscript), ("onnxruntime", export_onnx)):
+        start = time.perf_counter()
+        export(model, paths[name])
+        print(f"Exported {paths[name]} in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(paths[name]) / 1e6:.1f} MB)")
+
+    backends = {"eager": model}
+    for name, path in paths.items():
+        backends[name], _ = load_backend(name, path)
+
+    shapes = [(1, 398), (5, 398), (3, 120)]
+    files = []
+    for folder in ("real", "fake"):
+        files += sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))
+
+    y, sr = preprocess_audio(files[0])
+    chunks = (get_audio_chunks(y, sr) * args.batch_size)[:args.batch_size]
+    spec = extract_spectral_batch(chunks, sr)
+    temp = torch.stack([extract_temporal(chunk) for chunk in chunks])
+    eager_time = time_forward(model, spec, temp, args.repeats)
+
+    all_ok = True
+    print(f"\n{'backend':<12} {'max logit diff':>14} {'max score diff':>14} {'labels':>7} {'ms/batch':>9} {'speedup':>8}")
+    for name, backend in backends.items():
+        logit_diff = max_logit_diff(model, backend, shapes)
+        score_diff = 0.0
+        mismatches = 0
+        for path in files:
+            y, sr = preprocess_audio(path)
+            expected = predict_robust(model, device, y, sr)
+            actual = predict_robust(backend, device, y, sr)
+            score_diff = max(score_diff, abs(expected["raw_score"] - actual["raw_score"]))
+            mismatches += expected["label"] != actual["label"]
+
+        elapsed = eager_time if name == "eager" else time_forward(backend, spec, temp, args.repeats)
+        ok = logit_diff <= args.tolerance and mismatches == 0
+        all_ok &= ok
+        print(f"{name:<12} {logit_diff:>14.2e} {score_diff:>14.2e} "
+              f"{'ok' if mismatches == 0 else mismatches:>7} {elapsed * 1000:>9.1f} "
+              f"{eager_time / elapsed:>7.2f}x" + ("" if ok else "  MISMATCH"))
+
+    print("PARITY OK" if all_ok else "PARITY FAILED")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
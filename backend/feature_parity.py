@@ -0,0 +1,107 @@
+"""
+Parity check for the batched feature extractors in model.py.
+
+Compares extract_spectral_batch, the torch MelFrontend and extract_temporal
+against the original per-chunk librosa implementation on the bundled samples
+(plus a synthetic long file) and reports the max absolute difference and the
+extraction time per second of audio for each path.
+
+Usage (from the repo root or backend/):
+    python backend/feature_parity.py [--tolerance 1e-5]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    IMG_SIZE, MelFrontend, preprocess_audio, get_audio_chunks,
+    extract_spectral_batch, extract_temporal
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def reference_spectral(y, sr):
+    """Per-chunk spectral features exactly as model.py computed them originally."""
+    mel = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128)
+    mel_db = librosa.power_to_db(mel)
+    mel_db = (mel_db - mel_db.min()) / (mel_db.max() - mel_db.min() + 1e-6)
+    mel_db = torch.tensor(mel_db).unsqueeze(0)
+    mel_db = torch.nn.functional.interpolate(
+        mel_db.unsqueeze(0),
+        size=(IMG_SIZE, IMG_SIZE),
+        mode="bilinear",
+        align_corners=False
+    ).squeeze(0)
+    return mel_db.repeat(3, 1, 1).float()
+
+
+def reference_temporal(y):
+    """Per-chunk temporal frames exactly as model.py computed them originally."""
+    frames = librosa.util.frame(y, frame_length=400, hop_length=160)
+    return torch.tensor(frames.T).float()
+
+
+def check_file(name, y, sr, frontend, tolerance):
+    chunks = get_audio_chunks(y, sr)
+    audio_seconds = len(y) / sr
+
+    start = time.perf_counter()
+    ref_spec = torch.stack([reference_spectral(c, sr) for c in chunks])
+    ref_temp = torch.stack([reference_temporal(c) for c in chunks])
+    ref_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spec = extract_spectral_batch(chunks, sr)
+    temp = torch.stack([extract_temporal(c) for c in chunks])
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        torch_spec = frontend(torch.from_numpy(np.stack(chunks)))
+    torch_time = time.perf_counter() - start
+
+    spec_diff = (spec - ref_spec).abs().max().item()
+    torch_diff = (torch_spec - ref_spec).abs().max().item()
+    temp_diff = (temp - ref_temp).abs().max().item()
+    ok = max(spec_diff, torch_diff, temp_diff) <= tolerance
+    print(f"{name:<24} chunks={len(chunks):<4} "
+          f"diff batched={spec_diff:.1e} torch={torch_diff:.1e} temporal={temp_diff:.1e} | "
+          f"ms/audio-s per-chunk={1000 * ref_time / audio_seconds:.2f} "
+          f"batched={1000 * batch_time / audio_seconds:.2f} "
+          f"torch={1000 * torch_time / audio_seconds:.2f} "
+          f"{'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    frontend = MelFrontend().eval()
+    all_ok = True
+    files = sorted(glob.glob(os.path.join(REPO_ROOT, "real", "*.flac")) +
+                   glob.glob(os.path.join(REPO_ROOT, "fake", "*.flac")))
+    for path in files:
+        y, sr = preprocess_audio(path)
+        all_ok &= check_file(os.path.relpath(path, REPO_ROOT), y, sr, frontend, args.tolerance)
+
+    # Synthetic 60s file so the regular and the end-aligned chunks are exercised
+    rng = np.random.default_rng(0)
+    y = librosa.util.normalize(rng.standard_normal(60 * 16000 + 12345).astype(np.float32))
+    all_ok &= check_file("synthetic-60s", y, 16000, frontend, args.tolerance)
+
+    print("\nPARITY OK" if all_ok else "\nPARITY FAILED")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
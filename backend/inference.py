@@ -0,0 +1,80 @@
+"""
+Pluggable inference backends for the FusionModel.
+Every backend is called like the model itself — backend(spectral, temporal)
+returns a tensor of logits — so predict_batch, predict_robust and the
+BatchScheduler work unchanged whichever one is configured.
+"""
+import torch
+
+from model import load_model
+
+INFERENCE_BACKENDS = ("eager", "torchscript", "onnxruntime")
+
+# Artifacts written by export_model.py next to the checkpoint
+DEFAULT_MODEL_PATHS = {
+    "eager": "hybrid_efficientnet_gru.pth",
+    "torchscript": "hybrid_efficientnet_gru.torchscript.pt",
+    "onnxruntime": "hybrid_efficientnet_gru.onnx"
+}
+
+
+class TorchScriptBackend:
+    """Frozen TorchScript graph exported by export_model.py (no Python model code)."""
+
+    def __init__(self, model_path, device):
+        self.module = torch.jit.load(model_path, map_location=device)
+        self.module.eval()
+
+    def __call__(self, spec, temp):
+        return self.module(spec, temp)
+
+
+class OnnxRuntimeBackend:
+    """ONNX graph run by ONNX Runtime on CPU with full graph optimizations.
+
+    Args:
+        model_path: .onnx file exported by export_model.py
+        num_threads: Intra-op threads per forward pass (0 = ONNX Runtime default)
+    """
+
+    def __init__(self, model_path, num_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, spec, temp):
+        logits = self.session.run(["logits"], {
+            "spectral": spec.cpu().numpy(),
+            "temporal": temp.cpu().numpy()
+        })[0]
+        return torch.from_numpy(logits)
+
+
+def load_backend(backend, model_path, precision="fp32", num_threads=0, mmap=False):
+    """Load the model behind the configured inference backend.
+
+    Args:
+        backend: "eager" (PyTorch FusionModel), "torchscript" or "onnxruntime"
+        model_path: Checkpoint (.pth) for eager, exported artifact otherwise
+        precision: Passed to load_model; only the eager backend supports "int8"
+        num_threads: ONNX Runtime intra-op threads (0 = default)
+        mmap: Memory-map the checkpoint (eager backend only, see load_model)
+
+    Returns:
+        Tuple of (callable model, device)
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' (expected one of {INFERENCE_BACKENDS})")
+    if backend == "eager":
+        return load_model(model_path, precision, mmap)
+    if precision != "fp32":
+        raise ValueError(f"Precision '{precision}' is only supported by the eager backend")
+
+    if backend == "torchscript":
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        return TorchScriptBackend(model_path, device), device
+    return OnnxRuntimeBackend(model_path, num_threads), torch.device("cpu")
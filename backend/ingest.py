@@ -0,0 +1,477 @@
+"""
+Streaming audio ingest — decode uploads incrementally and score chunks as they arrive.
+Audio is decoded to 16 kHz mono float32 by an ffmpeg subprocess fed straight from
+the request stream, so memory stays O(chunk) instead of O(file). Saved files
+of any length are scored the same way (predict_file_stream).
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+from model import (
+    CHUNK_DURATION, CHUNK_OVERLAP, DEFAULT_BATCH_SIZE,
+    predict_chunks, build_result, add_timeline, chunk_speech_ratio, get_chunk_ranges, soundfile_duration,
+    timed_stage, RANGE_PAST_END_MESSAGE
+)
+
+# Containers whose index may sit at the end of the file (e.g. mp4 'moov'),
+# so ffmpeg has to be able to seek; these are spooled to a temp file first.
+SEEKABLE_EXTENSIONS = {'.mp4', '.m4a', '.mov'}
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def get_ffmpeg_exe():
+    """Path to the ffmpeg binary (the one bundled with moviepy's imageio-ffmpeg)."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        exe = shutil.which("ffmpeg")
+        if exe is None:
+            raise ValueError("ffmpeg is not available for audio decoding")
+        return exe
+
+
+def needs_seekable_input(filename):
+    """Check if the container must be decoded from a seekable file rather than a pipe."""
+    return os.path.splitext(filename)[1].lower() in SEEKABLE_EXTENSIONS
+
+
+def decode_audio_blocks(source, sr=16000, block_seconds=1.0, start=None, duration=None):
+    """Decode audio to mono float32 at `sr`, yielding it block by block.
+
+    Only the audio stream is demuxed and decoded (video streams are skipped),
+    and resampling happens once, inside ffmpeg.
+
+    Args:
+        source: File path, or a binary file-like object that is piped to
+            ffmpeg's stdin as it is read (e.g. a request stream)
+        sr: Output sample rate
+        block_seconds: Size of the yielded blocks in seconds
+        start: Optional offset in seconds to start decoding from (a file
+            is seeked; a stream is still read from the beginning)
+        duration: Optional maximum number of seconds to decode
+
+    Yields:
+        np.ndarray float32 blocks (the last one may be shorter)
+    """
+    from_pipe = not isinstance(source, (str, os.PathLike))
+    span = []
+    if start:
+        span += ["-ss", str(start)]
+    if duration is not None:
+        span += ["-t", str(duration)]
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-v", "error"]
+    if from_pipe:
+        # A pipe cannot seek: the span is cut from the decoded output, which is exact
+        cmd += ["-i", "pipe:0"] + span
+    else:
+        # Input seeking jumps through the container index, so only the span is decoded
+        cmd += ["-nostdin"] + span + ["-i", os.fspath(source)]
+    cmd += ["-vn", "-sn", "-dn", "-ac", "1", "-ar", str(sr), "-f", "f32le", "pipe:1"]
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if from_pipe else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    def feed():
+        try:
+            for block in iter(lambda: source.read(READ_BLOCK_SIZE), b''):
+                proc.stdin.write(block)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    stderr = []
+    feeder = threading.Thread(target=feed, daemon=True) if from_pipe else None
+    reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    if feeder:
+        feeder.start()
+    reader.start()
+
+    block_bytes = int(block_seconds * sr) * 4
+    try:
+        while True:
+            # Buffered reads return the full block size until EOF
+            data = proc.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32).copy()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        reader.join(timeout=1)
+        if feeder:
+            feeder.join(timeout=1)
+
+    if proc.returncode != 0:
+        message = b"".join(stderr).decode(errors="replace").strip()
+        if "does not contain any stream" in message:
+            raise ValueError("File contains no audio track")
+        last_line = message.splitlines()[-1] if message else "ffmpeg error"
+        raise ValueError(f"Failed to decode audio: {last_line}")
+
+
+def load_audio(source, sr=16000, start=None, duration=None):
+    """Decode the audio track of an audio or video file straight into memory.
+
+    Replaces the moviepy route (VideoFileClip → temp WAV → librosa.load) for
+    video uploads: no video decoding, no intermediate file, one resample.
+
+    Args:
+        source: File path or binary file-like object
+        sr: Output sample rate
+        start: Optional offset in seconds
+        duration: Optional maximum number of seconds to decode
+
+    Returns:
+        np.ndarray float32 waveform (not normalized)
+    """
+    blocks = list(decode_audio_blocks(source, sr, block_seconds=10.0, start=start, duration=duration))
+    if not blocks and start:
+        raise ValueError(RANGE_PAST_END_MESSAGE)
+    if not blocks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(blocks)
+
+
+def probe_duration(path):
+    """Container duration in seconds from ffmpeg's header probe, or None if it reports none."""
+    proc = subprocess.run([get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-i", os.fspath(path)],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    match = re.search(rb"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", proc.stderr)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def media_duration(path):
+    """Duration in seconds of an audio or video file without decoding it (None if unknown)."""
+    duration = soundfile_duration(path)
+    return duration if duration is not None else probe_duration(path)
+
+
+def iter_file_blocks(path, sr=16000, block_seconds=10.0, start=None, duration=None):
+    """Decode a saved file block by block to mono float32 at `sr`.
+
+    Formats soundfile reads (wav, flac, mp3, ogg) are read with it and
+    resampled by a streaming soxr resampler: the decoder and resampler of
+    preprocess_audio, so the concatenated blocks equal its waveform before
+    normalization. Other formats are decoded by ffmpeg (decode_audio_blocks).
+    Only one block is held at a time.
+
+    Args:
+        path: Audio or video file
+        sr: Output sample rate
+        block_seconds: Block size in seconds of input audio
+        start: Optional offset in seconds
+        duration: Optional maximum number of seconds to decode
+
+    Yields:
+        np.ndarray float32 blocks
+    """
+    total = soundfile_duration(path)
+    if total is None:
+        yield from decode_audio_blocks(path, sr, block_seconds, start=start, duration=duration)
+        return
+    if start and start >= total:
+        raise ValueError(RANGE_PAST_END_MESSAGE)
+
+    native_sr = sf.info(path).samplerate
+    resampler = None
+    if native_sr != sr:
+        # librosa.resample's default (soxr_hq); streaming gives the same samples as one call
+        resampler = soxr.ResampleStream(native_sr, sr, 1, dtype="float32", quality="HQ")
+    # Offsets are truncated to samples like librosa.load's
+    frames = -1 if duration is None else int(duration * native_sr)
+    decoded = resampled = 0
+    for block in sf.blocks(path, blocksize=int(block_seconds * native_sr), start=int((start or 0) * native_sr),
+                           frames=frames, dtype="float32", always_2d=True):
+        block = block.mean(axis=1)  # librosa.to_mono
+        decoded += len(block)
+        if resampler is not None:
+            block = resampler.resample_chunk(block)
+        resampled += len(block)
+        if len(block):
+            yield block
+    if resampler is not None:
+        # librosa.resample fixes the output to ceil(n * sr / native_sr) samples
+        tail = resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+        length = max(int(np.ceil(decoded * sr / native_sr)) - resampled, 0)
+        tail = np.pad(tail[:length], (0, max(length - len(tail), 0)))
+        if len(tail):
+            yield tail
+
+
+def timed_blocks(blocks, timings, name="decode"):
+    """Pass blocks through, adding the time spent producing them to `timings` stage `name`."""
+    iterator = iter(blocks)
+    while True:
+        with timed_stage(timings, name):
+            block = next(iterator, None)
+        if block is None:
+            return
+        yield block
+
+
+def spool_stream(stream, suffix, dir=None):
+    """Copy a binary stream to a named temp file for containers that need seeking."""
+    spooled = tempfile.NamedTemporaryFile(suffix=suffix, dir=dir, delete=False)
+    with spooled:
+        shutil.copyfileobj(stream, spooled, READ_BLOCK_SIZE)
+    return spooled.name
+
+
+class StreamingChunker:
+    """Incremental equivalent of get_audio_chunks.
+
+    Fed blocks of samples, it emits the same (offset, chunk) windows that
+    get_chunk_offsets would produce for the complete waveform — including the
+    end-aligned tail chunk and the padded single chunk for short audio — while
+    buffering at most one chunk plus one hop of samples.
+    """
+
+    def __init__(self, sr, duration=CHUNK_DURATION, overlap=CHUNK_OVERLAP):
+        self.sr = sr
+        self.chunk_size = duration * sr
+        self.hop_size = (duration - overlap) * sr
+        self.total = 0
+        self.next_offset = 0
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0
+
+    def feed(self, block):
+        """Add samples; returns the list of (offset, chunk) windows now complete."""
+        self._buffer = np.concatenate([self._buffer, block])
+        self.total += len(block)
+
+        ready = []
+        while self.next_offset + self.chunk_size <= self.total:
+            start = self.next_offset - self._buffer_start
+            ready.append((self.next_offset, self._buffer[start:start + self.chunk_size]))
+            self.next_offset += self.hop_size
+
+        # Keep the last chunk_size samples for a possible end-aligned tail chunk
+        keep_from = min(self.next_offset, self.total - self.chunk_size)
+        if keep_from > self._buffer_start:
+            self._buffer = self._buffer[keep_from - self._buffer_start:]
+            self._buffer_start = keep_from
+        return ready
+
+    def finish(self):
+        """Return the trailing window(s) once the stream has ended."""
+        if self.total <= self.chunk_size:
+            if self.next_offset > 0:
+                return []
+            return [(0, np.pad(self._buffer, (0, self.chunk_size - self.total)))]
+
+        if self.total % self.hop_size != 0 and (self.total - self.chunk_size) > self.sr * 0.5:
+            return [(self.total - self.chunk_size, self._buffer[-self.chunk_size:])]
+        return []
+
+
+class LevelMeter:
+    """Peak sample and loudest VAD frame of the audio fed so far.
+
+    The peak is what preprocess_audio normalizes by, and the loudest frame
+    RMS is detect_speech's reference level; both are tracked block by block
+    (frames spanning two blocks included) without keeping the audio.
+    """
+
+    def __init__(self, frame_length=400, hop_length=160):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.peak = 0.0
+        self.loudest_rms = 0.0
+        self.total = 0
+        self._carry = np.zeros(0, dtype=np.float32)
+
+    def update(self, block):
+        self.total += len(block)
+        if len(block):
+            self.peak = max(self.peak, float(np.abs(block).max()))
+        frames = np.concatenate([self._carry, block])
+        if len(frames) >= self.frame_length:
+            count = (len(frames) - self.frame_length) // self.hop_length + 1
+            rms = librosa.feature.rms(y=frames[:(count - 1) * self.hop_length + self.frame_length],
+                                      frame_length=self.frame_length, hop_length=self.hop_length, center=False)[0]
+            self.loudest_rms = max(self.loudest_rms, float(rms.max()))
+            frames = frames[count * self.hop_length:]
+        self._carry = frames
+
+
+def check_length(total, sr):
+    """The empty and too-short checks of normalize_audio, on a sample count."""
+    if total == 0:
+        raise ValueError("Audio file is empty or contains no data")
+    if total < sr * 0.1:
+        raise ValueError("Audio file is too short (minimum 0.1 seconds required)")
+
+
+def score_blocks(model, device, blocks, sr=16000, batch_size=DEFAULT_BATCH_SIZE, frontend=None,
+                 chunk_cache=None, levels=None, min_speech_ratio=None, timings=None):
+    """Chunk decoded blocks as they arrive and score them one micro-batch at a time.
+
+    Chunks come from a StreamingChunker and are dropped once scored, so
+    memory holds one block, one chunk plus a hop, and one micro-batch no
+    matter how long the audio is.
+
+    Args:
+        levels: LevelMeter of the complete audio (two-pass normalization:
+            chunks are divided by the file's peak, exactly like
+            preprocess_audio), or None to divide each chunk by the running
+            peak of the samples decoded so far (one pass)
+        min_speech_ratio: Optional VAD gating as in predict_robust; the
+            loudest frame is taken from `levels` (or the running level)
+        timings: Optional instrumentation.StageTimer for predict_chunks
+
+    Returns:
+        Tuple of (scored, num_chunks, total_samples, first_score_at): scored
+        is a list of (chunk_index, offset, probability) in chunk order
+    """
+    running = levels is None
+    levels = levels or LevelMeter()
+    chunker = StreamingChunker(sr)
+    scored = []
+    pending = []  # (chunk_index, offset, normalized chunk)
+    fallback = None  # (ratio, entry) of the chunk with the most speech, if VAD rejects them all
+    num_chunks = 0
+    first_score_at = None
+
+    def score(batch):
+        nonlocal first_score_at
+        probabilities = predict_chunks(model, device, [chunk for _, _, chunk in batch], sr, batch_size,
+                                       frontend, chunk_cache, timings)
+        scored.extend((index, offset, p) for (index, offset, _), p in zip(batch, probabilities))
+        if first_score_at is None:
+            first_score_at = time.perf_counter()
+
+    def add(windows):
+        nonlocal num_chunks, fallback
+        for offset, chunk in windows:
+            index = num_chunks
+            num_chunks += 1
+            # Same as librosa.util.normalize of the whole waveform when `levels` covers it
+            entry = (index, offset, chunk / levels.peak if levels.peak > np.finfo(np.float32).tiny else chunk)
+            if min_speech_ratio is not None:
+                ratio = chunk_speech_ratio(chunk, levels.loudest_rms)
+                if ratio < min_speech_ratio:
+                    if fallback is None or ratio > fallback[0]:
+                        fallback = (ratio, entry)
+                    continue
+            pending.append(entry)
+
+    for block in blocks:
+        if running:
+            levels.update(block)
+        add(chunker.feed(block))
+        while len(pending) >= batch_size:
+            score(pending[:batch_size])
+            del pending[:batch_size]
+
+    check_length(chunker.total, sr)
+    add(chunker.finish())
+    for i in range(0, len(pending), batch_size):
+        score(pending[i:i + batch_size])
+    if not scored:
+        score([fallback[1]])
+    return scored, num_chunks, chunker.total, first_score_at
+
+
+def predict_file_stream(model, device, path, batch_size=DEFAULT_BATCH_SIZE, frontend=None, chunk_cache=None,
+                        min_speech_ratio=None, two_pass=True, start=None, duration=None, timings=None,
+                        chunk_scores=None, sr=16000):
+    """predict_robust for a saved file of any length, in bounded memory.
+
+    The file is decoded block by block (iter_file_blocks) and its chunks are
+    scored as they are cut, so peak memory does not grow with the duration
+    (preprocess_audio holds the whole waveform plus a normalized copy, and
+    get_audio_chunks keeps every chunk referenced).
+
+    Peak normalization needs the loudest sample of the whole file. With
+    two_pass (the default) a first pass decodes the file only to measure it
+    (LevelMeter), and the second pass scores chunks normalized by the true
+    peak: results equal preprocess_audio + predict_robust for formats
+    soundfile reads, at the cost of decoding twice (small next to inference).
+    Without it, one pass divides each chunk by the running peak, like
+    predict_stream: earlier chunks can be scaled differently when the file
+    gets louder later on.
+
+    Shared GRU frames and early exit need the whole waveform and are not
+    used here. The "decode" stage of `timings` covers both passes.
+
+    Returns:
+        Result dict in the predict_robust format, plus "audio_seconds"
+    """
+    levels = None
+    if two_pass:
+        levels = LevelMeter()
+        for block in timed_blocks(iter_file_blocks(path, sr, start=start, duration=duration), timings):
+            levels.update(block)
+        check_length(levels.total, sr)
+
+    scored, num_chunks, total, _ = score_blocks(
+        model, device, timed_blocks(iter_file_blocks(path, sr, start=start, duration=duration), timings), sr,
+        batch_size, frontend, chunk_cache, levels, min_speech_ratio, timings
+    )
+    entries = [(index, offset / sr, p) for index, offset, p in scored]
+    if chunk_scores is not None:
+        chunk_scores.extend(entries)
+    probabilities = [p for _, _, p in scored]
+    if min_speech_ratio is None:
+        result = add_timeline(build_result(probabilities), entries, total / sr)
+    else:
+        result = add_timeline(build_result(probabilities, num_chunks=num_chunks), entries, total / sr)
+        offsets = {index: offset for index, offset, _ in scored}
+        result["analyzed_ranges"] = get_chunk_ranges(offsets, sorted(offsets), total, sr)
+        analyzed = sum(end - start for start, end in result["analyzed_ranges"])
+        result["skipped_fraction"] = round(max(0.0, 1 - analyzed * sr / total), 4)
+    result["audio_seconds"] = round(total / sr, 3)
+    return result
+
+
+def predict_stream(model, device, blocks, sr=16000, batch_size=DEFAULT_BATCH_SIZE, frontend=None,
+                   chunk_cache=None):
+    """Score decoded audio blocks as they arrive, one micro-batch at a time.
+
+    preprocess_audio peak-normalizes the whole waveform, which needs the
+    complete file. Here each chunk is instead divided by the running peak of
+    all samples decoded so far (including that chunk), so results equal the
+    buffered path whenever the loudest sample occurs in or before the first
+    chunk, and otherwise differ only in the scale of the earlier chunks.
+    ffmpeg's resampler is also used instead of librosa's, so non-16 kHz
+    inputs can differ slightly at the sample level.
+
+    Returns:
+        Result dict in the predict_robust format, plus streaming timings
+    """
+    start = time.perf_counter()
+    scored, _, total, first_score_at = score_blocks(model, device, blocks, sr, batch_size, frontend, chunk_cache)
+    end = time.perf_counter()
+
+    result = build_result([p for _, _, p in scored])
+    add_timeline(result, [(index, offset / sr, p) for index, offset, p in scored], total / sr)
+    result["audio_seconds"] = round(total / sr, 3)
+    result["timings"] = {
+        "time_to_first_score_ms": round((first_score_at - start) * 1000, 2),
+        "total_ms": round((end - start) * 1000, 2)
+    }
+    return result
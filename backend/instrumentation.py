@@ -0,0 +1,91 @@
+"""
+Prometheus metrics and per-request stage timers for the prediction API.
+Served on /metrics in the Prometheus text format. With several worker
+processes, point PROMETHEUS_MULTIPROC_DIR at an empty shared directory so
+every worker's samples are aggregated.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Stage and request durations span sub-millisecond steps to multi-minute uploads
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "deepfake_stage_seconds", "Time per request spent in each prediction stage",
+    ["stage"], buckets=DURATION_BUCKETS
+)
+REQUESTS = Counter(
+    "deepfake_requests_total", "API requests by route, method and status code",
+    ["endpoint", "method", "status"]
+)
+REQUEST_SECONDS = Histogram(
+    "deepfake_request_seconds", "API request latency until the response starts",
+    ["endpoint"], buckets=DURATION_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    "deepfake_requests_in_flight", "API requests being handled (including streamed responses)",
+    ["endpoint"], multiprocess_mode="livesum"
+)
+AUDIO_SECONDS = Counter(
+    "deepfake_audio_seconds_total", "Seconds of audio analyzed", ["source"]
+)
+CHUNKS = Counter(
+    "deepfake_chunks_total", "4 s chunks scored (including chunk cache hits)", ["source"]
+)
+
+
+class StageTimer:
+    """Durations of the stages of one prediction request.
+
+    A stage that runs several times in a request (e.g. once per micro-batch)
+    is summed, and each stage's total is observed into STAGE_SECONDS once,
+    by observe(), so the histogram describes whole requests.
+    """
+
+    def __init__(self):
+        self.durations = {}  # stage → seconds, in order of first use
+        self._last_end = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last_end = time.perf_counter()
+            self.durations[name] = self.durations.get(name, 0.0) + self._last_end - start
+
+    def since_last_stage(self, name):
+        """Record the time since the previous stage ended (e.g. waiting in the job queue)."""
+        now = time.perf_counter()
+        self.durations[name] = self.durations.get(name, 0.0) + now - self._last_end
+        self._last_end = now
+
+    def observe(self):
+        for name, seconds in self.durations.items():
+            STAGE_SECONDS.labels(name).observe(seconds)
+
+    def to_dict(self):
+        """Milliseconds per stage, for the optional `timings` response field."""
+        return {f"{name}_ms": round(seconds * 1000, 2) for name, seconds in self.durations.items()}
+
+
+def count_audio(source, audio_seconds, chunks):
+    """Count analyzed audio and chunks for one prediction from `source` (the endpoint kind)."""
+    AUDIO_SECONDS.labels(source).inc(audio_seconds)
+    CHUNKS.labels(source).inc(chunks)
+
+
+def render_metrics():
+    """Current metrics in the Prometheus text format, as (body, content type)."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
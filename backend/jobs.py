@@ -0,0 +1,156 @@
+"""
+Background inference job queue for the Flask API.
+A bounded pool of worker threads runs prediction jobs against the shared model,
+so long uploads no longer tie up the request thread that received them.
+"""
+import queue
+import threading
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobError(Exception):
+    """Raised by a job handler to fail a job with a specific HTTP status."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    """A single queued prediction and its lifecycle timestamps."""
+
+    def __init__(self, owner, args):
+        self.id = str(uuid.uuid4())
+        self.owner = owner
+        self.args = args
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.error_status = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def timings(self):
+        """Queue wait, run and total time in milliseconds (None until known)."""
+        def ms(start, end):
+            return round((end - start) * 1000, 2) if start and end else None
+
+        now = time.monotonic()
+        return {
+            "queue_wait_ms": ms(self.submitted_at, self.started_at or now),
+            "run_ms": ms(self.started_at, self.finished_at),
+            "total_ms": ms(self.submitted_at, self.finished_at)
+        }
+
+    def to_dict(self):
+        data = {"job_id": self.id, "status": self.status, "timings": self.timings()}
+        if self.status == "done":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """Bounded FIFO of jobs served by a fixed pool of worker threads.
+
+    Args:
+        handler: Callable run as handler(*job.args) on a worker thread. Its
+            return value becomes the job result; raising JobError fails the job
+            with that status, any other exception fails it with status 500.
+        num_workers: Number of worker threads (concurrent inferences)
+        max_queue: Maximum number of jobs waiting to start
+        retention: Seconds a finished job stays available for polling
+    """
+
+    def __init__(self, handler, num_workers=2, max_queue=16, retention=3600):
+        self.handler = handler
+        self.retention = retention
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._running = 0
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"inference-worker-{i}", daemon=True)
+            for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, owner, *args):
+        """Enqueue a job, raising QueueFullError if the queue is at capacity."""
+        job = Job(owner, args)
+        with self._lock:
+            self._prune()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError("Inference queue is full. Please retry shortly.")
+            self._jobs[job.id] = job
+        return job
+
+    def add_completed(self, owner, result):
+        """Register a job that finished without running (e.g. a cache hit)."""
+        job = Job(owner, ())
+        job.started_at = job.finished_at = job.submitted_at
+        job.result = result
+        job.status = "done"
+        job.done.set()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id, owner=None):
+        """Look up a job by id, optionally restricted to the submitting owner."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job.owner != owner):
+            return None
+        return job
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "running": self._running,
+                "capacity": self._queue.maxsize,
+                "workers": len(self._workers)
+            }
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self._running += 1
+            job.started_at = time.monotonic()
+            job.status = "running"
+            try:
+                job.result = self.handler(*job.args)
+                job.status = "done"
+            except JobError as e:
+                job.error, job.error_status = str(e), e.status
+                job.status = "failed"
+            except Exception as e:
+                job.error, job.error_status = str(e), 500
+                job.status = "failed"
+            finally:
+                job.finished_at = time.monotonic()
+                with self._lock:
+                    self._running -= 1
+                job.done.set()
+                self._queue.task_done()
@@ -0,0 +1,368 @@
+"""
+Real-time detection on a live audio stream (e.g. call monitoring).
+Incoming samples go into a ring buffer holding the last window (4 s) of audio,
+and a window is scored every hop (2 s) at the offsets get_audio_chunks uses,
+so a live stream is scored on the same windows as an upload of its recording.
+"""
+import json
+import math
+import queue
+import threading
+import time
+
+import librosa
+import numpy as np
+import torch
+
+from model import (
+    CHUNK_DURATION, CHUNK_OVERLAP,
+    spectral_from_mel, extract_spectral_batch, extract_temporal, predict_batch, build_result, add_timeline
+)
+from ingest import decode_audio_blocks
+
+# Wire formats of the binary messages: raw 16 kHz mono PCM, or an encoded
+# stream ffmpeg can decode from a pipe (Ogg/WebM Opus as sent by MediaRecorder)
+LIVE_FORMATS = ("pcm_s16le", "pcm_f32le", "opus")
+
+# Decoded block size for encoded streams (bounds the decode-side latency)
+LIVE_DECODE_BLOCK_SECONDS = 0.1
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of the most recent samples of a stream.
+
+    Positions are absolute sample indices in the stream; `total` is the
+    number of samples written so far.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self._data = np.zeros(capacity, dtype=np.float32)
+
+    def extend(self, samples):
+        if len(samples) > self.capacity:
+            raise ValueError("Block is larger than the ring buffer")
+        start = self.total % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+        self.total += len(samples)
+
+    def get(self, start, end):
+        """Copy of the samples at stream positions [start, end)."""
+        if start < self.total - self.capacity or end > self.total:
+            raise ValueError("Requested samples are not in the ring buffer")
+        return np.take(self._data, np.arange(start, end) % self.capacity)
+
+
+class IncrementalMelSpectrogram:
+    """Mel power frames of a growing stream, computed as the samples arrive.
+
+    Gives the same frames as librosa.feature.melspectrogram (centered, zero
+    padded) run on each window. Frame centers are laid out on a stream-wide
+    grid with spacing gcd(hop_length, window hop), so every window's frames
+    are grid points. A grid frame is computed once, as soon as its n_fft
+    samples are in, and reused by every window it belongs to. Only the two
+    frames at each end of a window, which see that window's zero padding,
+    are computed when the window completes.
+
+    With the default 512-sample STFT hop, a 2 s window hop at 16 kHz is 62.5
+    STFT hops. Overlapping windows' frames are offset by half a hop, so no
+    frame is shared. The frames are still computed before their window closes,
+    which leaves little STFT work between the last sample and the score.
+    """
+
+    def __init__(self, sr, window_size, window_hop, n_fft=2048, hop_length=512, n_mels=128):
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.window_size = window_size
+        self.grid = math.gcd(hop_length, window_hop)
+        self.num_frames = 1 + window_size // hop_length
+        self.fft_window = librosa.filters.get_window("hann", n_fft, fftbins=True).astype(np.float32)
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+        # Computed grid frames: self._frames[:, i] is centered at (self._first + i) * grid
+        self._first = -(-(n_fft // 2) // self.grid)
+        self._frames = np.zeros((n_mels, 0), dtype=np.float32)
+
+    def _mel_frames(self, segments):
+        power = np.abs(np.fft.rfft(segments * self.fft_window, axis=-1)) ** 2
+        return (self.mel_basis @ power.T.astype(np.float32)).astype(np.float32)
+
+    def update(self, ring):
+        """Compute every grid frame whose samples are all in the ring buffer."""
+        half = self.n_fft // 2
+        first_new = self._first + self._frames.shape[1]
+        last_new = (ring.total - half) // self.grid
+        if last_new < first_new:
+            return
+        start = first_new * self.grid - half
+        samples = ring.get(start, last_new * self.grid + half)
+        segments = np.lib.stride_tricks.sliding_window_view(samples, self.n_fft)[::self.grid]
+        self._frames = np.concatenate([self._frames, self._mel_frames(segments)], axis=1)
+
+    def window(self, offset, ring):
+        """Mel power spectrogram (n_mels, num_frames) of the window starting at `offset`."""
+        half = self.n_fft // 2
+        centers = offset + np.arange(self.num_frames) * self.hop_length
+        interior = (centers - half >= offset) & (centers + half <= offset + self.window_size)
+
+        mel = np.empty((self._frames.shape[0], self.num_frames), dtype=np.float32)
+        mel[:, interior] = self._frames[:, centers[interior] // self.grid - self._first]
+
+        # Edge frames see the window's own zero padding
+        chunk = np.pad(ring.get(offset, offset + self.window_size), half)
+        edges = np.flatnonzero(~interior)
+        segments = np.stack([chunk[c - offset:c - offset + self.n_fft] for c in centers[edges]])
+        mel[:, edges] = self._mel_frames(segments)
+        return mel
+
+    def discard_before(self, position):
+        """Drop grid frames centered before `position` (no later window needs them)."""
+        drop = min(max(0, position // self.grid - self._first), self._frames.shape[1])
+        self._frames = self._frames[:, drop:]
+        self._first += drop
+
+
+class LiveDetector:
+    """Scores a live stream every window hop, keeping only the last window of audio.
+
+    feed() takes mono float samples at `sr` as they arrive. It returns one
+    update per window those samples complete, with that window's probability,
+    the running max-aggregated verdict and the latency from the arrival of the
+    window's last samples to its score. finish() adds the tail windows
+    get_audio_chunks would produce, once the stream has ended.
+
+    Samples are divided by the running peak of the stream, as predict_stream
+    does. The STFT is linear, so the scale is applied to the finished mel
+    frames instead of being recomputed.
+    """
+
+    def __init__(self, model, device, sr=16000, duration=CHUNK_DURATION, overlap=CHUNK_OVERLAP):
+        self.model = model
+        self.device = device
+        self.sr = sr
+        self.window_size = duration * sr
+        self.window_hop = (duration - overlap) * sr
+        self.mel = IncrementalMelSpectrogram(sr, self.window_size, self.window_hop)
+        self.ring = RingBuffer(self.window_size + self.mel.n_fft)
+        self.next_offset = 0
+        self.peak = 0.0
+        self.probabilities = []
+        self.offsets = []  # window start (samples) of each probability
+        self.latencies = []
+
+    def _scale(self):
+        return 1.0 / self.peak if self.peak > np.finfo(np.float32).tiny else 1.0
+
+    def _window_features(self, offset):
+        scale = self._scale()
+        spec = spectral_from_mel(self.mel.window(offset, self.ring)[np.newaxis] * scale ** 2)[0]
+        temp = extract_temporal(self.ring.get(offset, offset + self.window_size) * scale)
+        return spec, temp
+
+    def _score(self, windows, arrived_at):
+        """Score (offset, spec, temp) windows in one batch and build their updates."""
+        if not windows:
+            return []
+        probabilities = predict_batch(
+            self.model, self.device,
+            torch.stack([spec for _, spec, _ in windows]), torch.stack([temp for _, _, temp in windows])
+        )
+        latency_ms = (time.perf_counter() - arrived_at) * 1000
+        updates = []
+        for (offset, _, _), probability in zip(windows, probabilities):
+            self.probabilities.append(probability)
+            self.offsets.append(offset)
+            self.latencies.append(latency_ms)
+            updates.append({
+                "type": "window",
+                "index": len(self.probabilities) - 1,
+                "start": round(offset / self.sr, 3),
+                "end": round((offset + self.window_size) / self.sr, 3),
+                "probability": round(probability, 6),
+                "running": build_result(self.probabilities),
+                "latency_ms": round(latency_ms, 2)
+            })
+        return updates
+
+    def feed(self, samples, arrived_at=None):
+        """Add samples; returns the updates of the windows they complete.
+
+        Args:
+            samples: Mono float waveform block at `sr`
+            arrived_at: time.perf_counter() when the block arrived (default: now)
+        """
+        arrived_at = time.perf_counter() if arrived_at is None else arrived_at
+        samples = np.asarray(samples, dtype=np.float32)
+        windows = []
+        pos = 0
+        while pos < len(samples):
+            # Never write past the end of the next window before it is scored
+            window_end = self.next_offset + self.window_size
+            piece = samples[pos:pos + min(window_end - self.ring.total, self.window_size)]
+            pos += len(piece)
+            self.ring.extend(piece)
+            self.peak = max(self.peak, float(np.abs(piece).max()))
+            self.mel.update(self.ring)
+
+            if self.ring.total == window_end:
+                spec, temp = self._window_features(self.next_offset)
+                windows.append((self.next_offset, spec, temp))
+                self.next_offset += self.window_hop
+                self.mel.discard_before(self.next_offset)
+        return self._score(windows, arrived_at)
+
+    def finish(self):
+        """Score the trailing window(s) and summarize the session.
+
+        Returns:
+            Tuple of (updates, result) where result is in the build_result
+            format plus timeline, audio_seconds, windows and latency percentiles
+
+        Raises:
+            ValueError: If the stream was empty or too short
+        """
+        total = self.ring.total
+        if total == 0:
+            raise ValueError("No audio received")
+        if total < self.sr * 0.1:
+            raise ValueError("Audio stream is too short (minimum 0.1 seconds required)")
+
+        started = time.perf_counter()
+        tail = None
+        if total <= self.window_size:
+            if self.next_offset == 0:
+                tail = (0, np.pad(self.ring.get(0, total), (0, self.window_size - total)))
+        elif total % self.window_hop != 0 and (total - self.window_size) > self.sr * 0.5:
+            tail = (total - self.window_size, self.ring.get(total - self.window_size, total))
+
+        updates = []
+        if tail is not None:
+            offset, chunk = tail
+            chunk = chunk * self._scale()
+            spec = extract_spectral_batch(chunk[np.newaxis], self.sr)[0]
+            updates = self._score([(offset, spec, extract_temporal(chunk))], started)
+
+        latencies = np.array(self.latencies)
+        result = build_result(self.probabilities)
+        scored = [(i, offset / self.sr, p) for i, (offset, p) in enumerate(zip(self.offsets, self.probabilities))]
+        add_timeline(result, scored, total / self.sr)
+        result["audio_seconds"] = round(total / self.sr, 3)
+        result["latency_ms"] = {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "max": round(float(latencies.max()), 2)
+        }
+        return updates, result
+
+
+class _InboxReader:
+    """File-like view of the queued message bytes, for decode_audio_blocks."""
+
+    def __init__(self, inbox):
+        self.inbox = inbox
+        self.closed = False
+
+    def read(self, size=-1):
+        if self.closed:
+            return b''
+        item = self.inbox.get()
+        if item is None:
+            self.closed = True
+            return b''
+        return item[0]
+
+
+def _pcm_blocks(inbox, dtype):
+    """Yield (samples, arrival time) from queued raw PCM messages."""
+    itemsize = np.dtype(dtype).itemsize
+    leftover = b''
+    while True:
+        item = inbox.get()
+        if item is None:
+            return
+        data, arrived_at = leftover + item[0], item[1]
+        usable = len(data) - len(data) % itemsize
+        leftover = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=dtype)
+        if dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        yield samples, arrived_at
+
+
+def _decoded_blocks(inbox, sr):
+    """Yield (samples, decode time) from a queued encoded stream.
+
+    Latency for encoded input is measured from when ffmpeg hands over the
+    decoded block, so it leaves out the decoder's own buffering.
+    """
+    for block in decode_audio_blocks(_InboxReader(inbox), sr, block_seconds=LIVE_DECODE_BLOCK_SECONDS):
+        yield block, time.perf_counter()
+
+
+def run_session(detector, ws, fmt="pcm_s16le", poll_seconds=1.0):
+    """Run one live session over a WebSocket-like connection.
+
+    Binary messages carry audio in `fmt`. A text message "end", or closing
+    the connection, ends the stream. Messages are queued by this thread and
+    decoded and scored on a worker thread, so latencies include time spent
+    waiting behind earlier windows. Each scored window is sent as a JSON
+    "window" message, and the session ends with a "final" message (or
+    "error").
+
+    Args:
+        detector: LiveDetector for this session
+        ws: Connection with receive(timeout) (None on timeout) and send(text)
+        fmt: One of LIVE_FORMATS
+        poll_seconds: How often the receive loop checks whether scoring stopped
+
+    Returns:
+        The final result dict, or None if the session ended with an error
+    """
+    inbox = queue.Queue()
+    stopped = threading.Event()
+    final = {}
+
+    def send(message):
+        try:
+            ws.send(json.dumps(message))
+        except Exception:
+            pass  # Client already gone; keep scoring so the result is recorded
+
+    def process():
+        try:
+            if fmt == "opus":
+                blocks = _decoded_blocks(inbox, detector.sr)
+            else:
+                blocks = _pcm_blocks(inbox, np.int16 if fmt == "pcm_s16le" else np.float32)
+            for samples, arrived_at in blocks:
+                for update in detector.feed(samples, arrived_at):
+                    send(update)
+            updates, result = detector.finish()
+            for update in updates:
+                send(update)
+            final.update(result)
+            send(dict(result, type="final"))
+        except ValueError as e:
+            send({"type": "error", "error": str(e)})
+        except Exception as e:
+            send({"type": "error", "error": f"An error occurred during prediction: {str(e)}"})
+        finally:
+            stopped.set()
+
+    worker = threading.Thread(target=process, daemon=True)
+    worker.start()
+    while not stopped.is_set():
+        try:
+            message = ws.receive(timeout=poll_seconds)
+        except Exception:
+            break  # Connection closed by the client
+        if isinstance(message, str):
+            if message.strip().lower() == "end":
+                break
+        elif message:
+            inbox.put((message, time.perf_counter()))
+    inbox.put(None)
+    worker.join()
+    return final or None
@@ -0,0 +1,85 @@
+"""
+Load test for the cross-request BatchScheduler.
+
+Simulates concurrent /api/predict jobs scoring the same file and compares the
+per-request path (each job runs its own forward passes) against the dynamic
+batching path, reporting throughput, latency and the scheduler's batch-size
+histogram.
+
+Usage (from the repo root or backend/):
+    python backend/loadtest_batching.py --model backend/hybrid_efficientnet_gru.pth \\
+        --file fake/fake7.flac --clients 1 4 8 --requests 4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import load_model, preprocess_audio, predict_robust, MelFrontend
+from batching import BatchScheduler
+
+
+def run_load(inference_model, device, frontend, y, sr, clients, requests_per_client, batch_size):
+    latencies = []
+    lock = threading.Lock()
+    num_chunks = []
+
+    def client():
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            result = predict_robust(inference_model, device, y, sr, batch_size, frontend)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                num_chunks.append(result["num_chunks"])
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests_per_s": len(latencies) / wall,
+        "chunks_per_s": sum(num_chunks) / wall,
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_ms": 1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dynamic batching load test")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--file", default=os.path.join("fake", "fake7.flac"))
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=4, help="Requests per client")
+    parser.add_argument("--batch-size", type=int, default=4, help="Per-request micro-batch size")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    model, device = load_model(args.model)
+    frontend = MelFrontend().to(device)
+    y, sr = preprocess_audio(args.file)
+
+    # Warm up allocator / kernels so the first configuration isn't penalized
+    predict_robust(model, device, y, sr, args.batch_size, frontend)
+
+    print(f"{'clients':>7} {'path':<10} {'req/s':>8} {'chunks/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for clients in args.clients:
+        direct = run_load(model, device, frontend, y, sr, clients, args.requests, args.batch_size)
+        scheduler = BatchScheduler(model, args.max_batch_size, args.max_wait_ms)
+        batched = run_load(scheduler, device, frontend, y, sr, clients, args.requests, args.batch_size)
+        for name, stats in (("direct", direct), ("batched", batched)):
+            print(f"{clients:>7} {name:<10} {stats['requests_per_s']:>8.2f} {stats['chunks_per_s']:>9.2f} "
+                  f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f}")
+        print(f"        scheduler: {scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    main()
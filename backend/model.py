@@ -2,16 +2,52 @@
 Hybrid Deepfake Audio Detection Model — EfficientNet-B0 + GRU Fusion
 Matches the architecture from train_improved.py for loading hybrid_efficientnet_gru.pth
 """
+import contextlib
+import copy
 import torch
 import torch.nn as nn
 import librosa
 import numpy as np
+import soundfile as sf
 import os
-from torchvision import models
-from moviepy import VideoFileClip
+import warnings
 
 IMG_SIZE = 224
 
+# Sliding-window chunking used by get_audio_chunks / predict_robust
+CHUNK_DURATION = 4  # seconds
+CHUNK_OVERLAP = 2  # seconds
+
+# Number of 4s chunks stacked into one forward pass by predict_robust.
+# Bounds peak memory on long files (each chunk is ~0.6 MB of input tensors).
+DEFAULT_BATCH_SIZE = 16
+
+# Early-exit mode: once any chunk scores above this, the max-aggregated
+# verdict can no longer change, so the remaining chunks are skipped
+EARLY_EXIT_THRESHOLD = 0.95
+EARLY_EXIT_STRIDE = 3
+
+# Energy VAD: 400-sample frames (hop 160) within this many dB of the loudest
+# frame count as speech; chunks with too little speech can be skipped
+VAD_THRESHOLD_DB = -40.0
+
+# File-level score from chunk probabilities: max flags a file if any window
+# looks fake; mean, the mean of the top k and a quantile are less sensitive to
+# one outlier window (and to short fakes)
+AGGREGATES = ("max", "mean", "topk", "quantile")
+DEFAULT_TOP_K = 3
+DEFAULT_QUANTILE = 0.9
+
+# Timeline windows above this probability are merged into suspicious segments
+SEGMENT_THRESHOLD = 0.5
+
+# Windows per GRU recurrence in predict_chunks_shared; the scripted recurrence
+# gains more over nn.GRU the more windows share each step (~2x at 64)
+SHARED_FRAMES_GROUP = 64
+
+# load_model precisions; "int8" runs on CPU with quantized kernels
+MODEL_PRECISIONS = ("fp32", "int8")
+
 
 # =========================
 # Model Architecture
@@ -20,7 +56,10 @@ class SpectralEfficientNet(nn.Module):
     """EfficientNet-B0 branch for mel-spectrogram (spectral) features."""
     def __init__(self):
         super().__init__()
-        self.backbone = models.efficientnet_b0(weights="IMAGENET1K_V1")
+        # Imported here so the TorchScript/ONNX backends never load torchvision
+        from torchvision import models
+        # No pretrained weights: every parameter is overwritten by the checkpoint
+        self.backbone = models.efficientnet_b0(weights=None)
         self.backbone.classifier = nn.Identity()
         self.fc = nn.Linear(1280, 64)
 
@@ -41,6 +80,72 @@ class TemporalGRU(nn.Module):
         x = self.fc(h[-1])
         return x
 
+    def forward_windows(self, frames, starts, num_steps):
+        """Embeddings of overlapping windows of one frame sequence.
+
+        Same as forward(frames[s:s + num_steps]) for every start s, but the
+        GRU input projection (about three quarters of its multiply-adds) is
+        computed once per frame instead of once per window containing it,
+        and the recurrence runs as a TorchScript loop over all windows.
+        Every window's recurrence still starts from a zero hidden state, so
+        the result is exact up to float rounding.
+
+        Args:
+            frames: torch.Tensor of shape (num_frames, 400)
+            starts: Start frame of each window
+            num_steps: Frames per window
+
+        Returns:
+            torch.Tensor of shape (len(starts), 64)
+        """
+        gru = self.gru
+        first = min(starts)
+        projected = torch.addmm(
+            gru.bias_ih_l0, frames[first:max(starts) + num_steps], gru.weight_ih_l0.t()
+        )  # (T, 3 * hidden)
+        rows = [start - first for start in starts]
+        gates = projected.size(1)
+
+        spacing = rows[1] - rows[0] if len(rows) > 1 else 0
+        if all(row == rows[0] + i * spacing for i, row in enumerate(rows)):
+            # Evenly spaced windows (the usual hop grid): a view, no copy
+            steps = projected.as_strided(
+                (num_steps, len(rows), gates), (gates, spacing * gates, 1), rows[0] * gates
+            )
+        else:
+            steps = projected[torch.tensor(rows)[None, :] + torch.arange(num_steps)[:, None]]
+
+        h = _gru_recurrence()(steps, gru.weight_hh_l0, gru.bias_hh_l0)
+        return self.fc(h)
+
+
+def _gru_steps(steps: torch.Tensor, weight_hh: torch.Tensor, bias_hh: torch.Tensor) -> torch.Tensor:
+    """nn.GRU recurrence on precomputed input gates (num_steps, batch, 3 * hidden)."""
+    hidden = weight_hh.size(1)
+    h = steps.new_zeros(steps.size(1), hidden)
+    weight = weight_hh.t()
+    for step in range(steps.size(0)):
+        gi = steps[step]
+        gh = torch.addmm(bias_hh, h, weight)
+        rz = torch.sigmoid(gi[:, :2 * hidden] + gh[:, :2 * hidden])
+        n = torch.tanh(gi[:, 2 * hidden:] + rz[:, :hidden] * gh[:, 2 * hidden:])
+        h = n + rz[:, hidden:] * (h - n)
+    return h
+
+
+_scripted_gru_steps = None
+
+
+def _gru_recurrence():
+    """_gru_steps compiled with TorchScript on first use (keeps it out of startup)."""
+    global _scripted_gru_steps
+    if _scripted_gru_steps is None:
+        with warnings.catch_warnings():
+            # torch.jit.script is deprecated in favor of torch.compile, which needs a compiler toolchain
+            warnings.simplefilter("ignore", FutureWarning)
+            _scripted_gru_steps = torch.jit.script(_gru_steps)
+    return _scripted_gru_steps
+
 
 class FusionModel(nn.Module):
     """Hybrid model fusing SpectralEfficientNet and TemporalGRU branches.
@@ -64,13 +169,71 @@ class FusionModel(nn.Module):
             nn.Linear(64, 1)
         )
 
-    def forward(self, spec, temp):
-        f1 = self.spectral(spec)
-        f2 = self.temporal(temp)
+    def embed(self, spec, temp):
+        """64-dim spectral and temporal embeddings of each chunk."""
+        return self.spectral(spec), self.temporal(temp)
+
+    def classify(self, f1, f2):
+        """Logits from the branch embeddings returned by embed()."""
         fused = torch.cat((f1, f2), dim=1)
         out = self.classifier(fused)
         return out.squeeze()
 
+    def forward(self, spec, temp):
+        f1, f2 = self.embed(spec, temp)
+        return self.classify(f1, f2)
+
+
+class MelFrontend(nn.Module):
+    """Torch-native equivalent of extract_spectral_batch.
+
+    Computes the mel spectrogram, dB conversion (80 dB floor), per-chunk
+    min-max normalization, resize to IMG_SIZE and 3-channel expansion on a
+    (N, samples) waveform batch, so chunks can go from waveform to logits
+    without NumPy round trips. The window and mel filterbank are precomputed
+    as non-persistent buffers, so FusionModel checkpoints are unaffected.
+
+    Input: torch.Tensor of shape (N, samples)
+    Output: torch.Tensor of shape (N, 3, 224, 224)
+    """
+    def __init__(self, sr=16000, n_fft=2048, hop_length=512, n_mels=128, top_db=80.0):
+        super().__init__()
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.top_db = top_db
+        self.register_buffer(
+            "window", torch.hann_window(n_fft, periodic=True), persistent=False
+        )
+        self.register_buffer(
+            "mel_basis",
+            torch.from_numpy(librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)),
+            persistent=False
+        )
+
+    def forward(self, x):
+        spec = torch.stft(
+            x, self.n_fft, self.hop_length, window=self.window,
+            center=True, pad_mode="constant", return_complex=True
+        )
+        power = spec.real ** 2 + spec.imag ** 2
+        mel = torch.matmul(self.mel_basis, power)  # (N, 128, T)
+
+        mel_db = 10.0 * torch.log10(torch.clamp(mel, min=1e-10))
+        mel_db = torch.maximum(mel_db, mel_db.amax(dim=(1, 2), keepdim=True) - self.top_db)
+
+        mel_min = mel_db.amin(dim=(1, 2), keepdim=True)
+        mel_max = mel_db.amax(dim=(1, 2), keepdim=True)
+        mel_db = (mel_db - mel_min) / (mel_max - mel_min + 1e-6)
+
+        mel_db = torch.nn.functional.interpolate(
+            mel_db.unsqueeze(1),
+            size=(IMG_SIZE, IMG_SIZE),
+            mode="bilinear",
+            align_corners=False
+        )  # (N, 1, 224, 224)
+
+        return mel_db.expand(-1, 3, -1, -1)
+
 
 # =========================
 # Supported File Extensions
@@ -95,49 +258,174 @@ def is_video_file(filename):
 # =========================
 # Audio / Video Processing
 # =========================
-def extract_audio_from_video(video_path, output_path="temp_audio.wav"):
-    """Extract audio track from a video file."""
+def extract_audio_from_video(video_path, output_path="temp_audio.wav", start=None, duration=None):
+    """Extract audio track from a video file.
+
+    With `start` and/or `duration` (seconds), only that span is written.
+    """
+    # moviepy is only needed here, so it is not imported at startup
+    from moviepy import VideoFileClip
+
     try:
         clip = VideoFileClip(video_path)
         if clip.audio is None:
             clip.close()
             raise ValueError("Video file contains no audio track")
-        clip.audio.write_audiofile(output_path, fps=16000, logger=None)
+        audio = clip.audio
+        if start or duration is not None:
+            if (start or 0) >= audio.duration:
+                clip.close()
+                raise ValueError(RANGE_PAST_END_MESSAGE)
+            end = audio.duration if duration is None else min((start or 0) + duration, audio.duration)
+            audio = audio.subclipped(start or 0, end)
+        audio.write_audiofile(output_path, fps=16000, logger=None)
         clip.close()
         return output_path
     except Exception as e:
         raise ValueError(f"Failed to extract audio from video: {str(e)}")
 
 
-def preprocess_audio(filepath):
+RANGE_PAST_END_MESSAGE = "The requested range starts after the end of the file."
+
+
+def soundfile_duration(filepath):
+    """Duration in seconds from the file header, or None if soundfile cannot read the format."""
+    try:
+        return sf.info(filepath).duration
+    except RuntimeError:
+        return None
+
+
+def resolve_time_range(start=None, end=None, max_duration=None):
+    """The span to analyze for the start/end/max_duration options (seconds).
+
+    Args:
+        start: Offset to start at (default 0)
+        end: Optional time to stop at
+        max_duration: Optional cap on the analyzed length
+
+    Returns:
+        Tuple of (start, duration), duration None meaning to the end of the
+        file; or None if the whole file is analyzed
+
+    Raises:
+        ValueError: If a value is negative or the range is empty
+    """
+    start = start or 0.0
+    if start < 0:
+        raise ValueError("start must not be negative.")
+    duration = None
+    if end is not None:
+        if end <= start:
+            raise ValueError("end must be after start.")
+        duration = end - start
+    if max_duration is not None:
+        if max_duration <= 0:
+            raise ValueError("max_duration must be positive.")
+        duration = max_duration if duration is None else min(duration, max_duration)
+    if start == 0 and duration is None:
+        return None
+    return start, duration
+
+
+def timed_stage(timings, name):
+    """timings.stage(name) if a StageTimer is given, else a no-op context."""
+    return timings.stage(name) if timings is not None else contextlib.nullcontext()
+
+
+def normalize_audio(y, sr):
+    """Validate a decoded 16 kHz waveform and peak-normalize it.
+
+    Args:
+        y: Audio waveform array
+        sr: Sample rate
+
+    Returns:
+        Tuple of (audio_array, sample_rate)
+    """
+    if len(y) == 0:
+        raise ValueError("Audio file is empty or contains no data")
+
+    # Minimum audio length check (at least 0.1 seconds)
+    if len(y) < sr * 0.1:
+        raise ValueError("Audio file is too short (minimum 0.1 seconds required)")
+
+    y = librosa.util.normalize(y)
+    return y, sr
+
+
+def preprocess_audio(filepath, timings=None, start=None, duration=None):
     """Load audio, resample to 16 kHz, and normalize.
     Does NOT trim to 4s here anymore to allow sliding window.
 
+    With `start` and/or `duration`, only that span is decoded, so time and
+    memory scale with the span rather than the file: formats soundfile reads
+    (wav, flac, mp3, ogg) seek to the offset, and the others (m4a, aac, wma),
+    which librosa would decode from the beginning, are decoded by ffmpeg
+    with input seeking.
+
     Args:
         filepath: Path to audio file
+        timings: Optional instrumentation.StageTimer ("decode" and "resample" stages)
+        start: Optional offset in seconds to start decoding from
+        duration: Optional maximum number of seconds to decode
 
     Returns:
         Tuple of (audio_array, sample_rate)
     """
     try:
-        y, sr = librosa.load(filepath, sr=16000)
+        if start or duration is not None:
+            total = soundfile_duration(filepath)
+            if total is None:
+                # ingest imports this module, so it is imported here
+                from ingest import load_audio
+                with timed_stage(timings, "decode"):
+                    y = load_audio(filepath, start=start, duration=duration)
+                return normalize_audio(y, 16000)
+            if (start or 0) >= total:
+                raise ValueError(RANGE_PAST_END_MESSAGE)
 
-        if len(y) == 0:
-            raise ValueError("Audio file is empty or contains no data")
-
-        # Minimum audio length check (at least 0.1 seconds)
-        if len(y) < sr * 0.1:
-            raise ValueError("Audio file is too short (minimum 0.1 seconds required)")
-
-        y = librosa.util.normalize(y)
-        return y, sr
+        # Same as librosa.load(filepath, sr=16000), split so both steps can be timed
+        with timed_stage(timings, "decode"):
+            y, native_sr = librosa.load(filepath, sr=None, offset=start or 0.0, duration=duration)
+        with timed_stage(timings, "resample"):
+            if native_sr != 16000:
+                y = librosa.resample(y, orig_sr=native_sr, target_sr=16000)
+        return normalize_audio(y, 16000)
     except ValueError:
         raise
     except Exception as e:
         raise ValueError(f"Failed to preprocess audio: {str(e)}")
 
 
-def get_audio_chunks(y, sr, duration=4, overlap=2):
+def get_chunk_offsets(num_samples, sr, duration=CHUNK_DURATION, overlap=CHUNK_OVERLAP):
+    """Start offsets (in samples) of the chunks produced by get_audio_chunks.
+
+    Args:
+        num_samples: Length of the audio waveform
+        sr: Sample rate
+        duration: Duration of each chunk in seconds
+        overlap: Overlap between chunks in seconds
+
+    Returns:
+        List of chunk start offsets
+    """
+    chunk_size = duration * sr
+    hop_size = (duration - overlap) * sr
+
+    if num_samples <= chunk_size:
+        return [0]
+
+    offsets = list(range(0, num_samples - chunk_size + 1, hop_size))
+
+    # If there's a significant remainder, add a last chunk aligned to the end
+    if num_samples % hop_size != 0 and (num_samples - chunk_size) > sr * 0.5:
+        offsets.append(num_samples - chunk_size)
+
+    return offsets
+
+
+def get_audio_chunks(y, sr, duration=CHUNK_DURATION, overlap=CHUNK_OVERLAP):
     """Split audio into overlapping chunks.
     
     Args:
@@ -147,89 +435,251 @@ def get_audio_chunks(y, sr, duration=4, overlap=2):
         overlap: Overlap between chunks in seconds
         
     Returns:
-        List of chunks, each being a numpy array
+        List of chunks, each being a numpy array (a view into `y` unless padded)
     """
     chunk_size = duration * sr
-    hop_size = (duration - overlap) * sr
     
     if len(y) <= chunk_size:
         # Pad to chunk_size if shorter
         padded = np.pad(y, (0, max(0, chunk_size - len(y))))
         return [padded]
     
-    chunks = []
-    for i in range(0, len(y) - chunk_size + 1, hop_size):
-        chunks.append(y[i:i + chunk_size])
-    
-    # If there's a significant remainder, pad and add the last chunk
-    if len(y) % hop_size != 0 and (len(y) - chunks[-1].size) > sr * 0.5:
-        last_chunk = y[-chunk_size:]
-        chunks.append(last_chunk)
-        
-    return chunks
+    return [y[o:o + chunk_size] for o in get_chunk_offsets(len(y), sr, duration, overlap)]
 
 
-def extract_spectral(y, sr):
-    """Extract normalized mel-spectrogram features (3×224×224).
+def detect_speech(y, threshold_db=VAD_THRESHOLD_DB, frame_length=400, hop_length=160):
+    """Cheap energy-based voice activity detection.
 
     Args:
-        y: Audio waveform array (4s at 16kHz)
+        y: Audio waveform
+        threshold_db: Frames quieter than the loudest frame by more than this are non-speech
+
+    Returns:
+        Boolean np.ndarray, one entry per frame (frame i starts at i * hop_length)
+    """
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length, center=False)[0]
+    rms_db = 20 * np.log10(np.maximum(rms, 1e-10))
+    return rms_db > rms_db.max() + threshold_db
+
+
+def select_speech_chunks(y, sr, offsets, min_speech_ratio, threshold_db=VAD_THRESHOLD_DB,
+                         duration=CHUNK_DURATION, hop_length=160):
+    """Indices of the chunks whose fraction of speech frames is at least `min_speech_ratio`.
+
+    If no chunk qualifies, the one with the most speech is kept so there is
+    always something to score.
+    """
+    speech = detect_speech(y, threshold_db, hop_length=hop_length)
+    counts = np.concatenate([[0], np.cumsum(speech)])
+    frames_per_chunk = max(1, (duration * sr - 400) // hop_length + 1)
+
+    ratios = []
+    for offset in offsets:
+        first = min(offset // hop_length, len(speech))
+        last = min(first + frames_per_chunk, len(speech))
+        ratios.append((counts[last] - counts[first]) / frames_per_chunk)
+
+    selected = [i for i, ratio in enumerate(ratios) if ratio >= min_speech_ratio]
+    return selected or [int(np.argmax(ratios))]
+
+
+def chunk_speech_ratio(chunk, loudest_rms, threshold_db=VAD_THRESHOLD_DB, frame_length=400, hop_length=160):
+    """Fraction of speech frames in one chunk, relative to the loudest frame of the file.
+
+    Streaming counterpart of the ratios in select_speech_chunks: `loudest_rms`
+    is the largest frame RMS of the whole recording (see ingest.LevelMeter)
+    on the same scale as `chunk`. Chunks at multiples of the hop length are
+    framed exactly as in detect_speech.
+    """
+    rms = librosa.feature.rms(y=chunk, frame_length=frame_length, hop_length=hop_length, center=False)[0]
+    rms_db = 20 * np.log10(np.maximum(rms, 1e-10))
+    threshold = 20 * np.log10(max(loudest_rms, 1e-10)) + threshold_db
+    frames_per_chunk = max(1, (len(chunk) - frame_length) // hop_length + 1)
+    return np.count_nonzero(rms_db > threshold) / frames_per_chunk
+
+
+def get_chunk_ranges(offsets, indices, num_samples, sr, duration=CHUNK_DURATION):
+    """Merged (start_s, end_s) time ranges covered by the chunks at `indices`."""
+    ranges = []
+    for i in indices:
+        start = offsets[i] / sr
+        end = min(offsets[i] + duration * sr, num_samples) / sr
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return [(round(start, 3), round(end, 3)) for start, end in ranges]
+
+
+def extract_spectral_batch(chunks, sr):
+    """Extract normalized mel-spectrogram features for many chunks at once.
+
+    All chunks go through a single multichannel STFT / mel projection, and the
+    dB conversion, min-max normalization and resize run as batched array ops.
+    Each chunk is still normalized on its own, so the output matches
+    calling extract_spectral on every chunk.
+
+    Args:
+        chunks: Sequence of equal-length waveform arrays, or an (N, samples) array
         sr: Sample rate
 
     Returns:
-        torch.Tensor of shape (3, 224, 224) — 3-channel mel spectrogram for EfficientNet
+        torch.Tensor of shape (N, 3, 224, 224)
+    """
+    y = chunks if isinstance(chunks, np.ndarray) else np.stack(chunks)
+    mel = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128)  # (N, 128, T)
+    return spectral_from_mel(mel)
+
+
+def spectral_from_mel(mel):
+    """Turn mel power spectrograms into the normalized 3×224×224 model input.
+
+    Args:
+        mel: np.ndarray of shape (N, 128, T)
+
+    Returns:
+        torch.Tensor of shape (N, 3, 224, 224)
     """
-    mel = librosa.feature.melspectrogram(y=y, sr=sr, n_mels=128)
-    mel_db = librosa.power_to_db(mel)
+    # Same as librosa.power_to_db, except the 80 dB floor is taken per chunk
+    # (power_to_db would take it relative to the loudest chunk in the batch)
+    mel_db = 10.0 * np.log10(np.maximum(1e-10, mel))
+    mel_db = np.maximum(mel_db, mel_db.max(axis=(1, 2), keepdims=True) - 80.0)
 
-    # Min-max normalize
-    mel_db = (mel_db - mel_db.min()) / (mel_db.max() - mel_db.min() + 1e-6)
+    # Min-max normalize each chunk
+    mel_min = mel_db.min(axis=(1, 2), keepdims=True)
+    mel_max = mel_db.max(axis=(1, 2), keepdims=True)
+    mel_db = (mel_db - mel_min) / (mel_max - mel_min + 1e-6)
 
-    mel_db = torch.tensor(mel_db).unsqueeze(0)  # (1, 128, T)
+    mel_db = torch.from_numpy(mel_db).unsqueeze(1)  # (N, 1, 128, T)
 
     # Resize to IMG_SIZE x IMG_SIZE
     mel_db = torch.nn.functional.interpolate(
-        mel_db.unsqueeze(0),
+        mel_db,
         size=(IMG_SIZE, IMG_SIZE),
         mode="bilinear",
         align_corners=False
-    ).squeeze(0)  # (1, 224, 224)
+    )  # (N, 1, 224, 224)
 
     # Repeat to 3 channels for EfficientNet
-    mel_db = mel_db.repeat(3, 1, 1)  # (3, 224, 224)
+    mel_db = mel_db.repeat(1, 3, 1, 1)  # (N, 3, 224, 224)
 
     return mel_db.float()
 
 
+def extract_spectral(y, sr):
+    """Extract normalized mel-spectrogram features (3×224×224).
+
+    Args:
+        y: Audio waveform array (4s at 16kHz)
+        sr: Sample rate
+
+    Returns:
+        torch.Tensor of shape (3, 224, 224) — 3-channel mel spectrogram for EfficientNet
+    """
+    return extract_spectral_batch(y[np.newaxis], sr)[0]
+
+
 def extract_temporal(y):
     """Extract raw audio frames for temporal (GRU) branch.
 
+    The frames are a strided view over `y` (no copy is made for float32 input),
+    so framing every chunk of a file only costs the final batch stack.
+
     Args:
         y: Audio waveform array (4s at 16kHz)
 
     Returns:
         torch.Tensor of shape (num_frames, 400) — framed audio
     """
-    frames = librosa.util.frame(y, frame_length=400, hop_length=160)
-    frames = frames.T
-    return torch.tensor(frames).float()
+    frames = torch.from_numpy(np.asarray(y)).unfold(0, 400, 160)
+    return frames.float()
 
 
 # =========================
 # Model Loading & Prediction
 # =========================
-def load_model(model_path):
+def quantize_model(model, calibration_batches=None):
+    """Build an INT8 copy of a FusionModel for CPU inference.
+
+    The EfficientNet backbone gets static post-training quantization (FX graph
+    mode, x86 qconfig) with activation ranges observed on `calibration_batches`;
+    the GRU and the Linear heads get dynamic quantization (int8 weights,
+    activations quantized per batch). Without calibration batches only the
+    quantized structure is built, for loading a saved INT8 state dict into.
+
+    Args:
+        model: FP32 FusionModel (left unchanged)
+        calibration_batches: Iterable of spectral batches (N, 3, IMG_SIZE, IMG_SIZE)
+
+    Returns:
+        Quantized FusionModel in eval mode, on CPU
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    model = copy.deepcopy(model).cpu().eval()
+    example = torch.zeros(1, 3, IMG_SIZE, IMG_SIZE)
+    prepared = prepare_fx(model.spectral.backbone, get_default_qconfig_mapping("x86"), (example,))
+    if calibration_batches is not None:
+        with torch.no_grad():
+            for batch in calibration_batches:
+                prepared(batch.cpu())
+    model.spectral.backbone = convert_fx(prepared)
+    return quantize_dynamic(model, {nn.GRU, nn.Linear}, dtype=torch.qint8).eval()
+
+
+def load_state_dict(model_path, device="cpu", mmap=False):
+    """Load a checkpoint state dict; INT8 checkpoints hold packed-param ScriptObjects."""
+    with torch.serialization.safe_globals([torch.ScriptObject]):
+        return torch.load(model_path, map_location=device, weights_only=True, mmap=mmap)
+
+
+def is_quantized_state_dict(state_dict):
+    """Check if a state dict was saved from a quantize_model() model."""
+    return any("_packed_params" in key for key in state_dict)
+
+
+def load_model(model_path, precision="fp32", mmap=False):
     """Load the pretrained hybrid FusionModel.
 
     Args:
-        model_path: Path to hybrid_spoof_model.pth
+        model_path: Path to hybrid_spoof_model.pth, or to an INT8 checkpoint
+            written by quantize_model.py when precision is "int8"
+        precision: "fp32", or "int8" for the quantized CPU model. Given an
+            FP32 checkpoint, "int8" falls back to dynamic quantization of the
+            GRU/Linear layers only (the backbone needs calibration data, see
+            quantize_model.py).
+        mmap: Memory-map the checkpoint instead of reading it into memory.
+            On CPU the FP32 parameters then stay backed by the file's page
+            cache, which is shared between processes serving the same model.
 
     Returns:
         Tuple of (model, device)
     """
+    if precision not in MODEL_PRECISIONS:
+        raise ValueError(f"Unknown model precision '{precision}' (expected one of {MODEL_PRECISIONS})")
+
+    if precision == "int8":
+        # Quantized kernels are CPU-only
+        device = torch.device("cpu")
+        state_dict = load_state_dict(model_path, device, mmap)
+        if is_quantized_state_dict(state_dict):
+            model = quantize_model(FusionModel())
+            model.load_state_dict(state_dict)
+        else:
+            model = FusionModel()
+            model.load_state_dict(state_dict)
+            model = torch.ao.quantization.quantize_dynamic(
+                model.eval(), {nn.GRU, nn.Linear}, dtype=torch.qint8
+            )
+        model.eval()
+        return model, device
+
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model = FusionModel().to(device)
-    model.load_state_dict(torch.load(model_path, map_location=device, weights_only=True))
+    model.load_state_dict(load_state_dict(model_path, device, mmap), assign=mmap)
     model.eval()
     return model, device
 
@@ -246,39 +696,453 @@ def predict(model, device, spectral_features, temporal_features):
     return probability
 
 
-def predict_robust(model, device, y, sr):
-    """Run prediction on multiple chunks and aggregate results.
-    
-    Returns the maximum fake probability found across all chunks
-    to ensure we catch deepfakes even if they only appear in part of the audio.
+def predict_batch(model, device, spectral_batch, temporal_batch):
+    """Run prediction on a batch of 4s chunks in a single forward pass.
+
+    Args:
+        spectral_batch: torch.Tensor of shape (N, 3, 224, 224)
+        temporal_batch: torch.Tensor of shape (N, num_frames, 400)
+
+    Returns:
+        List of N fake probabilities, one per chunk
     """
-    chunks = get_audio_chunks(y, sr)
+    spectral = spectral_batch.to(device)
+    temporal = temporal_batch.to(device)
+
+    with torch.no_grad():
+        output = model(spectral, temporal)
+        # FusionModel squeezes its output, so a batch of one comes back 0-d
+        probabilities = torch.sigmoid(output).reshape(-1).tolist()
+
+    return probabilities
+
+
+def predict_cached(model, device, spectral_batch, temporal_batch, chunk_cache, timings=None):
+    """predict_batch that first looks each chunk up in a cache.ChunkCache.
+
+    Only the chunks without a cached fingerprint match go through the model.
+    If the model exposes FusionModel.embed (the eager model, not a wrapper
+    such as BatchScheduler), their branch embeddings are cached as well.
+
+    Returns:
+        List of N fake probabilities, one per chunk
+    """
+    with timed_stage(timings, "chunk_cache"):
+        entries, fingerprints = chunk_cache.lookup(spectral_batch, temporal_batch)
+    probabilities = [entry.probability if entry is not None else None for entry in entries]
+    missing = [i for i, entry in enumerate(entries) if entry is None]
+    if not missing:
+        return probabilities
+
+    index = torch.tensor(missing)
+    spectral = spectral_batch[index].to(device)
+    temporal = temporal_batch[index].to(device)
+    with torch.no_grad(), timed_stage(timings, "forward"):
+        if hasattr(model, "embed"):
+            f1, f2 = model.embed(spectral, temporal)
+            scores = torch.sigmoid(model.classify(f1, f2)).reshape(-1).tolist()
+            embeddings = list(zip(f1.cpu().numpy(), f2.cpu().numpy()))
+        else:
+            scores = torch.sigmoid(model(spectral, temporal)).reshape(-1).tolist()
+            embeddings = [(None, None)] * len(missing)
+
+    with timed_stage(timings, "chunk_cache"):
+        chunk_cache.put_many([
+            (fingerprints[i], score, spectral_embedding, temporal_embedding)
+            for i, score, (spectral_embedding, temporal_embedding) in zip(missing, scores, embeddings)
+        ])
+    for i, score in zip(missing, scores):
+        probabilities[i] = score
+    return probabilities
+
+
+def predict_chunks(model, device, chunks, sr, batch_size=DEFAULT_BATCH_SIZE, frontend=None,
+                   chunk_cache=None, timings=None):
+    """Score audio chunks in micro-batches of at most `batch_size`.
+
+    If a MelFrontend (on `device`) is given, spectral features are computed
+    in torch instead of through librosa. If a cache.ChunkCache is given,
+    chunks are looked up by fingerprint before running the model. With an
+    instrumentation.StageTimer, the "spectral", "temporal", "forward" and
+    "chunk_cache" stages are timed.
+
+    Returns:
+        List of fake probabilities, in the same order as `chunks`
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
     probabilities = []
-    
-    for chunk in chunks:
-        spec = extract_spectral(chunk, sr)
-        temp = extract_temporal(chunk)
-        prob = predict(model, device, spec, temp)
-        probabilities.append(prob)
-    
-    # Aggregate: Use max probability for deepfake detection
-    max_prob = max(probabilities)
+    for start in range(0, len(chunks), batch_size):
+        batch = chunks[start:start + batch_size]
+        with timed_stage(timings, "spectral"):
+            if frontend is not None:
+                with torch.no_grad():
+                    spec = frontend(torch.from_numpy(np.stack(batch)).float().to(device))
+            else:
+                spec = extract_spectral_batch(batch, sr)
+        with timed_stage(timings, "temporal"):
+            temp = torch.stack([extract_temporal(chunk) for chunk in batch])
+        if chunk_cache is not None:
+            probabilities.extend(predict_cached(model, device, spec, temp, chunk_cache, timings))
+        else:
+            with timed_stage(timings, "forward"):
+                probabilities.extend(predict_batch(model, device, spec, temp))
+
+    return probabilities
+
+
+def supports_shared_frames(model):
+    """Check if predict_chunks_shared can run the model (the eager fp32 FusionModel)."""
+    temporal = getattr(model, "temporal", None)
+    return (isinstance(temporal, TemporalGRU) and type(temporal.gru) is nn.GRU
+            and temporal.gru.num_layers == 1 and not temporal.gru.bidirectional)
+
+
+def predict_chunks_shared(model, device, y, sr, offsets, batch_size=DEFAULT_BATCH_SIZE, frontend=None,
+                          chunk_cache=None, duration=CHUNK_DURATION, timings=None):
+    """predict_chunks for the chunks of one waveform, sharing GRU work between them.
+
+    The spectral branch runs `batch_size` chunks at a time as usual. The
+    temporal branch runs SHARED_FRAMES_GROUP chunks at a time through
+    TemporalGRU.forward_windows. Chunks on the 160-sample frame grid take
+    their frames from one framing of the waveform, so each overlapping frame
+    is projected once. Scores match predict_chunks up to float rounding.
+    Only models passing supports_shared_frames can be used (not wrappers
+    like BatchScheduler).
+
+    Args:
+        y: Audio waveform
+        offsets: Chunk start offsets (get_chunk_offsets, or a subset of them)
+
+    Returns:
+        List of fake probabilities, one per offset
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    chunk_size = duration * sr
+    frame_length, frame_hop = 400, 160
+    num_steps = (chunk_size - frame_length) // frame_hop + 1
+
+    probabilities = []
+    for group_start in range(0, len(offsets), max(batch_size, SHARED_FRAMES_GROUP)):
+        group = offsets[group_start:group_start + max(batch_size, SHARED_FRAMES_GROUP)]
+        chunks = [np.pad(y[o:o + chunk_size], (0, max(0, o + chunk_size - len(y)))) for o in group]
+        scores = [None] * len(group)
+        spectral_embeddings = {}  # group position → spectral embedding (cache misses only)
+        fingerprints = {}
+
+        for start in range(0, len(group), batch_size):
+            batch = chunks[start:start + batch_size]
+            with torch.no_grad():
+                with timed_stage(timings, "spectral"):
+                    if frontend is not None:
+                        spec = frontend(torch.from_numpy(np.stack(batch)).float().to(device))
+                    else:
+                        spec = extract_spectral_batch(batch, sr)
+                missing = list(range(len(batch)))
+                if chunk_cache is not None:
+                    with timed_stage(timings, "temporal"):
+                        temp = torch.stack([extract_temporal(chunk) for chunk in batch])
+                    with timed_stage(timings, "chunk_cache"):
+                        entries, batch_fingerprints = chunk_cache.lookup(spec, temp)
+                    missing = [i for i, entry in enumerate(entries) if entry is None]
+                    for i, entry in enumerate(entries):
+                        if entry is None:
+                            fingerprints[start + i] = batch_fingerprints[i]
+                        else:
+                            scores[start + i] = entry.probability
+                if missing:
+                    with timed_stage(timings, "forward"):
+                        f1 = model.spectral(spec[torch.tensor(missing)].to(device))
+                    spectral_embeddings.update(zip((start + i for i in missing), f1))
+
+        missing = sorted(spectral_embeddings)
+        if missing:
+            # Grid-aligned chunks index into one framing of the waveform they span;
+            # the others (end-aligned tail, padded short audio) bring their own frames
+            aligned = [i for i in missing if group[i] % frame_hop == 0 and group[i] + chunk_size <= len(y)]
+            frames = []
+            starts = {}
+            with timed_stage(timings, "temporal"):
+                if aligned:
+                    first = group[aligned[0]]
+                    frames.append(extract_temporal(y[first:group[aligned[-1]] + chunk_size]))
+                    starts = {i: (group[i] - first) // frame_hop for i in aligned}
+                extra = sum(len(f) for f in frames)
+                for i in missing:
+                    if i not in starts:
+                        frames.append(extract_temporal(chunks[i]))
+                        starts[i] = extra
+                        extra += num_steps
+
+            with torch.no_grad(), timed_stage(timings, "forward"):
+                f1 = torch.stack([spectral_embeddings[i] for i in missing])
+                f2 = model.temporal.forward_windows(
+                    torch.cat(frames).to(device), [starts[i] for i in missing], num_steps
+                )
+                missing_scores = torch.sigmoid(model.classify(f1, f2)).reshape(-1).tolist()
+            for i, score in zip(missing, missing_scores):
+                scores[i] = score
+            if chunk_cache is not None:
+                with timed_stage(timings, "chunk_cache"):
+                    chunk_cache.put_many([
+                        (fingerprints[i], score, spectral_embedding, temporal_embedding)
+                        for i, score, spectral_embedding, temporal_embedding
+                        in zip(missing, missing_scores, f1.cpu().numpy(), f2.cpu().numpy())
+                    ])
+        probabilities.extend(scores)
+
+    return probabilities
+
+
+def aggregate_probabilities(probabilities, aggregate="max", top_k=DEFAULT_TOP_K, quantile=DEFAULT_QUANTILE):
+    """Combine chunk probabilities into one file-level fake probability.
+
+    Args:
+        aggregate: "max", "mean", "topk" (mean of the top_k highest chunks)
+            or "quantile" (the given quantile of the chunk probabilities)
+
+    Returns:
+        Aggregated fake probability
+    """
+    if aggregate not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{aggregate}' (expected one of {', '.join(AGGREGATES)})")
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    if aggregate == "max":
+        return float(probabilities.max())
+    if aggregate == "mean":
+        return float(probabilities.mean())
+    if aggregate == "topk":
+        if top_k < 1:
+            raise ValueError("k must be at least 1")
+        return float(np.sort(probabilities)[-top_k:].mean())
+    if not 0 <= quantile <= 1:
+        raise ValueError("q must be between 0 and 1")
+    return float(np.quantile(probabilities, quantile))
+
+
+def describe_aggregate(aggregate="max", top_k=DEFAULT_TOP_K, quantile=DEFAULT_QUANTILE):
+    """The "aggregate" field of a result."""
+    if aggregate == "topk":
+        return {"method": aggregate, "k": top_k}
+    if aggregate == "quantile":
+        return {"method": aggregate, "q": quantile}
+    return {"method": aggregate}
+
+
+def build_result(probabilities, num_chunks=None, aggregate="max", top_k=DEFAULT_TOP_K,
+                 quantile=DEFAULT_QUANTILE):
+    """Aggregate chunk probabilities into the prediction response.
+
+    By default returns the maximum fake probability found across all chunks
+    to ensure we catch deepfakes even if they only appear in part of the audio.
+
+    Args:
+        probabilities: Fake probabilities of the chunks that were scored
+        num_chunks: Total chunks in the file, if some were skipped
+        aggregate, top_k, quantile: See aggregate_probabilities
+    """
+    score = aggregate_probabilities(probabilities, aggregate, top_k, quantile)
     
     # probability > 0.5 → FAKE (AI-generated/spoof), else → REAL (bonafide)
-    is_fake = max_prob > 0.5
+    is_fake = score > 0.5
 
     if is_fake:
         label = "FAKE"
-        confidence = max_prob * 100
+        confidence = score * 100
     else:
         label = "REAL"
-        confidence = (1 - max_prob) * 100
+        confidence = (1 - score) * 100
 
     return {
         "label": label,
         "confidence": round(confidence, 2),
-        "real_probability": round((1 - max_prob) * 100, 2),
-        "fake_probability": round(max_prob * 100, 2),
-        "raw_score": round(max_prob, 6),
-        "num_chunks": len(chunks)
+        "real_probability": round((1 - score) * 100, 2),
+        "fake_probability": round(score * 100, 2),
+        "raw_score": round(score, 6),
+        "num_chunks": len(probabilities) if num_chunks is None else num_chunks,
+        "chunks_scored": len(probabilities),
+        "aggregate": describe_aggregate(aggregate, top_k, quantile)
     }
+
+
+def build_timeline(chunk_scores, duration, chunk_duration=CHUNK_DURATION):
+    """Compact per-window timeline: [start_s, end_s, probability] in time order.
+
+    Args:
+        chunk_scores: (chunk_index, start_seconds, probability) of the scored chunks
+        duration: Audio length in seconds (the last window ends there at most)
+    """
+    return [
+        [round(start, 2), round(min(start + chunk_duration, duration), 2), round(probability, 6)]
+        for _, start, probability in sorted(chunk_scores)
+    ]
+
+
+def find_suspicious_segments(timeline, threshold=SEGMENT_THRESHOLD):
+    """Merge overlapping timeline windows scoring above `threshold`.
+
+    Windows that only touch (one ends where the next starts) stay separate,
+    so a clean window between two suspicious ones splits the segment.
+
+    Returns:
+        List of {"start", "end", "max_probability"} dicts in time order
+    """
+    segments = []
+    for start, end, probability in timeline:
+        if probability <= threshold:
+            continue
+        if segments and start < segments[-1]["end"]:
+            segments[-1]["end"] = max(segments[-1]["end"], end)
+            segments[-1]["max_probability"] = max(segments[-1]["max_probability"], probability)
+        else:
+            segments.append({"start": start, "end": end, "max_probability": probability})
+    return segments
+
+
+def add_timeline(result, chunk_scores, duration):
+    """Add the "timeline" and "suspicious_segments" fields to a result in place."""
+    result["timeline"] = build_timeline(chunk_scores, duration)
+    result["suspicious_segments"] = find_suspicious_segments(result["timeline"])
+    return result
+
+
+def offset_result_times(result, start, audio_seconds):
+    """Shift the times of a result computed on a span starting at `start` seconds.
+
+    Timeline windows, suspicious segments and analyzed ranges become file
+    times, and "range" records the analyzed span ({"start", "end"}).
+    """
+    result = dict(result)
+    result["timeline"] = [[round(s + start, 2), round(e + start, 2), p] for s, e, p in result["timeline"]]
+    result["suspicious_segments"] = find_suspicious_segments(result["timeline"])
+    if "analyzed_ranges" in result:
+        result["analyzed_ranges"] = [(round(s + start, 3), round(e + start, 3)) for s, e in result["analyzed_ranges"]]
+    result["range"] = {"start": start, "end": round(start + audio_seconds, 3)}
+    return result
+
+
+def apply_aggregate(result, aggregate="max", top_k=DEFAULT_TOP_K, quantile=DEFAULT_QUANTILE):
+    """Re-aggregate a result from its timeline with another method (no rescoring).
+
+    The label, confidence and probability fields are recomputed; everything
+    else (timeline, segments, VAD fields) is kept.
+    """
+    probabilities = [probability for _, _, probability in result["timeline"]]
+    return dict(result, **build_result(probabilities, result["num_chunks"], aggregate, top_k, quantile))
+
+
+def predict_robust(model, device, y, sr, batch_size=DEFAULT_BATCH_SIZE, frontend=None,
+                   min_speech_ratio=None, chunk_cache=None, shared_frames=False, timings=None,
+                   chunk_scores=None):
+    """Run prediction on multiple chunks and aggregate results.
+    
+    Returns the maximum fake probability found across all chunks
+    to ensure we catch deepfakes even if they only appear in part of the audio.
+    Chunks are scored `batch_size` at a time to keep memory bounded on long files.
+
+    If `min_speech_ratio` is given, chunks with a smaller fraction of voiced
+    frames (see select_speech_chunks) are skipped, and the result lists the
+    analyzed time ranges and the fraction of audio skipped. With a
+    `chunk_cache`, chunks seen before (even in a re-encoded copy) reuse
+    their cached scores. With `shared_frames`, overlapping chunks share GRU
+    input projections (predict_chunks_shared) if the model supports it.
+    An instrumentation.StageTimer in `timings` gets the "chunking" stage
+    plus the per-batch stages of predict_chunks. A `chunk_scores` list
+    receives (chunk_index, start_seconds, probability) of every scored chunk.
+    The result includes their timeline and suspicious segments (add_timeline).
+    """
+    with timed_stage(timings, "chunking"):
+        chunks = get_audio_chunks(y, sr)
+        offsets = get_chunk_offsets(len(y), sr)
+        indices = list(range(len(chunks)))
+        if min_speech_ratio is not None:
+            indices = select_speech_chunks(y, sr, offsets, min_speech_ratio)
+
+    if shared_frames and supports_shared_frames(model):
+        probabilities = predict_chunks_shared(model, device, y, sr, [offsets[i] for i in indices], batch_size,
+                                              frontend, chunk_cache, timings=timings)
+    else:
+        probabilities = predict_chunks(model, device, [chunks[i] for i in indices], sr, batch_size, frontend,
+                                       chunk_cache, timings)
+    scored = [(i, offsets[i] / sr, p) for i, p in zip(indices, probabilities)]
+    if chunk_scores is not None:
+        chunk_scores.extend(scored)
+    if min_speech_ratio is None:
+        return add_timeline(build_result(probabilities), scored, len(y) / sr)
+
+    result = add_timeline(build_result(probabilities, num_chunks=len(chunks)), scored, len(y) / sr)
+    result["analyzed_ranges"] = get_chunk_ranges(offsets, indices, len(y), sr)
+    analyzed = sum(end - start for start, end in result["analyzed_ranges"])
+    result["skipped_fraction"] = round(max(0.0, 1 - analyzed * sr / len(y)), 4)
+    return result
+
+
+def get_scan_order(probabilities, num_chunks, stride):
+    """Order in which the not-yet-scored chunks are visited after the coarse pass.
+
+    Chunks nearest the most suspicious coarse windows come first, so a fake
+    region found sparsely is re-scored densely before the rest of the file.
+    """
+    coarse = sorted(probabilities, key=probabilities.get, reverse=True)
+    order = []
+    seen = set(probabilities)
+    for index in coarse:
+        for distance in range(1, stride):
+            for neighbor in (index - distance, index + distance):
+                if 0 <= neighbor < num_chunks and neighbor not in seen:
+                    seen.add(neighbor)
+                    order.append(neighbor)
+    order += [i for i in range(num_chunks) if i not in seen]
+    return order
+
+
+def predict_early_exit(model, device, y, sr, threshold=EARLY_EXIT_THRESHOLD,
+                       stride=EARLY_EXIT_STRIDE, batch_size=DEFAULT_BATCH_SIZE, frontend=None,
+                       min_speech_ratio=None, chunk_cache=None, timings=None, chunk_scores=None):
+    """Coarse-to-fine variant of predict_robust that stops once the verdict is settled.
+
+    Every `stride`-th chunk is scored first, then chunks around the most
+    suspicious coarse windows, then the rest. Scoring stops as soon as a chunk
+    exceeds `threshold`: with max aggregation the label is FAKE from then on.
+    The label always matches predict_robust; the reported probability is the
+    max over the scored chunks only. A REAL verdict needs every chunk to stay
+    below 0.5, so REAL files are still scored in full. `min_speech_ratio`
+    gates chunks exactly as in predict_robust before the scan, so the chunks
+    that can be scored are the same; "analyzed_ranges" and
+    "skipped_fraction" describe that gating. `chunk_scores` and the timeline
+    cover the chunks that were scored.
+    """
+    with timed_stage(timings, "chunking"):
+        chunks = get_audio_chunks(y, sr)
+        offsets = get_chunk_offsets(len(y), sr)
+        indices = list(range(len(chunks)))
+        if min_speech_ratio is not None:
+            indices = select_speech_chunks(y, sr, offsets, min_speech_ratio)
+    # Keyed by position in `indices`, so the stride and scan order skip gated chunks
+    probabilities = {}
+
+    def score(positions):
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            scores = predict_chunks(model, device, [chunks[indices[p]] for p in batch], sr, batch_size,
+                                    frontend, chunk_cache, timings)
+            probabilities.update(zip(batch, scores))
+            if max(scores) > threshold:
+                return True
+        return False
+
+    if not score(list(range(0, len(indices), stride))):
+        score(get_scan_order(probabilities, len(indices), stride))
+
+    scored = [(indices[p], offsets[indices[p]] / sr, probabilities[p]) for p in sorted(probabilities)]
+    if chunk_scores is not None:
+        chunk_scores.extend(scored)
+    result = add_timeline(build_result(list(probabilities.values()), num_chunks=len(chunks)), scored, len(y) / sr)
+    if min_speech_ratio is not None:
+        result["analyzed_ranges"] = get_chunk_ranges(offsets, indices, len(y), sr)
+        analyzed = sum(end - start for start, end in result["analyzed_ranges"])
+        result["skipped_fraction"] = round(max(0.0, 1 - analyzed * sr / len(y)), 4)
+    return result
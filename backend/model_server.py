@@ -0,0 +1,245 @@
+"""
+Shared model server for multi-process deployments.
+One process loads the weights and owns the torch intra-op thread pool; the
+Flask worker processes send it chunk batches over a local socket instead of
+each holding its own copy of the model and its own thread pool. Batches from
+all workers are coalesced by a BatchScheduler.
+
+Connections are authenticated with a shared key (messages are pickled, so
+only holders of the key may connect): MODEL_SERVER_AUTHKEY if set, otherwise
+a random key the server generates at startup and writes, readable by its
+user only, to MODEL_SERVER_AUTHKEY_FILE (default backend/.model_server.key),
+where clients on the same host read it.
+
+Usage (from backend/):
+    python model_server.py --address 127.0.0.1:6100 --workers 4
+    MODEL_SERVER_ADDRESS=127.0.0.1:6100 TORCH_THREADS=1 <start 4 app workers>
+"""
+import argparse
+import os
+import secrets
+import sys
+import threading
+from multiprocessing.connection import Listener, Client, AuthenticationError
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from batching import BatchScheduler
+from cache import hash_file
+from inference import load_backend, DEFAULT_MODEL_PATHS, INFERENCE_BACKENDS
+
+DEFAULT_ADDRESS = "127.0.0.1:6100"
+DEFAULT_AUTHKEY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_server.key")
+
+
+def get_authkey_file():
+    return os.environ.get('MODEL_SERVER_AUTHKEY_FILE') or DEFAULT_AUTHKEY_FILE
+
+
+def create_authkey(path=None):
+    """Shared secret for a starting server.
+
+    MODEL_SERVER_AUTHKEY if set; otherwise a fresh random key, written to
+    `path` (default get_authkey_file()) with mode 0600 for the clients.
+    """
+    key = os.environ.get('MODEL_SERVER_AUTHKEY', '').encode()
+    if key:
+        return key
+    key = secrets.token_hex(32).encode()
+    path = path or get_authkey_file()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(tmp_path, path)
+    return key
+
+
+def get_authkey(path=None):
+    """Shared secret for connecting to a server: MODEL_SERVER_AUTHKEY or the server's key file.
+
+    Raises:
+        RuntimeError: If neither is available (the server is not running here)
+    """
+    key = os.environ.get('MODEL_SERVER_AUTHKEY', '').encode()
+    if key:
+        return key
+    path = path or get_authkey_file()
+    try:
+        with open(path, "rb") as f:
+            return f.read().strip()
+    except OSError as e:
+        raise RuntimeError(f"No model server key: set MODEL_SERVER_AUTHKEY or start the server first ({e})")
+
+
+def parse_address(address):
+    """'host:port' is a TCP address; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+def physical_cores():
+    """Physical CPU cores available to this process (hyperthreads not counted)."""
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    cores = set()
+    try:
+        with open("/proc/cpuinfo") as f:
+            physical_id = None
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    physical_id = value.strip()
+                elif key == "core id":
+                    cores.add((physical_id, value.strip()))
+    except OSError:
+        pass
+    return min(len(cores), available) if cores else available
+
+
+def plan_threads(num_workers, worker_threads=1, cores=None):
+    """Intra-op threads for the model server so that server + workers match the cores.
+
+    Workers only decode audio and extract features with `worker_threads`
+    threads each; every remaining physical core goes to the server.
+    """
+    cores = cores or physical_cores()
+    return max(1, cores - num_workers * worker_threads)
+
+
+class ModelServer:
+    """Serves forward passes of one loaded model to many client processes.
+
+    Each connection is handled on its own thread and its batches go through a
+    shared BatchScheduler on `device` (where the model is). Requests are tuples:
+        ("predict", spectral ndarray, temporal ndarray) → logits ndarray
+        ("stats",) → BatchScheduler.stats()
+        ("info",) → the info dict given at construction
+    and every reply is ("ok", payload) or ("error", message).
+    """
+
+    def __init__(self, model, address=DEFAULT_ADDRESS, authkey=None, device=None,
+                 max_batch_size=32, max_wait_ms=10, info=None):
+        self.scheduler = BatchScheduler(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.device = device or torch.device("cpu")
+        self.info = info or {}
+        self.listener = Listener(parse_address(address), authkey=authkey or create_authkey())
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (AuthenticationError, OSError, EOFError):
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    kind = message[0]
+                    if kind == "predict":
+                        logits = self.scheduler(torch.from_numpy(message[1]).to(self.device),
+                                                torch.from_numpy(message[2]).to(self.device))
+                        reply = ("ok", logits.cpu().numpy())
+                    elif kind == "stats":
+                        reply = ("ok", self.scheduler.stats())
+                    elif kind == "info":
+                        reply = ("ok", self.info)
+                    else:
+                        reply = ("error", f"Unknown request '{kind}'")
+                except Exception as e:
+                    reply = ("error", str(e))
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+
+class ModelClient:
+    """Drop-in stand-in for the model that forwards batches to a ModelServer.
+
+    Calling client(spec, temp) returns the logits like the model would, so it
+    can be passed anywhere predict_batch / predict_robust expect a model. Each
+    thread keeps its own connection, so concurrent jobs in one worker process
+    don't serialize on a socket.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        self.address = parse_address(address)
+        self.authkey = authkey or get_authkey()
+        self._local = threading.local()
+
+    def _request(self, *message):
+        conn = getattr(self._local, "conn", None)
+        try:
+            if conn is None:
+                conn = self._local.conn = Client(self.address, authkey=self.authkey)
+            conn.send(message)
+            status, payload = conn.recv()
+        except (EOFError, OSError) as e:
+            self._local.conn = None
+            raise RuntimeError(f"Model server unavailable: {e}")
+        if status != "ok":
+            raise RuntimeError(payload)
+        return payload
+
+    def __call__(self, spec, temp):
+        logits = self._request("predict", spec.cpu().numpy(), temp.cpu().numpy())
+        return torch.from_numpy(logits)
+
+    def stats(self):
+        return self._request("stats")
+
+    def info(self):
+        return self._request("info")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared model server for app worker processes")
+    parser.add_argument("--address", default=os.environ.get('MODEL_SERVER_ADDRESS', DEFAULT_ADDRESS),
+                        help="host:port or Unix socket path")
+    parser.add_argument("--backend", default=os.environ.get('INFERENCE_BACKEND', 'eager'),
+                        choices=INFERENCE_BACKENDS)
+    parser.add_argument("--model", default=os.environ.get('MODEL_PATH'))
+    parser.add_argument("--precision", default=os.environ.get('MODEL_PRECISION', 'fp32'))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY', 1)),
+                        help="Number of app worker processes (for thread planning)")
+    parser.add_argument("--worker-threads", type=int, default=int(os.environ.get('TORCH_THREADS', 1) or 1),
+                        help="Torch threads each app worker uses")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="Intra-op threads for the server (default: planned from physical cores)")
+    parser.add_argument("--batch-max-size", type=int, default=int(os.environ.get('BATCH_MAX_SIZE', 32)))
+    parser.add_argument("--batch-max-wait-ms", type=float, default=float(os.environ.get('BATCH_MAX_WAIT_MS', 10)))
+    args = parser.parse_args()
+
+    model_path = args.model or DEFAULT_MODEL_PATHS[args.backend]
+    threads = args.threads or plan_threads(args.workers, args.worker_threads)
+    torch.set_num_threads(threads)
+
+    model, device = load_backend(args.backend, model_path, precision=args.precision, num_threads=threads)
+    info = {
+        "model_hash": hash_file(model_path),
+        "backend": args.backend,
+        "precision": args.precision,
+        "device": str(device),
+        "threads": threads
+    }
+    server = ModelServer(
+        model, args.address, device=device, max_batch_size=args.batch_max_size,
+        max_wait_ms=args.batch_max_wait_ms, info=info
+    )
+    print(f"Model server ({args.backend}, {args.precision}) on {device} with {threads} thread(s), "
+          f"listening on {args.address}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+INT8 post-training quantization of the hybrid model.
+
+Calibrates the quantized EfficientNet backbone on spectral features of the
+bundled real/ and fake/ samples, saves the INT8 checkpoint (load it with
+load_model(path, precision="int8") or MODEL_PRECISION=int8), then compares it
+against the FP32 model on every sample: per-file score difference, label
+agreement, accuracy against the folder labels, checkpoint size and
+single-core chunk throughput.
+
+Calibrating on the same clips that are evaluated flatters the accuracy
+comparison; use --calibration-limit to hold some out.
+
+Usage (from the repo root or backend/):
+    python backend/quantize_model.py --model backend/hybrid_efficientnet_gru.pth \
+        [--output backend/hybrid_efficientnet_gru_int8.pth] [--calibration-limit 5]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    load_model, quantize_model, preprocess_audio, get_audio_chunks,
+    extract_spectral_batch, extract_temporal, predict_robust, DEFAULT_BATCH_SIZE
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample_files():
+    """Bundled samples as (path, expected label) pairs."""
+    files = []
+    for folder, label in (("real", "REAL"), ("fake", "FAKE")):
+        files += [(path, label) for path in sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))]
+    return files
+
+
+def calibration_batches(files, limit, batch_size):
+    """Yield spectral batches from the first `limit` samples of each folder."""
+    per_label = {}
+    for path, label in files:
+        per_label.setdefault(label, []).append(path)
+
+    for paths in per_label.values():
+        for path in paths[:limit]:
+            y, sr = preprocess_audio(path)
+            chunks = get_audio_chunks(y, sr)
+            for i in range(0, len(chunks), batch_size):
+                yield extract_spectral_batch(chunks[i:i + batch_size], sr)
+
+
+def time_forward(model, spectral, temporal, repeats):
+    """Median seconds per forward pass over `repeats` runs (after one warm-up)."""
+    times = []
+    with torch.no_grad():
+        model(spectral, temporal)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(spectral, temporal)
+            times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 quantization and FP32 comparison")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--output", default=None,
+                        help="INT8 checkpoint path (default: <model>_int8.pth)")
+    parser.add_argument("--calibration-limit", type=int, default=5,
+                        help="Samples per folder used for calibration")
+    parser.add_argument("--batch-size", type=int, default=8, help="Chunks per timed forward pass")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=1, help="torch threads for the timing runs")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.model)[0] + "_int8.pth"
+    files = sample_files()
+
+    fp32_model, _ = load_model(args.model)
+    fp32_model = fp32_model.cpu()
+    device = torch.device("cpu")
+
+    start = time.perf_counter()
+    int8_model = quantize_model(
+        fp32_model, calibration_batches(files, args.calibration_limit, DEFAULT_BATCH_SIZE)
+    )
+    print(f"Calibrated on {args.calibration_limit} samples per folder in {time.perf_counter() - start:.1f}s")
+
+    torch.save(int8_model.state_dict(), output)
+    # Round-trip through load_model so the comparison uses the saved checkpoint
+    int8_model, _ = load_model(output, precision="int8")
+    fp32_size = os.path.getsize(args.model) / 1e6
+    int8_size = os.path.getsize(output) / 1e6
+    print(f"Saved {output} ({int8_size:.1f} MB, FP32 {fp32_size:.1f} MB)\n")
+
+    correct = {"fp32": 0, "int8": 0}
+    mismatches = 0
+    max_diff = 0.0
+    print(f"{'file':<18} {'truth':<5} {'fp32':>7} {'int8':>7} {'diff':>7} {'agree':>5}")
+    for path, truth in files:
+        y, sr = preprocess_audio(path)
+        res_fp32 = predict_robust(fp32_model, device, y, sr)
+        res_int8 = predict_robust(int8_model, device, y, sr)
+        diff = abs(res_fp32["raw_score"] - res_int8["raw_score"])
+        max_diff = max(max_diff, diff)
+        agree = res_fp32["label"] == res_int8["label"]
+        mismatches += not agree
+        correct["fp32"] += res_fp32["label"] == truth
+        correct["int8"] += res_int8["label"] == truth
+        print(f"{os.path.relpath(path, REPO_ROOT):<18} {truth:<5} {res_fp32['raw_score']:>7.4f} "
+              f"{res_int8['raw_score']:>7.4f} {diff:>7.4f} {'yes' if agree else 'NO':>5}")
+
+    # Throughput on a fixed batch of real chunks, single core by default
+    torch.set_num_threads(args.threads)
+    y, sr = preprocess_audio(files[0][0])
+    chunks = (get_audio_chunks(y, sr) * args.batch_size)[:args.batch_size]
+    spectral = extract_spectral_batch(chunks, sr)
+    temporal = torch.stack([extract_temporal(chunk) for chunk in chunks])
+    fp32_time = time_forward(fp32_model, spectral, temporal, args.repeats)
+    int8_time = time_forward(int8_model, spectral, temporal, args.repeats)
+
+    print(f"\nAccuracy fp32={correct['fp32']}/{len(files)} int8={correct['int8']}/{len(files)}, "
+          f"max score diff={max_diff:.4f}, label mismatches={mismatches}")
+    print(f"Throughput ({args.threads} thread(s), batch {args.batch_size}): "
+          f"fp32={args.batch_size / fp32_time:.1f} chunks/s int8={args.batch_size / int8_time:.1f} chunks/s "
+          f"speedup={fp32_time / int8_time:.2f}x")
+    sys.exit(0 if mismatches == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
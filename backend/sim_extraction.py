@@ -1,79 +1,125 @@
-import torch
-import librosa
-import numpy as np
+"""
+Parity check and timing benchmark for video audio extraction.
+
+Muxes each bundled sample into an .mp4 (with a synthetic video stream) and
+compares the old moviepy round-trip (VideoFileClip → 16 kHz WAV → librosa.load)
+against the direct in-memory ffmpeg decode used by the API (ingest.load_audio).
+
+The round-trip is not bit-exact itself (moviepy upmixes to stereo, writes
+16-bit PCM and truncates to the video duration), so both paths are scored
+against the original sample: the direct path must correlate with the
+round-trip and be at least as close to the source (SNR), and with --model
+both must give the same label.
+
+Usage (from the repo root or backend/):
+    python backend/sim_extraction.py [--model backend/hybrid_efficientnet_gru.pth] [--limit 5]
+"""
+import argparse
+import glob
 import os
+import subprocess
 import sys
-from moviepy import AudioFileClip, VideoFileClip
-
-# Add backend to path
-sys.path.append(os.path.join(os.getcwd(), "backend"))
-from model import load_model, preprocess_audio, extract_spectral, extract_temporal, predict
-
-def simulate_extraction(input_audio_path, output_wav_path):
-    """Simulate what happens when we extract audio using moviepy."""
-    # We use AudioFileClip to simulate extraction if we don't have a video
-    # But we can also create a dummy video if needed.
-    # For now, let's just use AudioFileClip and write_audiofile with fps=16000
-    clip = AudioFileClip(input_audio_path)
-    clip.write_audiofile(output_wav_path, fps=16000, logger=None)
-    clip.close()
-
-def run_diagnostic():
-    MODEL_PATH = "hybrid_efficientnet_gru_prefinal.pth"
-    if not os.path.exists(MODEL_PATH):
-        MODEL_PATH = "backend/hybrid_efficientnet_gru.pth"
-    
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model, _ = load_model(MODEL_PATH)
-    
-    # Test file
-    test_file = r"c:\Users\HARRISH\Final-year-project\fake\fake1.flac"
-    if not os.path.exists(test_file):
-        test_file = r"c:\Users\HARRISH\Final-year-project\fake\fake10.flac"
-    
-    if not os.path.exists(test_file):
-        print(f"Test file {test_file} not found.")
-        return
-
-    print(f"--- Testing {test_file} ---")
-    
-    # 1. Direct Load
-    y_direct, sr_direct = preprocess_audio(test_file)
-    spec_direct = extract_spectral(y_direct, sr_direct)
-    temp_direct = extract_temporal(y_direct)
-    res_direct = predict(model, device, spec_direct, temp_direct)
-    print(f"Direct Prediction: {res_direct['label']} (Confidence: {res_direct['confidence']}%)")
-
-    # 2. MoviePy Round-trip
-    temp_roundtrip = "temp_roundtrip.wav"
-    simulate_extraction(test_file, temp_roundtrip)
-    
-    y_rt, sr_rt = preprocess_audio(temp_roundtrip)
-    spec_rt = extract_spectral(y_rt, sr_rt)
-    temp_rt = extract_temporal(y_rt)
-    res_rt = predict(model, device, spec_rt, temp_rt)
-    print(f"Round-trip Prediction: {res_rt['label']} (Confidence: {res_rt['confidence']}%)")
-    print(f"Round-trip Full Result: {res_rt}")
-
-    # 3. Silence Pad (+2s silence at start)
-    print("\n--- Testing with 2s silence at start ---")
-    y_padded = np.pad(y_direct, (2 * 16000, 0)) # Add 2s silence
-    if len(y_padded) > 4 * 16000:
-        y_padded = y_padded[:4 * 16000] # Trim to 4s as preprocess_audio would
-    
-    # We need to normalize as preprocess_audio does
-    import librosa.util
-    y_padded = librosa.util.normalize(y_padded)
-    
-    spec_pad = extract_spectral(y_padded, 16000)
-    temp_pad = extract_temporal(y_padded)
-    res_pad = predict(model, device, spec_pad, temp_pad)
-    print(f"Padded Prediction: {res_pad['label']} (Confidence: {res_pad['confidence']}%)")
-    print(f"Padded Full Result: {res_pad}")
-    
-    # Cleanup
-    if os.path.exists(temp_roundtrip):
-        os.remove(temp_roundtrip)
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    load_model, preprocess_audio, normalize_audio, extract_audio_from_video, predict_robust
+)
+from ingest import get_ffmpeg_exe, load_audio
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_video(audio_path, video_path):
+    """Mux an audio file with a small synthetic video stream into an mp4."""
+    subprocess.run([
+        get_ffmpeg_exe(), "-v", "error", "-y", "-i", audio_path,
+        "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25",
+        "-map", "1:v", "-map", "0:a", "-shortest",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", video_path
+    ], check=True)
+
+
+def snr_db(reference, y):
+    """Signal-to-noise ratio of y against a reference waveform, in dB."""
+    n = min(len(reference), len(y))
+    noise = np.sum((reference[:n] - y[:n]) ** 2)
+    return 10 * np.log10(np.sum(reference[:n] ** 2) / max(noise, 1e-12))
+
+
+def round_trip(video_path, wav_path):
+    """Old path: moviepy writes a 16 kHz WAV, librosa reads it back."""
+    extract_audio_from_video(video_path, wav_path)
+    return preprocess_audio(wav_path)
+
+
+def direct(video_path):
+    """New path: decode only the audio stream, in memory, resampled once."""
+    return normalize_audio(load_audio(video_path), 16000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video audio extraction parity/benchmark")
+    parser.add_argument("--model", help="Checkpoint to also compare predictions")
+    parser.add_argument("--limit", type=int, default=None, help="Number of samples per folder")
+    parser.add_argument("--min-corr", type=float, default=0.999,
+                        help="Minimum correlation between round-trip and direct waveforms")
+    args = parser.parse_args()
+
+    model = device = None
+    if args.model:
+        model, device = load_model(args.model)
+
+    files = []
+    for folder in ("real", "fake"):
+        files += sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))[:args.limit]
+
+    all_ok = True
+    totals = {"round_trip": 0.0, "direct": 0.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in files:
+            name = os.path.relpath(path, REPO_ROOT)
+            video_path = os.path.join(tmp, "clip.mp4")
+            make_video(path, video_path)
+
+            start = time.perf_counter()
+            y_rt, _ = round_trip(video_path, os.path.join(tmp, "clip.wav"))
+            rt_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            y_direct, sr = direct(video_path)
+            direct_time = time.perf_counter() - start
+
+            totals["round_trip"] += rt_time
+            totals["direct"] += direct_time
+
+            y_source, _ = preprocess_audio(path)
+            n = min(len(y_rt), len(y_direct))
+            corr = float(np.corrcoef(y_rt[:n], y_direct[:n])[0, 1])
+            snr_rt = snr_db(y_source, y_rt)
+            snr_direct = snr_db(y_source, y_direct)
+            ok = corr >= args.min_corr and snr_direct >= snr_rt - 0.5
+            line = (f"{name:<20} corr={corr:.5f} snr rt={snr_rt:.1f}dB direct={snr_direct:.1f}dB "
+                    f"round-trip={rt_time * 1000:.0f}ms direct={direct_time * 1000:.0f}ms "
+                    f"speedup={rt_time / direct_time:.1f}x")
+
+            if model is not None:
+                res_rt = predict_robust(model, device, y_rt, sr)
+                res_direct = predict_robust(model, device, y_direct, sr)
+                ok &= res_rt["label"] == res_direct["label"]
+                line += f" score rt={res_rt['raw_score']:.4f} direct={res_direct['raw_score']:.4f}"
+
+            all_ok &= ok
+            print(line + ("" if ok else "  MISMATCH"))
+
+    print(f"\nTotal round-trip={totals['round_trip']:.2f}s direct={totals['direct']:.2f}s "
+          f"speedup={totals['round_trip'] / totals['direct']:.1f}x")
+    print("PARITY OK" if all_ok else "PARITY FAILED")
+    sys.exit(0 if all_ok else 1)
+
 
 if __name__ == "__main__":
-    run_diagnostic()
+    main()
@@ -0,0 +1,95 @@
+"""
+Parity check and latency simulation for live (WebSocket) detection.
+
+Replays each bundled sample, tiled to --seconds, through a LiveDetector in
+20 ms frames, either paced in real time or as fast as possible. Every window
+is checked against scoring the same window offline: the chunks from
+get_audio_chunks, divided by the running peak the live path had seen at that
+point, run through extract_spectral_batch and predict_batch. For each clip it
+reports the window count, the largest probability difference and the
+arrival-to-score latency percentiles.
+
+Usage (from the repo root or backend/):
+    python backend/sim_live.py --model backend/hybrid_efficientnet_gru.pth [--realtime] [--limit 5]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from model import (
+    load_model, preprocess_audio, get_chunk_offsets, get_audio_chunks,
+    extract_spectral_batch, extract_temporal, predict_batch, CHUNK_DURATION
+)
+from live import LiveDetector
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRAME_SECONDS = 0.02
+
+
+def offline_scores(model, device, y, sr):
+    """Scores of the get_audio_chunks windows, normalized like the live stream."""
+    offsets = get_chunk_offsets(len(y), sr)
+    chunks = []
+    for offset, chunk in zip(offsets, get_audio_chunks(y, sr)):
+        peak = np.abs(y[:min(offset + CHUNK_DURATION * sr, len(y))]).max()
+        chunks.append(chunk / peak)
+    spec = extract_spectral_batch(chunks, sr)
+    temp = torch.stack([extract_temporal(chunk) for chunk in chunks])
+    return predict_batch(model, device, spec, temp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live detection parity and latency check")
+    parser.add_argument("--model", default="hybrid_efficientnet_gru.pth")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--limit", type=int, default=None, help="Clips per folder")
+    parser.add_argument("--realtime", action="store_true", help="Pace the frames at real time")
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    model, device = load_model(args.model)
+
+    files = []
+    for folder in ("real", "fake"):
+        files += sorted(glob.glob(os.path.join(REPO_ROOT, folder, "*.flac")))[:args.limit]
+
+    all_ok = True
+    print(f"{'file':<28} {'windows':>7} {'max diff':>9} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7}")
+    for path in files:
+        y, sr = preprocess_audio(path)
+        y = np.tile(y, int(np.ceil(args.seconds * sr / len(y))))[:int(args.seconds * sr)]
+        # Quieter start, so the running peak changes while the stream plays
+        y = y * np.linspace(0.5, 1.0, len(y), dtype=np.float32)
+
+        detector = LiveDetector(model, device, sr)
+        frame = int(FRAME_SECONDS * sr)
+        started = time.perf_counter()
+        live = []
+        for i in range(0, len(y), frame):
+            if args.realtime:
+                time.sleep(max(0.0, started + i / sr - time.perf_counter()))
+            live += [update["probability"] for update in detector.feed(y[i:i + frame])]
+        updates, result = detector.finish()
+        live += [update["probability"] for update in updates]
+
+        offline = offline_scores(model, device, y, sr)
+        max_diff = float(np.max(np.abs(np.array(live) - offline))) if len(live) == len(offline) else float("inf")
+        ok = max_diff <= args.tolerance
+        all_ok &= ok
+        latency = result["latency_ms"]
+        print(f"{os.path.basename(path)[:28]:<28} {len(live):>7} {max_diff:>9.2e} {latency['p50']:>7.1f} "
+              f"{latency['p95']:>7.1f} {latency['max']:>7.1f}" + ("" if ok else "  FAILED"))
+
+    print("CHECK OK" if all_ok else "CHECK FAILED")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-import { PieChart, Pie, Cell, ResponsiveContainer } from 'recharts';
+import {
+    PieChart, Pie, Cell, ResponsiveContainer, AreaChart, Area, XAxis, YAxis,
+    CartesianGrid, Tooltip, ReferenceLine, ReferenceArea
+} from 'recharts';
 import { useState, useEffect } from 'react';
 import './DetectionResult.css';
 
@@ -134,6 +137,115 @@ function ProbabilityDonut({ realProb, fakeProb }) {
     );
 }
 
+/* m:ss label for a time in seconds */
+function formatTime(seconds) {
+    const minutes = Math.floor(seconds / 60);
+    const rest = Math.floor(seconds % 60);
+    return `${minutes}:${rest.toString().padStart(2, '0')}`;
+}
+
+/* Fake probability of each analyzed window over time, with suspicious segments shaded */
+function ProbabilityTimeline({ timeline, segments }) {
+    // Each window is plotted at its midpoint: [start_s, end_s, probability]
+    const data = timeline.map(([start, end, probability]) => ({
+        time: (start + end) / 2,
+        start,
+        end,
+        probability: probability * 100,
+    }));
+    const duration = timeline[timeline.length - 1][1];
+
+    const TimelineTooltip = ({ active, payload }) => {
+        if (!active || !payload || !payload.length) return null;
+        const point = payload[0].payload;
+        return (
+            <div className="timeline-tooltip">
+                <p>{formatTime(point.start)} – {formatTime(point.end)}</p>
+                <p className={point.probability > 50 ? 'text-red' : 'text-green'}>
+                    Fake: {point.probability.toFixed(1)}%
+                </p>
+            </div>
+        );
+    };
+
+    return (
+        <div className="timeline-panel glass-card">
+            <h4>Detection Timeline</h4>
+            <ResponsiveContainer width="100%" height={200}>
+                <AreaChart data={data} margin={{ top: 10, right: 10, bottom: 0, left: -20 }}>
+                    <defs>
+                        <linearGradient id="timelineGrad" x1="0" y1="0" x2="0" y2="1">
+                            <stop offset="0%" stopColor="#ef4444" stopOpacity={0.35} />
+                            <stop offset="100%" stopColor="#06b6d4" stopOpacity={0.05} />
+                        </linearGradient>
+                    </defs>
+                    <CartesianGrid strokeDasharray="3 3" stroke="rgba(255,255,255,0.05)" />
+                    {segments.map((segment) => (
+                        <ReferenceArea
+                            key={segment.start}
+                            x1={segment.start}
+                            x2={segment.end}
+                            fill="rgba(239,68,68,0.12)"
+                            stroke="none"
+                        />
+                    ))}
+                    <XAxis
+                        dataKey="time"
+                        type="number"
+                        domain={[0, duration]}
+                        tickFormatter={formatTime}
+                        tick={{ fill: '#64748b', fontSize: 10 }}
+                        stroke="rgba(255,255,255,0.1)"
+                    />
+                    <YAxis
+                        domain={[0, 100]}
+                        ticks={[0, 50, 100]}
+                        tickFormatter={(value) => `${value}%`}
+                        tick={{ fill: '#64748b', fontSize: 10 }}
+                        stroke="rgba(255,255,255,0.1)"
+                    />
+                    <ReferenceLine y={50} stroke="rgba(255,255,255,0.2)" strokeDasharray="4 4" />
+                    <Tooltip content={<TimelineTooltip />} />
+                    <Area
+                        type="monotone"
+                        dataKey="probability"
+                        stroke="#ef4444"
+                        strokeWidth={2}
+                        fill="url(#timelineGrad)"
+                        dot={data.length <= 30}
+                        animationDuration={1200}
+                    />
+                </AreaChart>
+            </ResponsiveContainer>
+
+            {segments.length > 0 ? (
+                <div className="segment-list">
+                    <span className="segment-list-title">Suspicious segments</span>
+                    {segments.map((segment) => (
+                        <div key={segment.start} className="segment-item">
+                            <span className="segment-range">
+                                {formatTime(segment.start)} – {formatTime(segment.end)}
+                            </span>
+                            <span className="segment-peak">
+                                peak {(segment.max_probability * 100).toFixed(1)}%
+                            </span>
+                        </div>
+                    ))}
+                </div>
+            ) : (
+                <p className="segment-none">No window scored above 50%</p>
+            )}
+        </div>
+    );
+}
+
+const AGGREGATE_LABELS = {
+    max: 'Max over windows',
+    mean: 'Mean over windows',
+    topk: 'Mean of top windows',
+    quantile: 'Window quantile',
+};
+
 export default function DetectionResult({ result, onUploadAnother }) {
     const isFake = result.label === 'FAKE';
 
@@ -211,6 +323,14 @@ export default function DetectionResult({ result, onUploadAnother }) {
                 </div>
             </div>
 
+            {/* Per-window timeline (absent in older cached results) */}
+            {result.timeline && result.timeline.length > 0 && (
+                <ProbabilityTimeline
+                    timeline={result.timeline}
+                    segments={result.suspicious_segments || []}
+                />
+            )}
+
             {/* Details */}
             <div className="result-details glass-card">
                 <h4>Analysis Details</h4>
@@ -229,6 +349,16 @@ export default function DetectionResult({ result, onUploadAnother }) {
                         <span className="detail-label">Raw Score</span>
                         <span className="detail-value">{result.raw_score}</span>
                     </div>
+                    {result.aggregate && (
+                        <div className="detail-item">
+                            <span className="detail-label">Aggregation</span>
+                            <span className="detail-value">
+                                {AGGREGATE_LABELS[result.aggregate.method]}
+                                {result.aggregate.k !== undefined && ` (k = ${result.aggregate.k})`}
+                                {result.aggregate.q !== undefined && ` (q = ${result.aggregate.q})`}
+                            </span>
+                        </div>
+                    )}
                     <div className="detail-item">
                         <span className="detail-label">Features Used</span>
                         <span className="detail-value">Mel Spectrogram + Audio Frames</span>
@@ -6,6 +6,8 @@ export default function History() {
     const [predictions, setPredictions] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         loadHistory();
@@ -15,6 +17,7 @@ export default function History() {
         try {
             const res = await predictionAPI.history();
             setPredictions(res.data.predictions);
+            setNextCursor(res.data.next_cursor);
         } catch {
             setError('Failed to load prediction history.');
         } finally {
@@ -22,6 +25,19 @@ export default function History() {
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const res = await predictionAPI.history(nextCursor);
+            setPredictions((prev) => [...prev, ...res.data.predictions]);
+            setNextCursor(res.data.next_cursor);
+        } catch {
+            setError('Failed to load prediction history.');
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     if (loading) {
         return (
             <div className="metrics-loading">
@@ -54,7 +70,7 @@ export default function History() {
                         <div
                             key={pred.id}
                             className="history-item glass-card"
-                            style={{ animationDelay: `${i * 0.05}s` }}
+                            style={{ animationDelay: `${(i % 50) * 0.05}s` }}
                         >
                             <div className="history-icon">
                                 {pred.label === 'FAKE' ? '🔴' : '🟢'}
@@ -73,6 +89,15 @@ export default function History() {
                             </div>
                         </div>
                     ))}
+                    {nextCursor && (
+                        <button
+                            className="btn-secondary history-more-btn"
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                        >
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    )}
                 </div>
             )}
         </div>
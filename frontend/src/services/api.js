@@ -51,7 +51,7 @@ export const predictionAPI = {
             headers: { 'Content-Type': 'multipart/form-data' },
         });
     },
-    history: () => api.get('/history'),
+    history: (cursor) => api.get('/history', { params: cursor ? { cursor } : {} }),
 };
 
 export const metricsAPI = {
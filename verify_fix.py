@@ -4,12 +4,14 @@ import numpy as np
 import os
 import sys
 
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
 # Add backend to path
-sys.path.append(os.path.join(os.getcwd(), "backend"))
+sys.path.append(os.path.join(REPO_ROOT, "backend"))
 from model import load_model, preprocess_audio, predict_robust
 
 def run_verification():
-    MODEL_PATH = "backend/hybrid_efficientnet_gru.pth"
+    MODEL_PATH = os.path.join(REPO_ROOT, "backend", "hybrid_efficientnet_gru.pth")
     if not os.path.exists(MODEL_PATH):
         print(f"Model path {MODEL_PATH} not found.")
         return
@@ -18,9 +20,9 @@ def run_verification():
     model, _ = load_model(MODEL_PATH)
     
     # Use a confirmed 'FAKE' test file
-    test_file = r"c:\Users\HARRISH\Final-year-project\fake\fake1.flac"
+    test_file = os.path.join(REPO_ROOT, "fake", "fake1.flac")
     if not os.path.exists(test_file):
-        test_file = r"c:\Users\HARRISH\Final-year-project\fake\fake10.flac"
+        test_file = os.path.join(REPO_ROOT, "fake", "fake10.flac")
     
     if not os.path.exists(test_file):
         print(f"Test file {test_file} not found.")